@@ -0,0 +1,105 @@
+"""Checks and benchmark for the two LLM streaming clients (LLM_CLIENT).
+
+    uv run python scripts/bench_llm_clients.py [--tokens 2000] [--calls 20]
+
+Runs stream_llm against a local stand-in Ollama server (see
+ollama_standin.py) with the LangChain client and with the native one. The
+checks compare their text and usage (taken from the final chunk); the
+benchmark reports wall time per call and client-side time per streamed
+token, and how many TCP connections each client opened.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain_ollama import ChatOllama  # noqa: E402
+
+from scripts.ollama_standin import start  # noqa: E402
+from src.core import config as cfg  # noqa: E402
+from src.core import llm  # noqa: E402
+from src.core.backends import BackendPool  # noqa: E402
+
+MESSAGES = [
+    {"role": "system", "content": "You are a senior developer."},
+    {"role": "user", "content": "Implement the requirements. " * 50},
+]
+
+
+def run(client: str, model: ChatOllama, calls: int):
+    cfg.LLM_CLIENT = client
+    results = []
+    started = time.perf_counter()
+    for _ in range(calls):
+        tokens = []
+        results.append(llm.stream_llm(model, MESSAGES, on_token=tokens.append))
+    return (time.perf_counter() - started) / calls, results
+
+
+def check(model: ChatOllama, tokens: int):
+    expected = "".join(f"token{i} " for i in range(tokens))
+    outputs = {}
+    for client in ("langchain", "native"):
+        _, [(text, usage)] = run(client, model, 1)
+        assert text == expected, (client, text[:80])
+        assert usage["output_tokens"] == tokens and usage["input_tokens"] > 0, (client, usage)
+        assert usage["total_tokens"] == usage["input_tokens"] + usage["output_tokens"]
+        assert usage["prompt_eval_ms"] == 1.0, (client, usage)
+        outputs[client] = (text, usage)
+    assert outputs["langchain"] == outputs["native"], outputs
+
+    # Model missing on the backend: same error type as the LangChain path
+    cfg.LLM_CLIENT = "native"
+    try:
+        llm.stream_llm(ChatOllama(model="missing:1b", base_url=model.base_url), MESSAGES)
+    except Exception as e:
+        assert getattr(e, "status_code", None) == 404, repr(e)
+    else:
+        raise AssertionError("missing model did not fail")
+    print("checks passed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tokens", type=int, default=2000, help="Tokens per streamed answer")
+    parser.add_argument("--calls", type=int, default=20, help="Calls per client")
+    args = parser.parse_args()
+
+    llm.LLM_STREAM_IDLE_SECONDS = None
+    server = start(tokens=args.tokens)
+    llm.backend_pool = BackendPool([server.url])
+    model = ChatOllama(model="qwen2.5:7b", base_url=server.url, temperature=0.7, num_ctx=8192)
+
+    check(model, args.tokens)
+
+    connections = {"count": 0}
+    original = server.get_request
+
+    def counting_get_request():
+        connections["count"] += 1
+        return original()
+
+    server.get_request = counting_get_request
+
+    print(f"{args.calls} calls x {args.tokens} tokens per client")
+    timings = {}
+    for client in ("langchain", "native", "langchain", "native"):  # Second round: warm
+        per_call, _ = run(client, model, args.calls)
+        timings[client] = per_call
+    for client, per_call in timings.items():
+        print(f"  {client:<10} {per_call * 1000:8.1f} ms/call  {per_call / args.tokens * 1e6:6.1f} us/token")
+    print(f"  native speedup: {timings['langchain'] / timings['native']:.2f}x")
+
+    llm.native_client = llm.OllamaHTTPClient()  # Empty connection pools
+    llm.abortable_clients = llm.AbortableClients()
+    for client in ("langchain", "native"):
+        connections["count"] = 0
+        run(client, model, args.calls)
+        print(f"  {client} client: {connections['count']} TCP connection(s) opened for {args.calls} calls")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Checks and micro-benchmarks for the thought stream normalizer.
+
+    uv run python scripts/bench_stream_normalizer.py
+
+The checks split sample streams at every position (and into single
+characters) and compare against normalizing the whole text at once, which
+covers escapes and newline runs cut by a chunk boundary. The benchmark feeds
+a token-sized stream through the normalizer and through the old
+buffer/replace/regex emitter logic.
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.stream_normalizer import ThoughtNormalizer, ThoughtStreams  # noqa: E402
+
+SAMPLES = [
+    ('{"summary": "Line one\\nLine two\\tTabbed \\"quoted\\""}',
+     '{"summary": "Line one\nLine two\tTabbed "quoted""}'),
+    ("a\\\\nb", "a\\nb"),  # Escaped backslash followed by a literal n
+    ("path\\/to\\/file", "path/to/file"),
+    ("caf\\u00e9 \\u2713", "café ✓"),
+    ("smile \\ud83d\\ude00!", "smile \U0001F600!"),
+    ("lone \\udc00 and \\ud83d x", "lone \ufffd and \ufffd x"),
+    ("bad \\uzz12 and \\q", "bad \\uzz12 and \\q"),
+    ("one\\n\\n\\n\\n\\ntwo", "one\n\ntwo"),
+    ("one\n\n\n\ntwo\\n\n\\nthree", "one\n\ntwo\n\nthree"),
+    ("\n\n\n\nlead", "\n\nlead"),
+    ("carriage\\r\\nreturn", "carriage\nreturn"),
+]
+
+
+def normalize(chunks) -> str:
+    normalizer = ThoughtNormalizer()
+    return "".join(normalizer.feed(chunk) for chunk in chunks) + normalizer.flush()
+
+
+def check():
+    for raw, expected in SAMPLES:
+        assert normalize([raw]) == expected, (raw, normalize([raw]))
+        assert normalize(list(raw)) == expected, ("per-char", raw)
+        for i in range(len(raw) + 1):
+            for j in range(i, len(raw) + 1):
+                got = normalize([raw[:i], raw[i:j], raw[j:]])
+                assert got == expected, (raw, i, j, got)
+
+    # Incomplete escapes are held back, then emitted as-is at the end
+    normalizer = ThoughtNormalizer()
+    assert normalizer.feed("tail\\") == "tail"
+    assert normalizer.feed("") == ""
+    assert normalizer.flush() == "\\"
+    normalizer = ThoughtNormalizer()
+    assert normalizer.feed("x\\u00") == "x"
+    assert normalizer.flush() == "\\u00"
+
+    # Agents interleaving chunks keep separate state
+    streams = ThoughtStreams()
+    assert streams.feed("pm", "a\\") == "a"
+    assert streams.feed("qa", "n\n\n") == "n\n\n"
+    assert streams.feed("pm", "n\n\n") == "\n\n"
+    assert streams.flush("qa") == ""
+    print(f"checks: {len(SAMPLES)} samples, every 3-way split: ok")
+
+
+def legacy_emitter():
+    """The per-emitter logic this normalizer replaced."""
+    state = {"buffer": ""}
+
+    def feed(chunk: str) -> str:
+        state["buffer"] += chunk
+        if "\\" in state["buffer"]:
+            state["buffer"] = state["buffer"].replace("\\n", "\n").replace('\\"', '"').replace("\\t", "\t")
+        state["buffer"] = re.sub(r"\n{3,}", "\n\n", state["buffer"])
+        if state["buffer"].endswith("\\"):
+            return ""
+        out, state["buffer"] = state["buffer"], ""
+        return out
+
+    return feed
+
+
+def token_stream(n_tokens: int) -> list:
+    text = ('{"title": "Checkout flow", "steps": ["Open cart\\n", "Pay with \\"card\\"\\n\\n\\n"], '
+            '"notes": "caf\\u00e9\\tdone"} ')
+    tokens = []
+    i = 0
+    while len(tokens) < n_tokens:
+        size = 1 + (i % 5)  # 1-5 characters, like LLM tokens
+        tokens.append(text[i % len(text):i % len(text) + size] or text[:size])
+        i += size
+    return tokens
+
+
+def bench(n_tokens: int = 200_000):
+    tokens = token_stream(n_tokens)
+    for name, feed in (("normalizer", ThoughtNormalizer().feed), ("legacy", legacy_emitter())):
+        start = time.perf_counter()
+        for token in tokens:
+            feed(token)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {n_tokens / elapsed:>12,.0f} chunks/s  ({elapsed * 1e9 / n_tokens:.0f} ns/chunk)")
+
+
+if __name__ == "__main__":
+    check()
+    bench()
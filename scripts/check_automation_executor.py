@@ -0,0 +1,91 @@
+"""Checks for the AutomationExecutor node.
+
+    uv run python scripts/check_automation_executor.py
+
+Runs automation_execution_node on suites that did run but have errored
+tests (a failing fixture, a shard that times out): they must be reported
+as failed with per-test bugs and counts, not as a suite that could not
+run. A suite with nothing to collect is reported as not run. The first
+run creates the venv, so this needs network access for pip.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core import artifacts  # noqa: E402
+from src.core import config as cfg  # noqa: E402
+from src.core.events import WorkflowEventType  # noqa: E402
+from src.core.execution import automation_executor  # noqa: E402
+from src.workflow.nodes import automation_execution_node  # noqa: E402
+
+APP = "def add(a, b):\n    return a + b\n"
+FIXTURE_ERROR = """import pytest
+from app import add
+
+@pytest.fixture
+def client():
+    raise RuntimeError("fixture exploded")
+
+def test_add():
+    assert add(1, 2) == 3
+
+def test_with_client(client):
+    assert client
+"""
+SLOW = """import time
+
+def test_slow():
+    time.sleep(30)
+"""
+EMPTY = "# no tests\n"
+
+
+def execute(run_id: str, suite: str):
+    run_dir = cfg.ARTIFACTS_DIR / run_id
+    (run_dir / "src").mkdir(parents=True, exist_ok=True)
+    (run_dir / "src" / "app.py").write_text(APP)
+    (run_dir / "testing").mkdir(exist_ok=True)
+    (run_dir / "testing" / "test_app.py").write_text(suite)
+    events = []
+    config = {"configurable": {"emitter": lambda type, data: events.append((type, data))}}
+    updates = automation_execution_node({"run_id": run_id}, config)
+    complete = next(data for type, data in events if type == WorkflowEventType.AGENT_COMPLETE)
+    return updates, complete
+
+
+def check():
+    with tempfile.TemporaryDirectory(prefix="automation_check_") as tmp:
+        cfg.ARTIFACTS_DIR = artifacts.ARTIFACTS_DIR = Path(tmp)
+        cfg.SEARCH_INDEX_ENABLED = False
+
+        updates, complete = execute("fixture", FIXTURE_ERROR)
+        results = updates["automation_results"]
+        assert results["status"] == "failed" and "error_message" not in results, results
+        assert (results["passed"], results["failed"], results["error"]) == (1, 0, 1), results
+        assert complete["message"].startswith("1 passed, 0 failed, 1 errors"), complete
+        assert len(updates["bugs"]) == 1 and "test_with_client" in updates["bugs"][0], updates["bugs"]
+
+        timeout = cfg.AUTOMATION_TIMEOUT_SECONDS
+        cfg.AUTOMATION_TIMEOUT_SECONDS = 3
+        try:
+            updates, complete = execute("timeout", SLOW)
+        finally:
+            cfg.AUTOMATION_TIMEOUT_SECONDS = timeout
+        results = updates["automation_results"]
+        assert results["status"] == "failed" and results["error"] == 1, results
+        assert "Timed out" in updates["bugs"][0], updates["bugs"]
+
+        updates, complete = execute("empty", EMPTY)
+        results = updates["automation_results"]
+        assert results["status"] == "error" and results["error_message"] == "No tests collected.", results
+        assert complete["message"] == "Automation suite could not run.", complete
+        assert updates["bugs"] == ["[Automation] The automation suite could not run: No tests collected."]
+    automation_executor._pool.shutdown(wait=False)
+    print("checks: errored fixture and timed-out shard reported as failed, empty suite as not run: ok")
+
+
+if __name__ == "__main__":
+    check()
@@ -0,0 +1,53 @@
+"""Checks for the static pre-execution checks.
+
+    uv run python scripts/check_prechecks.py
+
+Undeclared third-party imports that a declared package brings in (werkzeug
+and jinja2 through flask, sqlalchemy through flask-sqlalchemy,
+email_validator through pydantic[email]) must only warn, while syntax
+errors, missing generated modules and missing tests still skip execution.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.prechecks import check_tree, run_prechecks  # noqa: E402
+
+FLASK_APP = {
+    "requirements.txt": "flask\nflask-sqlalchemy\npydantic[email]\n",
+    "app/__init__.py": "from flask import Flask\nimport jinja2\n",
+    "app/models.py": "from sqlalchemy import Column\nfrom flask_sqlalchemy import SQLAlchemy\n",
+    "app/auth.py": ("from werkzeug.security import generate_password_hash\n"
+                    "import email_validator\nfrom pydantic import EmailStr\nfrom .models import Column\n"),
+    "tests/test_auth.py": "from app.auth import generate_password_hash\nfrom app import models\n",
+}
+
+
+def kinds(files):
+    return sorted(issue.kind for issue in run_prechecks(files))
+
+
+def check():
+    feedback, warnings = check_tree(FLASK_APP)
+    assert feedback is None, feedback
+    for name in ("werkzeug.security", "sqlalchemy", "jinja2", "email_validator"):
+        assert f"'{name}'" in warnings, (name, warnings)
+    assert "flask_sqlalchemy" not in warnings and "'flask'" not in warnings, warnings
+
+    # Blocking failures
+    assert kinds({**FLASK_APP, "app/views.py": "def broken(:\n"}) == ["syntax"] + ["undeclared_import"] * 4
+    assert "import" in kinds({**FLASK_APP, "app/views.py": "from app.services import notify\n"})
+    assert "relative_import" in kinds({**FLASK_APP, "app/views.py": "from .services import notify\n"})
+    no_tests = {path: content for path, content in FLASK_APP.items() if not path.startswith("tests/")}
+    feedback, _ = check_tree(no_tests)
+    assert feedback and "[no_tests]" in feedback, feedback
+
+    # Guarded imports are ignored altogether
+    guarded = {**FLASK_APP, "app/extra.py": "try:\n    import ujson\nexcept ImportError:\n    ujson = None\n"}
+    assert "ujson" not in check_tree(guarded)[1]
+    print("checks: undeclared imports warn, syntax/local/relative/no-tests block: ok")
+
+
+if __name__ == "__main__":
+    check()
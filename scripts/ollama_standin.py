@@ -0,0 +1,233 @@
+"""Stand-in Ollama servers for exercising the LLM backend pool and clients.
+
+    uv run python scripts/ollama_standin.py --port 11501 --port 11502 --models qwen2.5:7b
+
+Each port serves the parts of the Ollama API the system uses:
+
+- GET /api/tags: the models given with --models
+- POST /api/chat: a streamed (NDJSON, chunked) or single answer of --tokens
+  tokens, with usage counts and timings in the final chunk like Ollama;
+  unknown models get 404 like a backend that has not pulled them
+
+Answers are deterministic ("token0 token1 ..."), and every response names
+the serving port in the X-Standin-Port header, so routing can be checked
+from the outside. Stopping the process (or `stop()` on a server started with
+`start()`) simulates a dead backend.
+
+`--check` starts two stand-ins plus one unreachable URL and runs the pool
+checks: least-outstanding balancing, run stickiness, model availability and
+failover when a backend dies mid-run.
+"""
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import orjson
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like Ollama
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            models = [{"name": m, "model": m, "size": 0, "digest": "standin"} for m in self.server.models]
+            self._send_json(200, {"models": models})
+        elif self.path == "/":
+            self._send(200, b"Ollama is running", "text/plain")
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path != "/api/chat":
+            self._send_json(404, {"error": "not found"})
+            return
+        request = orjson.loads(body or b"{}")
+        model = request.get("model", "")
+        if model not in self.server.models and f"{model}:latest" not in self.server.models:
+            self._send_json(404, {"error": f"model '{model}' not found"})
+            return
+        self.server.requests += 1
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4
+        tokens = [f"token{i} " for i in range(self.server.tokens)]
+        final = {
+            "model": model, "created_at": _now(), "message": {"role": "assistant", "content": ""},
+            "done": True, "done_reason": "stop",
+            "prompt_eval_count": prompt_tokens, "eval_count": len(tokens),
+            "prompt_eval_duration": 1_000_000, "eval_duration": 1_000_000 * len(tokens),
+            "load_duration": 0, "total_duration": 1_000_000 * (len(tokens) + 1),
+        }
+
+        if not request.get("stream", True):
+            final["message"]["content"] = "".join(tokens)
+            self._send_json(200, final)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Standin-Port", str(self.server.server_port))
+        self.end_headers()
+        try:
+            if self.server.first_token_delay:
+                time.sleep(self.server.first_token_delay)
+            for token in tokens:
+                self._chunk(orjson.dumps({"model": model, "created_at": _now(),
+                                          "message": {"role": "assistant", "content": token}, "done": False}) + b"\n")
+                if self.server.token_delay:
+                    time.sleep(self.server.token_delay)
+            self._chunk(orjson.dumps(final) + b"\n")
+            self._chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload):
+        self._send(status, orjson.dumps(payload), "application/json")
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Standin-Port", str(self.server.server_port))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, models: List[str], tokens: int = 20, token_delay: float = 0.0,
+                 first_token_delay: float = 0.0):
+        super().__init__(("127.0.0.1", port), StandinHandler)
+        self.models = models
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.requests = 0
+        self.connections = set()
+
+    def finish_request(self, request, client_address):
+        self.connections.add(request)
+        try:
+            super().finish_request(request, client_address)
+        finally:
+            self.connections.discard(request)
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)  # Clients dropping connections are expected
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def stop(self):
+        """Stop like a dead backend: kept-alive connections are dropped too."""
+        self.shutdown()
+        self.server_close()
+        for conn in list(self.connections):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def start(port: int = 0, models: Optional[List[str]] = None, **options) -> StandinServer:
+    """Serve a stand-in on a background thread (port 0: any free port)."""
+    server = StandinServer(port, models or ["qwen2.5:7b"], **options)
+    threading.Thread(target=server.serve_forever, name=f"standin-{server.server_port}", daemon=True).start()
+    return server
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def check():
+    from src.core import llm
+    from src.core.backends import BackendPool
+    from langchain_ollama import ChatOllama
+
+    llm.LLM_STREAM_IDLE_SECONDS = None
+    fast = start(models=["qwen2.5:7b", "qwen2.5-coder:7b"], tokens=5)
+    slow = start(models=["qwen2.5:7b"], tokens=5, token_delay=0.05)
+    pool = BackendPool([fast.url, slow.url, "http://127.0.0.1:9"])  # Port 9: nothing listens
+    llm.backend_pool = pool
+    messages = [{"role": "user", "content": "hello"}]
+
+    # Health checks: the dead backend is out, model lists are known
+    pool.check_all()
+    status = {b["url"]: b for b in pool.status()}
+    assert not status["http://127.0.0.1:9"]["healthy"]
+    assert status[slow.url]["models"] == ["qwen2.5:7b"]
+
+    # Least outstanding: two concurrent runs land on different backends
+    with pool.acquire("qwen2.5:7b", "run-a") as first, pool.acquire("qwen2.5:7b", "run-b") as second:
+        assert first.url != second.url, (first.url, second.url)
+    # Sticky: later calls of a run stay on its backend even when it is busier
+    sticky = pool.select("qwen2.5:7b", "run-a").url
+    with pool.acquire("qwen2.5:7b", "run-x"), pool.acquire("qwen2.5:7b", "run-y"):
+        assert all(pool.select("qwen2.5:7b", "run-a").url == sticky for _ in range(5))
+
+    # Model availability: only `fast` has the coder model
+    assert pool.select("qwen2.5-coder:7b", "run-c").url == fast.url
+
+    # Failover: the run's backend dies between calls
+    model = ChatOllama(model="qwen2.5:7b", base_url=fast.url)
+    with pool.acquire("qwen2.5:7b", "run-d", exclude={fast.url}) as backend:
+        assert backend.url == slow.url  # run-d now sticks to `slow`
+    text, usage = llm.stream_llm(model, messages, run_id="run-d")
+    assert text == "token0 token1 token2 token3 token4 " and usage["output_tokens"] == 5, (text, usage)
+    assert slow.requests == 1
+    served_before = fast.requests
+    slow.stop()
+    text, _ = llm.stream_llm(model, messages, run_id="run-d")
+    assert text.startswith("token0") and fast.requests == served_before + 1
+    assert pool.select("qwen2.5:7b", "run-d").url == fast.url
+    assert not {b["url"]: b for b in pool.status()}[slow.url]["healthy"]
+    fast.stop()
+    print("backend pool checks passed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, action="append", help="Port to serve (repeatable)")
+    parser.add_argument("--models", default="qwen2.5:7b,qwen2.5-coder:7b", help="Comma-separated model names")
+    parser.add_argument("--tokens", type=int, default=200, help="Tokens per answer")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between tokens")
+    parser.add_argument("--first-token-delay", type=float, default=0.0, help="Seconds before the first token")
+    parser.add_argument("--check", action="store_true", help="Run the backend pool checks and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        check()
+        return
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    servers = [start(port, models, tokens=args.tokens, token_delay=args.token_delay,
+                     first_token_delay=args.first_token_delay) for port in args.port or [11435]]
+    print("Serving " + ", ".join(server.url for server in servers) + f" with {', '.join(models)} (Ctrl+C to stop)")
+    print("LLM_BACKENDS = " + repr([server.url for server in servers]))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
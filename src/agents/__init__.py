@@ -7,7 +7,7 @@ from .test_manager import TestManagerAgent
 from .test_lead import TestLeadAgent
 from .automation_qa import AutomationQAAgent
 from .manual_qa import ManualQAAgent
-from .developer import DeveloperAgent
+from .developer import DeveloperAgent, DeveloperPatchAgent
 from .reviewer import ReviewerAgent
 
 __all__ = [
@@ -17,5 +17,6 @@ __all__ = [
     "AutomationQAAgent",
     "ManualQAAgent",
     "DeveloperAgent",
+    "DeveloperPatchAgent",
     "ReviewerAgent"
 ]
@@ -5,7 +5,11 @@ from typing import Any, Optional, Callable
 
 import re
 import orjson
-from ..core.llm import get_llm, stream_llm
+from ..core.llm import LLMStreamStalled, get_llm, stream_llm, estimate_tokens
+from ..core import metrics
+from ..core.token_ledger import ledger
+from .session import AgentSession
+from .repair import classify_failure, build_repair_messages, combine_repair
 
 
 @dataclass
@@ -16,6 +20,8 @@ class AgentOutput:
     message: str = ""
     errors: list[str] = field(default_factory=list)
     token_usage: dict[str, int] = field(default_factory=lambda: {"total_tokens": 0})
+    retries: int = 0  # Targeted repair attempts after a parse failure
+    retry_usage: dict[str, int] = field(default_factory=lambda: {"total_tokens": 0})
 
 
 class BaseAgent(ABC):
@@ -45,10 +51,17 @@ class BaseAgent(ABC):
                 self.name = cfg["name"]
                 self.role = cfg["role"]
                 
-        self._system_prompt = self._build_system_prompt()
+        self._base_system_prompt = self._build_system_prompt()
+        self._schema_prompt = ""
         if self.output_schema:
-             self._system_prompt += "\n\nCRITICAL: You must respond with a raw JSON object wrapped in a markdown code block: ```json { ... } ```. \n" \
+             self._schema_prompt = "\n\nCRITICAL: You must respond with a raw JSON object wrapped in a markdown code block: ```json { ... } ```. \n" \
                                     f"Required JSON Schema: {self.output_schema.model_json_schema()}"
+        self._system_prompt = self._base_system_prompt + self._schema_prompt
+
+        # Native structured output (see LLM_STRUCTURED_OUTPUT). Built lazily because
+        # subclasses may swap self.llm for a different model after __init__.
+        self._structured_llm = None
+        self._structured_supported = True
 
     @property
     @abstractmethod
@@ -209,6 +222,7 @@ class BaseAgent(ABC):
                                 pass
                             return AgentOutput(success=False, errors=[f"JSON Parsing Error: {str(je)}"])
                     
+                    try:
                         # Pre-validation fix: LLMs sometimes omit 'approved' or output it as string
                         if isinstance(parsed_data, dict):
                             # Try to fix string booleans
@@ -249,29 +263,244 @@ class BaseAgent(ABC):
         else:
             return AgentOutput(success=True, message=response)
 
-    def invoke(self, input_data: dict[str, Any], on_token: Optional[Callable[[str], None]] = None) -> AgentOutput:
+    @property
+    def metrics_label(self) -> str:
+        """Label used for this agent in runtime metrics."""
+        return self.agent_id or self.name
+
+    def _use_structured_output(self) -> bool:
+        """Whether this call should use the backend's native JSON-schema output."""
+        from ..core import config
+        return bool(self.output_schema) and config.LLM_STRUCTURED_OUTPUT and self._structured_supported
+
+    def _get_structured_llm(self):
+        """LLM instance that passes the output schema as Ollama's `format`."""
+        if self._structured_llm is None or self._structured_llm.model != self.llm.model:
+            self._structured_llm = get_llm(
+                model_name=self.llm.model,
+                output_format=self.output_schema.model_json_schema(),
+            )
+        return self._structured_llm
+
+    def _parse_structured_response(self, response: str) -> AgentOutput:
+        """Parse a native structured response, falling back to the extraction path."""
+        try:
+            data = self.output_schema.model_validate_json(response)
+            return AgentOutput(
+                success=True,
+                artifacts=data.model_dump(),
+                message="Structured output generated"
+            )
+        except Exception:
+            metrics.incr("agent_structured_parse_fallbacks", agent=self.metrics_label)
+            return self._parse_response(response)
+
+    def _stream_structured(self, messages: list[dict], on_token: Optional[Callable[[str], None]],
+                           run_id: Optional[str] = None) -> Optional[tuple[str, dict]]:
         """
-        Invoke the agent with input data.
+        Stream with native structured output.
+
+        Returns:
+            (response, usage), or None if the backend rejected the format before
+            producing any tokens (caller should use the prompt-based path).
         """
+        streamed = False
+
+        def track(token: str):
+            nonlocal streamed
+            streamed = True
+            if on_token:
+                on_token(token)
+
         try:
-            # Build messages
-            messages = [
-                {"role": "system", "content": self._system_prompt},
+            return stream_llm(self._get_structured_llm(), messages, on_token=track, run_id=run_id)
+        except InterruptedError:
+            raise
+        except Exception as e:
+            if streamed or isinstance(e, LLMStreamStalled):
+                raise
+            print(f"Structured output unsupported for {self.name}, using prompt schema: {e}")
+            self._structured_supported = False
+            metrics.incr("agent_structured_unsupported", agent=self.metrics_label)
+            return None
+
+    def _record_usage(self, run_id: Optional[str], usage: dict, iteration: Optional[int], kind: str,
+                      extra: Optional[dict] = None):
+        """Add one LLM call to the run's token ledger."""
+        ledger.record(run_id, self.metrics_label, getattr(self.llm, "model", None), usage,
+                      iteration=iteration, kind=kind, extra=extra)
+
+    def _build_followup_prompt(self, input_data: dict[str, Any], session: AgentSession) -> Optional[str]:
+        """
+        Prompt that continues a session: only what is new since the last answer.
+
+        Returns None if the agent has no follow-up form (the session restarts
+        with the full prompt).
+        """
+        return None
+
+    def _build_messages(self, system_prompt: str, input_data: dict[str, Any],
+                        session: Optional[AgentSession]) -> list[dict]:
+        if session is None:
+            return [
+                {"role": "system", "content": system_prompt},
                 {"role": "user", "content": self._build_user_prompt(input_data)},
             ]
-            
-            # Invoke LLM
-            response, usage = stream_llm(self.llm, messages, on_token=on_token)
-            
-            # Parse response
+        return session.prepare(
+            system_prompt,
+            lambda: self._build_user_prompt(input_data),
+            lambda: self._build_followup_prompt(input_data, session),
+        )
+
+    def _observe(self, session: Optional[AgentSession], messages: list[dict], usage: dict) -> Optional[dict]:
+        """Prompt-cache reuse of a session call (recorded in the ledger and metrics)."""
+        if session is None:
+            return None
+        reuse = session.observe(messages, usage)
+        label = self.metrics_label
+        metrics.observe("session_prompt_tokens_reused", reuse["reused_prompt_tokens"], agent=label)
+        metrics.observe("session_prompt_eval_ms_saved", reuse["prompt_eval_ms_saved"], agent=label)
+        return reuse
+
+    def _repair(self, output: AgentOutput, messages: list[dict], response: str,
+                on_token: Optional[Callable[[str], None]] = None, run_id: Optional[str] = None,
+                iteration: Optional[int] = None) -> AgentOutput:
+        """
+        Retry a failed parse with targeted follow-up prompts (up to AGENT_MAX_RETRIES).
+
+        Each attempt asks only for the broken part of the answer (see repair.py)
+        instead of regenerating it. Repair tokens are reported in `retry_usage`,
+        separately from the primary generation's `token_usage`.
+        """
+        from ..core.config import AGENT_MAX_RETRIES
+
+        label = self.metrics_label
+        retry_usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        attempts = 0
+
+        for attempt in range(AGENT_MAX_RETRIES):
+            plan = classify_failure(response, self.output_schema)
+            if plan.kind == "valid":
+                data = self.output_schema.model_validate(plan.partial)
+                output = AgentOutput(success=True, artifacts=data.model_dump(), message="Structured output generated")
+                break
+
+            attempts += 1
+            metrics.incr("agent_retries", agent=label, kind=plan.kind)
+            print(f"Repairing {self.name} output ({plan.kind}), attempt {attempt + 1}/{AGENT_MAX_RETRIES}")
+
+            repair_messages = build_repair_messages(plan, messages, response, self.output_schema)
+            repair_response, usage = stream_llm(self.llm, repair_messages, on_token=on_token, run_id=run_id)
+            self._record_usage(run_id, usage, iteration, "repair")
+            for key in retry_usage:
+                retry_usage[key] += usage.get(key, 0)
+
+            response = combine_repair(plan, repair_response)
             output = self._parse_response(response)
+            if output.success:
+                metrics.incr("agent_repairs_succeeded", agent=label, kind=plan.kind)
+                break
+
+        metrics.incr("agent_retry_tokens", retry_usage["total_tokens"], agent=label)
+        output.retries = attempts
+        output.retry_usage = retry_usage
+        return output
+
+    def invoke(self, input_data: dict[str, Any], on_token: Optional[Callable[[str], None]] = None,
+               run_id: Optional[str] = None, iteration: Optional[int] = None,
+               session: Optional[AgentSession] = None) -> AgentOutput:
+        """
+        Invoke the agent with input data.
+
+        Args:
+            run_id: Run the call belongs to, so cancelling the run aborts the LLM stream
+            iteration: Developer/Reviewer loop pass, recorded in the run's token ledger
+            session: Continue this conversation (follow-up prompt) instead of sending a fresh one
+
+        Raises:
+            InterruptedError: if the run is cancelled (never reported as an agent error)
+        """
+        try:
+            label = self.metrics_label
+            result = None
+
+            if self._use_structured_output():
+                # Schema goes through the API instead of the prompt
+                messages = self._build_messages(self._base_system_prompt, input_data, session)
+                result = self._stream_structured(messages, on_token, run_id)
+
+            if result is not None:
+                response, usage = result
+                self._record_usage(run_id, usage, iteration, "structured", self._observe(session, messages, usage))
+                metrics.incr("agent_structured_calls", agent=label)
+                metrics.incr("agent_prompt_tokens_saved", estimate_tokens(self._schema_prompt), agent=label)
+                output = self._parse_structured_response(response)
+            else:
+                # Build messages
+                messages = self._build_messages(self._system_prompt, input_data, session)
+
+                # Invoke LLM
+                response, usage = stream_llm(self.llm, messages, on_token=on_token, run_id=run_id)
+                self._record_usage(run_id, usage, iteration, "generation", self._observe(session, messages, usage))
+
+                # Parse response
+                output = self._parse_response(response)
+
+            metrics.incr("agent_calls", agent=label)
+            if self.output_schema and not output.success:
+                metrics.incr("agent_parse_failures", agent=label)
+                output = self._repair(output, messages, response, on_token, run_id, iteration)
             output.token_usage = usage
+            if session is not None:
+                # The repaired answer joins the history; failed answers are dropped
+                if output.success:
+                    session.commit(response if output.retries == 0 else orjson.dumps(output.artifacts).decode())
+                else:
+                    session.discard()
             
             return output
             
+        except InterruptedError:
+            if session is not None:
+                session.discard()
+            raise
         except Exception as e:
+            if session is not None:
+                session.discard()
             return AgentOutput(
                 success=False,
                 message=str(e),
                 errors=[str(e)]
             )
+
+
+def structured_output_report() -> dict[str, dict]:
+    """
+    Per-agent structured output statistics.
+
+    Returns:
+        Dict of agent id -> calls, parse failure rate and estimated prompt tokens
+        saved by native structured output.
+    """
+    from ..core.config import AGENT_CONFIG
+
+    report = {}
+    for agent_id in AGENT_CONFIG:
+        calls = metrics.get_counter("agent_calls", agent=agent_id)
+        if not calls:
+            continue
+        failures = metrics.get_counter("agent_parse_failures", agent=agent_id)
+        report[agent_id] = {
+            "calls": int(calls),
+            "structured_calls": int(metrics.get_counter("agent_structured_calls", agent=agent_id)),
+            "structured_fallbacks": int(metrics.get_counter("agent_structured_parse_fallbacks", agent=agent_id)),
+            "parse_failures": int(failures),
+            "parse_failure_rate": round(failures / calls, 3),
+            "repair_retries": int(sum(
+                metrics.get_counter("agent_retries", agent=agent_id, kind=kind)
+                for kind in ("missing_fields", "truncated", "invalid_json", "no_json")
+            )),
+            "retry_tokens": int(metrics.get_counter("agent_retry_tokens", agent=agent_id)),
+            "prompt_tokens_saved": int(metrics.get_counter("agent_prompt_tokens_saved", agent=agent_id)),
+        }
+    return report
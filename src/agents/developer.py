@@ -1,11 +1,13 @@
 """Multi-Agent QA System - Developer Agent"""
-from typing import Any
+from typing import Any, Optional
 
 from .base_agent import BaseAgent
+from .session import AgentSession
 from ..core.prompts import load_prompt
 from ..core.config import CODING_LLM_MODEL
 from ..core.llm import get_llm
 from ..core.schemas import DeveloperOutput
+from ..core.hashing import content_hash
 import re
 
 
@@ -19,9 +21,9 @@ class DeveloperAgent(BaseAgent):
     - Iterate based on review feedback
     """
     
-    def __init__(self, agent_id: str = "Developer"):
+    def __init__(self, agent_id: str = "Developer", output_schema: Optional[Any] = None):
         from ..core.schemas import DeveloperOutput
-        super().__init__(agent_id=agent_id, output_schema=DeveloperOutput)
+        super().__init__(agent_id=agent_id, output_schema=output_schema or DeveloperOutput)
         
         # Override LLM with coding model
         self.llm = get_llm(model_name=CODING_LLM_MODEL)
@@ -58,3 +60,72 @@ class DeveloperAgent(BaseAgent):
             template += f"\n\nTEST EXECUTION FAILED:\n{test_results}\n\nPlease analyze the test failures, fix the bugs in your code, and provide the fully updated code files."
             
         return template.replace("{srs}", srs)
+
+    def _build_followup_prompt(self, input_data: dict[str, Any], session: AgentSession) -> Optional[str]:
+        # The SRS and the previous code are already in the session history
+        feedback = _feedback(input_data)
+        if not feedback:
+            return None
+        return load_prompt("dev_followup").replace("{feedback}", feedback)
+
+
+class DeveloperPatchAgent(DeveloperAgent):
+    """
+    Developer Agent (iteration mode)
+
+    Responsibilities:
+    - Receive the current file tree plus feedback
+    - Return unified diffs / per-file replacements instead of the whole project
+    """
+
+    def __init__(self, agent_id: str = "Developer"):
+        from ..core.schemas import DeveloperPatchOutput
+        super().__init__(agent_id=agent_id, output_schema=DeveloperPatchOutput)
+
+    @property
+    def allowed_inputs(self) -> list[str]:
+        return ["srs", "current_files", "review", "test_results"]
+
+    def _build_system_prompt(self) -> str:
+        template = load_prompt("dev_patch_system")
+        return template.replace("{name}", self.name)
+
+    def _build_user_prompt(self, input_data: dict[str, Any]) -> str:
+        srs = input_data.get("srs", "")
+        current_files = input_data.get("current_files") or {}
+
+        template = load_prompt("dev_patch_user")
+        return (template
+                .replace("{srs}", srs)
+                .replace("{files}", _render_files(current_files))
+                .replace("{feedback}", _feedback(input_data)))
+
+    def _build_followup_prompt(self, input_data: dict[str, Any], session: AgentSession) -> Optional[str]:
+        # Files the model has seen (or produced with its own patches) are not sent again
+        feedback = _feedback(input_data)
+        if not feedback:
+            return None
+        current_files = input_data.get("current_files") or {}
+        changed = {f: c for f, c in current_files.items() if session.seen_files.get(f) != content_hash(c)}
+        deleted = sorted(f for f in session.seen_files if f not in current_files)
+
+        files = ""
+        if changed:
+            files += f"These project files changed since your last answer:\n\n{_render_files(changed)}\n\n"
+        if deleted:
+            files += f"These project files were deleted: {', '.join(deleted)}\n\n"
+        return load_prompt("dev_patch_followup").replace("{files}", files).replace("{feedback}", feedback)
+
+
+def _render_files(files: dict[str, str]) -> str:
+    return "\n\n".join(f"### {filename}\n```\n{content}\n```" for filename, content in files.items())
+
+
+def _feedback(input_data: dict[str, Any]) -> str:
+    """Review and test feedback sections of an iteration prompt."""
+    feedback = []
+    if input_data.get("review"):
+        feedback.append(f"Previous Review Feedback:\n{input_data['review']}")
+    if input_data.get("test_results"):
+        feedback.append(f"TEST EXECUTION FAILED:\n{input_data['test_results']}")
+    return "\n\n".join(feedback)
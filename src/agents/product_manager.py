@@ -28,7 +28,7 @@ class ProductManagerAgent(BaseAgent):
         
     @property
     def allowed_inputs(self) -> list[str]:
-        return ["product_idea"]
+        return ["product_idea", "reference_idea", "reference_srs"]
     
     @property
     def allowed_outputs(self) -> list[str]:
@@ -41,4 +41,11 @@ class ProductManagerAgent(BaseAgent):
     def _build_user_prompt(self, input_data: dict[str, Any]) -> str:
         product_idea = input_data.get("product_idea", "")
         template = load_prompt("pm_user")
-        return template.replace("{product_idea}", product_idea)
+        prompt = template.replace("{product_idea}", product_idea)
+        if input_data.get("reference_srs"):
+            # Warm start from the requirements of a similar earlier run
+            reference = (load_prompt("pm_warm_start")
+                         .replace("{reference_idea}", input_data.get("reference_idea", ""))
+                         .replace("{reference_srs}", input_data["reference_srs"]))
+            prompt = f"{prompt.rstrip()}\n\n{reference}"
+        return prompt
@@ -0,0 +1,181 @@
+"""Multi-Agent QA System - Targeted Output Repair
+
+When an agent's JSON cannot be parsed or validated, regenerating the whole
+answer is the most expensive fix available. This module classifies what went
+wrong and builds a short follow-up turn that only asks for the broken part:
+
+- missing_fields: JSON parsed but some fields are missing/invalid -> ask for those keys only
+- truncated:      the object never closed -> ask the model to continue where it stopped
+- invalid_json:   syntax error mid-object -> keep the valid prefix, ask for the rest
+- no_json:        nothing usable -> ask again for the JSON object only
+
+A "valid" plan means the text parses strictly and needs no retry at all.
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import orjson
+from pydantic import ValidationError
+
+
+@dataclass
+class RepairPlan:
+    """What to ask the model for, and how to combine its answer."""
+    kind: str
+    prefix: str = ""  # Valid JSON text to continue from (truncated / invalid_json)
+    partial: dict[str, Any] = field(default_factory=dict)  # Parsed fields (missing_fields)
+    fields: list[str] = field(default_factory=list)  # Fields to re-request (missing_fields)
+
+
+def _scan_object(text: str, start: int) -> tuple[int, list[int]]:
+    """
+    Walk a JSON object starting at `start`, respecting string literals.
+
+    Returns:
+        (index one past the closing brace, or -1 if the object never closes,
+         positions of top-level member separators)
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    cuts = []
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1, cuts
+        elif ch == "," and depth == 1:
+            cuts.append(i)
+    return -1, cuts
+
+
+def _loads(text: str) -> tuple[Any, Optional[json.JSONDecodeError]]:
+    """Parse JSON leniently; return (data, None) or (None, error)."""
+    try:
+        return orjson.loads(text), None
+    except Exception:
+        pass
+    try:
+        return json.loads(text, strict=False), None
+    except json.JSONDecodeError as e:
+        return None, e
+
+
+def _invalid_fields(schema: Any, data: dict) -> Optional[list[str]]:
+    """Top-level fields that fail validation ([] if valid, None if not field-specific)."""
+    try:
+        schema.model_validate(data)
+        return []
+    except ValidationError as e:
+        fields = {str(err["loc"][0]) for err in e.errors() if err.get("loc")}
+        return sorted(fields) if fields else None
+
+
+def classify_failure(response: str, schema: Any) -> RepairPlan:
+    """Work out the cheapest repair for a response that failed to parse."""
+    start = response.find("{")
+    if start == -1:
+        return RepairPlan(kind="no_json")
+
+    end, cuts = _scan_object(response, start)
+    if end == -1:
+        # Generation stopped mid-object: everything so far is the prefix
+        return RepairPlan(kind="truncated", prefix=response[start:].rstrip())
+
+    candidate = response[start:end]
+    data, error = _loads(candidate)
+    if error is None and isinstance(data, dict):
+        fields = _invalid_fields(schema, data)
+        if fields == []:
+            # Strict parsing succeeds; the agent's lenient pre-processing broke it
+            return RepairPlan(kind="valid", partial=data)
+        if fields:
+            partial = {k: v for k, v in data.items() if k not in fields}
+            return RepairPlan(kind="missing_fields", partial=partial, fields=fields)
+        return RepairPlan(kind="no_json")
+
+    # Keep every top-level member that precedes the syntax error
+    error_pos = start + error.pos if error else end
+    valid_cuts = [c for c in cuts if c < error_pos]
+    prefix = response[start:valid_cuts[-1] + 1] if valid_cuts else response[start:start + 1]
+    return RepairPlan(kind="invalid_json", prefix=prefix)
+
+
+def build_repair_messages(plan: RepairPlan, messages: list[dict], response: str, schema: Any) -> list[dict]:
+    """
+    Build the follow-up conversation for a repair attempt.
+
+    The original messages are kept verbatim so the backend can reuse its
+    prompt cache; only the final turns differ.
+    """
+    if plan.kind in ("truncated", "invalid_json"):
+        reason = "was cut off" if plan.kind == "truncated" else "became invalid JSON after this point"
+        return messages + [
+            {"role": "assistant", "content": plan.prefix},
+            {"role": "user", "content": (
+                f"Your previous JSON response {reason}. Continue the JSON object EXACTLY from where "
+                "the text above ends. Do not repeat any earlier content and do not use a code block."
+            )},
+        ]
+
+    if plan.kind == "missing_fields":
+        properties = schema.model_json_schema().get("properties", {})
+        sub_schema = {name: properties.get(name, {}) for name in plan.fields}
+        return messages + [
+            {"role": "assistant", "content": response},
+            {"role": "user", "content": (
+                f"Your JSON is missing or has invalid values for: {', '.join(plan.fields)}. "
+                "Respond with ONLY a JSON object containing these keys. "
+                f"Schema for the keys: {orjson.dumps(sub_schema).decode()}"
+            )},
+        ]
+
+    return messages + [
+        {"role": "assistant", "content": response},
+        {"role": "user", "content": (
+            "Your response did not contain the required JSON object. "
+            "Respond again with ONLY the JSON object, wrapped in a ```json code block."
+        )},
+    ]
+
+
+def _strip_fence(text: str) -> str:
+    """Drop a leading markdown code fence a model may add to a continuation."""
+    if text.lstrip().startswith("```"):
+        text = text.lstrip()
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text
+
+
+def combine_repair(plan: RepairPlan, repair_response: str) -> str:
+    """Merge the repair answer with what was kept, returning a full response to parse."""
+    if plan.kind in ("truncated", "invalid_json"):
+        return plan.prefix + _strip_fence(repair_response)
+
+    if plan.kind == "missing_fields":
+        start = repair_response.find("{")
+        end, _ = _scan_object(repair_response, start) if start != -1 else (-1, [])
+        data, error = _loads(repair_response[start:end]) if end != -1 else (None, None)
+        if isinstance(data, dict):
+            merged = dict(plan.partial)
+            merged.update({k: v for k, v in data.items() if k in plan.fields})
+            return orjson.dumps(merged).decode()
+        return repair_response
+
+    return repair_response
@@ -1,7 +1,8 @@
 """Multi-Agent QA System - Reviewer Agent"""
-from typing import Any
+from typing import Any, Optional
 
 from .base_agent import BaseAgent
+from .session import AgentSession
 from ..core.prompts import load_prompt
 
 
@@ -19,7 +20,7 @@ class ReviewerAgent(BaseAgent):
         
     @property
     def allowed_inputs(self) -> list[str]:
-        return ["srs", "code"]
+        return ["srs", "code", "files", "prior_findings"]
     
     @property
     def allowed_outputs(self) -> list[str]:
@@ -32,5 +33,29 @@ class ReviewerAgent(BaseAgent):
     def _build_user_prompt(self, input_data: dict[str, Any]) -> str:
         srs = input_data.get("srs", "")
         code = input_data.get("code", "")
-        template = load_prompt("reviewer_user")
-        return template.replace("{srs}", srs).replace("{code}", code)
+        files = input_data.get("files")
+
+        if files is None:
+            template = load_prompt("reviewer_user")
+            return template.replace("{srs}", srs).replace("{code}", code)
+
+        # Incremental review: only changed files, plus a summary of earlier verdicts
+        changed = "\n\n".join(f"### {filename}\n```\n{content}\n```" for filename, content in files.items())
+        prior_findings = input_data.get("prior_findings") or "None (first review)."
+        template = load_prompt("reviewer_incremental_user")
+        return (template
+                .replace("{srs}", srs)
+                .replace("{code}", code)
+                .replace("{files}", changed or "None.")
+                .replace("{prior_findings}", prior_findings))
+
+    def _build_followup_prompt(self, input_data: dict[str, Any], session: AgentSession) -> Optional[str]:
+        files = input_data.get("files")
+        if files is None:
+            return None
+        # The SRS and the earlier files are already in the session history
+        changed = "\n\n".join(f"### {filename}\n```\n{content}\n```" for filename, content in files.items())
+        return (load_prompt("reviewer_followup")
+                .replace("{code}", input_data.get("code", ""))
+                .replace("{files}", changed or "None.")
+                .replace("{prior_findings}", input_data.get("prior_findings") or "None."))
@@ -0,0 +1,139 @@
+"""Multi-Agent QA System - Agent Sessions
+
+In the Developer/Executor/Reviewer loop every iteration used to send a fresh
+[system, user] prompt with the full SRS (and file tree) and the new feedback
+appended, so Ollama re-evaluated thousands of prompt tokens per pass. A
+session keeps the conversation instead:
+
+    system, first prompt (SRS ...), answer 1, feedback 1, answer 2, feedback 2 ...
+
+Each call only appends to the message list, so the rendered prompt of the
+previous call is a prefix of the next one and Ollama reuses its KV cache for
+it. When the history would exceed SESSION_CONTEXT_FRACTION of LLM_NUM_CTX,
+the session is re-seeded with a full prompt built from the current inputs.
+
+Prompt-eval savings are estimated per call: the first (uncached) call
+calibrates tokens per character and prompt-eval time per token; later calls
+compare the estimated prompt size with the tokens Ollama actually evaluated.
+"""
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..core import config as cfg
+
+
+class AgentSession:
+    """Message history of one agent across the loop iterations of a run."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.messages: List[dict] = []
+        self.seen_files: Dict[str, str] = {}  # filename -> content hash the model last saw
+        self.turns = 0
+        self.reseeds = 0
+        self._pending: Optional[List[dict]] = None
+        self._tokens_per_char: Optional[float] = None
+        self._eval_ms_per_token: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        """True once the session has history to continue from."""
+        return len(self.messages) > 2
+
+    def prepare(self, system_prompt: str, full_prompt: Callable[[], str],
+                followup_prompt: Callable[[], Optional[str]]) -> List[dict]:
+        """
+        Messages for the next call.
+
+        Continues the history with `followup_prompt()` when possible, otherwise
+        (new session, different system prompt, no follow-up form, or history
+        too long) starts over with [system, full_prompt()].
+        """
+        messages = None
+        if self.messages and self.messages[0]["content"] == system_prompt:
+            followup = followup_prompt()
+            if followup is not None:
+                messages = self.messages + [{"role": "user", "content": followup}]
+                if self._estimate(messages) > cfg.LLM_NUM_CTX * cfg.SESSION_CONTEXT_FRACTION:
+                    messages = None
+        if messages is None:
+            if self.messages:
+                self.reseeds += 1
+            self.seen_files = {}
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": full_prompt()},
+            ]
+        self._pending = messages
+        return messages
+
+    def observe(self, messages: List[dict], usage: dict) -> Dict[str, float]:
+        """
+        Estimate the prompt tokens Ollama reused from its cache for this call.
+
+        Returns:
+            reused_prompt_tokens and prompt_eval_ms_saved (zero until calibrated)
+        """
+        evaluated = usage.get("input_tokens", 0)
+        eval_ms = usage.get("prompt_eval_ms", 0.0)
+        chars = sum(len(m["content"]) for m in messages)
+        if self._tokens_per_char is None or len(messages) == 2:
+            # Uncached by construction (new prefix): calibrate
+            if evaluated and chars:
+                self._tokens_per_char = evaluated / chars
+                if eval_ms:
+                    self._eval_ms_per_token = eval_ms / evaluated
+            return {"reused_prompt_tokens": 0, "prompt_eval_ms_saved": 0.0}
+
+        reused = max(int(chars * self._tokens_per_char) - evaluated, 0)
+        saved = round(reused * (self._eval_ms_per_token or 0.0), 1)
+        return {"reused_prompt_tokens": reused, "prompt_eval_ms_saved": saved}
+
+    def commit(self, response: str):
+        """Keep the pending exchange (the answer was usable)."""
+        if self._pending is None:
+            return
+        self.messages = self._pending + [{"role": "assistant", "content": response}]
+        self._pending = None
+        self.turns += 1
+
+    def discard(self):
+        """Forget the pending exchange (the answer was not used)."""
+        self._pending = None
+
+    def rollback(self):
+        """Undo the last committed exchange (e.g. its patch did not apply)."""
+        self.messages = self.messages[:-2] if len(self.messages) > 3 else []
+        self.seen_files = {}
+
+    def _estimate(self, messages: List[dict]) -> int:
+        chars = sum(len(m["content"]) for m in messages)
+        if self._tokens_per_char:
+            return int(chars * self._tokens_per_char)
+        return (chars + 3) // 4  # ~4 characters per token until calibrated
+
+
+class SessionStore:
+    """Sessions of the runs executing in this process."""
+
+    def __init__(self):
+        self._sessions: Dict[Tuple[str, str], AgentSession] = {}
+        self._lock = threading.Lock()
+
+    def get(self, run_id: Optional[str], name: str) -> Optional[AgentSession]:
+        """The run's session for `name`, or None when AGENT_SESSION_MODE is off."""
+        if not cfg.AGENT_SESSION_MODE or not run_id:
+            return None
+        with self._lock:
+            session = self._sessions.get((run_id, name))
+            if session is None:
+                session = self._sessions[(run_id, name)] = AgentSession(name)
+            return session
+
+    def release(self, run_id: str):
+        with self._lock:
+            for key in [key for key in self._sessions if key[0] == run_id]:
+                del self._sessions[key]
+
+
+sessions = SessionStore()
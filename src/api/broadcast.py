@@ -0,0 +1,213 @@
+"""Multi-Agent QA System - WebSocket Fan-out
+
+Every event is serialized once and offered to each client's bounded queue
+without awaiting; a per-client sender task drains the queue. A slow
+client therefore only delays itself:
+
+- queue full -> the client is downgraded to "coalesced" mode: further events
+  go to an ordered backlog where consecutive thought chunks of the same
+  run/agent are merged into one block; the backlog moves into the queue as
+  it drains, then the client returns to live mode
+- backlog full -> events are dropped for that client
+- lagging longer than WS_EVICT_AFTER_LAG_SECONDS, too many drops, or a send
+  that exceeds WS_SEND_TIMEOUT_SECONDS -> the client is evicted
+
+A client may also be restricted to one run, and may ask for a replay of that
+run's buffered events (see event_buffer.py) before it goes live.
+"""
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi import WebSocket
+
+from ..core import metrics
+from ..core.config import (
+    WS_CLIENT_QUEUE_SIZE,
+    WS_SEND_TIMEOUT_SECONDS,
+    WS_EVICT_AFTER_LAG_SECONDS,
+    WS_EVICT_AFTER_DROPS,
+    WS_COALESCE_FLUSH_SECONDS,
+)
+
+_client_ids = itertools.count(1)
+
+
+class ClientChannel:
+    """One websocket connection with its own send queue and sender task."""
+
+    def __init__(self, websocket: WebSocket, max_queue: int = WS_CLIENT_QUEUE_SIZE,
+                 run_filter: Optional[str] = None):
+        self.id = next(_client_ids)
+        self.websocket = websocket
+        self.run_filter = run_filter
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.mode = "live"
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.lagging_since: Optional[float] = None
+        self.closed = False
+        self.task: Optional[asyncio.Task] = None
+        # Coalesced mode: events waiting for queue room, in order. Entries are
+        # payload strings or {"key": (run_id, agent), "message": merged chunk}.
+        self._backlog: deque = deque()
+
+    def offer(self, message: Dict[str, Any], payload: str) -> bool:
+        """
+        Queue a pre-serialized event without blocking.
+
+        Returns:
+            False if the client should be evicted
+        """
+        if self.closed:
+            return False
+        if self.run_filter and message.get("data", {}).get("run_id") != self.run_filter:
+            return True
+
+        if self.mode == "coalesced":
+            self._defer(message, payload)
+        else:
+            try:
+                self.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self.lagging_since = time.monotonic()
+                self.mode = "coalesced"
+                metrics.incr("ws_client_downgrades")
+                self._defer(message, payload)
+
+        if self.lagging_since is not None:
+            lag = time.monotonic() - self.lagging_since
+            if lag > WS_EVICT_AFTER_LAG_SECONDS or self.dropped > WS_EVICT_AFTER_DROPS:
+                return False
+        return True
+
+    def _defer(self, message: Dict[str, Any], payload: str):
+        """Add an event to the ordered backlog, merging consecutive thought chunks."""
+        if message.get("type") == "thought_chunk":
+            data = message.get("data", {})
+            key = (data.get("run_id"), data.get("agent"))
+            last = self._backlog[-1] if self._backlog else None
+            if isinstance(last, dict) and last["key"] == key:
+                merged = last["message"]
+                merged["data"]["chunk"] = merged["data"].get("chunk", "") + data.get("chunk", "")
+                for field in ("timestamp", "seq"):
+                    if field in message:
+                        merged[field] = message[field]
+                self.coalesced += 1
+                return
+            entry = {"key": key, "message": {**message, "data": {**data, "coalesced": True}}}
+        else:
+            entry = payload
+
+        if len(self._backlog) >= self.queue.maxsize:
+            self.dropped += 1
+            metrics.incr("ws_events_dropped")
+            return
+        self._backlog.append(entry)
+
+    def _flush_backlog(self):
+        """Move backlog entries into the queue, in order, while there is room."""
+        while self._backlog and not self.queue.full():
+            entry = self._backlog.popleft()
+            if isinstance(entry, dict):
+                entry = orjson.dumps(entry["message"]).decode()
+            self.queue.put_nowait(entry)
+
+    async def run_sender(self, on_evict):
+        """Drain the queue to the socket; evict on send errors or timeouts."""
+        try:
+            while not self.closed:
+                try:
+                    payload = await asyncio.wait_for(self.queue.get(), timeout=WS_COALESCE_FLUSH_SECONDS)
+                except asyncio.TimeoutError:
+                    payload = None
+
+                if payload is not None:
+                    await asyncio.wait_for(self.websocket.send_text(payload), timeout=WS_SEND_TIMEOUT_SECONDS)
+                    self.delivered += 1
+
+                if self.mode == "coalesced" and self.queue.qsize() <= self.queue.maxsize // 2:
+                    self._flush_backlog()
+                    if not self._backlog:
+                        self.mode = "live"
+                        self.lagging_since = None
+        except Exception:
+            # Includes send timeouts: a stalled socket must not hold its queue forever
+            await on_evict(self)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "client_id": self.id,
+            "run_filter": self.run_filter,
+            "mode": self.mode,
+            "queued": self.queue.qsize(),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "coalesced_chunks": self.coalesced,
+            "lagging": self.lagging_since is not None,
+            "lag_seconds": round(time.monotonic() - self.lagging_since, 3) if self.lagging_since else 0.0,
+        }
+
+
+class ConnectionManager:
+    """Serialize-once, non-blocking broadcast to all connected clients."""
+
+    def __init__(self):
+        self.clients: Dict[int, ClientChannel] = {}
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return [client.websocket for client in self.clients.values()]
+
+    async def connect(self, websocket: WebSocket, run_filter: Optional[str] = None,
+                      replay: Optional[Callable[[], List[Tuple[Dict[str, Any], str]]]] = None) -> ClientChannel:
+        """
+        Accept a client and start its sender.
+
+        Args:
+            run_filter: Only deliver events of this run
+            replay: Returns (message, payload) pairs to send before live events
+        """
+        await websocket.accept()
+        client = ClientChannel(websocket, run_filter=run_filter)
+        # No await between taking the replay snapshot and registering the
+        # client: every later event reaches it live, none twice
+        if replay is not None:
+            for message, payload in replay():
+                client.offer(message, payload)
+            metrics.incr("ws_replays")
+        self.clients[client.id] = client
+        client.task = asyncio.create_task(client.run_sender(self.evict))
+        metrics.incr("ws_connections")
+        return client
+
+    def disconnect(self, client: ClientChannel):
+        client.closed = True
+        self.clients.pop(client.id, None)
+        if client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    async def evict(self, client: ClientChannel):
+        """Drop a client that cannot keep up (or whose socket is dead)."""
+        if client.id not in self.clients:
+            return
+        metrics.incr("ws_evictions")
+        self.disconnect(client)
+        try:
+            await client.websocket.close(code=1013)  # Try again later
+        except Exception:
+            pass
+
+    async def broadcast(self, message: dict, payload: Optional[str] = None):
+        if payload is None:
+            payload = orjson.dumps(message).decode()
+        for client in list(self.clients.values()):
+            if not client.offer(message, payload):
+                asyncio.create_task(self.evict(client))
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [client.stats() for client in self.clients.values()]
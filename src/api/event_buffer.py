@@ -0,0 +1,200 @@
+"""Multi-Agent QA System - Per-Run Event Replay Buffer
+
+Keeps the recent events of each run in memory so a client that connects
+mid-run (or reconnects after a blip) can subscribe "from sequence N" instead
+of rebuilding its state from the artifact endpoints.
+
+Thought chunks are compacted as they arrive: the chunks of one agent's
+stream form a single block entry (closed by that agent's next start/complete
+event), which records the sequence number and text offset of every chunk. A
+replay therefore sends one text block per agent stream, cut exactly at the
+requested sequence, followed by the other events in order.
+
+All methods run on the server's event loop; no locking is needed.
+"""
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from ..core.config import EVENT_BUFFER_SIZE, EVENT_BUFFER_RETAINED_RUNS
+from ..core.events import WorkflowEventType
+
+Replayed = Tuple[Dict[str, Any], str]  # (message, serialized payload)
+
+# Events that end an agent's thought stream block
+_BLOCK_BOUNDARIES = {WorkflowEventType.AGENT_START.value, WorkflowEventType.AGENT_COMPLETE.value}
+# Events after which a run only stays buffered for late joiners
+_RUN_END = {WorkflowEventType.WORKFLOW_COMPLETE.value, WorkflowEventType.WORKFLOW_PAUSED.value}
+
+
+class _ThoughtBlock:
+    """Consecutive thought chunks of one agent, stored as one text block."""
+
+    def __init__(self, message: Dict[str, Any]):
+        self.template = message
+        self.seqs: List[int] = []
+        self.offsets: List[int] = []
+        self.parts: List[str] = []
+        self.length = 0
+        self.timestamp = message.get("timestamp")
+
+    @property
+    def last_seq(self) -> int:
+        return self.seqs[-1]
+
+    def add(self, message: Dict[str, Any]):
+        chunk = message.get("data", {}).get("chunk", "")
+        self.seqs.append(message["seq"])
+        self.offsets.append(self.length)
+        self.parts.append(chunk)
+        self.length += len(chunk)
+        self.timestamp = message.get("timestamp", self.timestamp)
+
+    def since(self, seq: int) -> Optional[Replayed]:
+        """One compacted chunk with everything after `seq`, or None."""
+        index = bisect_right(self.seqs, seq)
+        if index == len(self.seqs):
+            return None
+        if len(self.parts) > 1:
+            self.parts = ["".join(self.parts)]
+        message = {
+            **self.template,
+            "data": {**self.template["data"], "chunk": self.parts[0][self.offsets[index]:], "compacted": len(self.seqs) - index},
+            "timestamp": self.timestamp,
+            "seq": self.last_seq,
+        }
+        return message, orjson.dumps(message).decode()
+
+
+class RunEventBuffer:
+    """Bounded ring of one run's events (thought blocks count as one entry)."""
+
+    def __init__(self, run_id: str, size: int = EVENT_BUFFER_SIZE):
+        self.run_id = run_id
+        self.size = size
+        self.entries: deque = deque()
+        self.open_blocks: Dict[str, _ThoughtBlock] = {}
+        self.last_seq = 0
+        self.evicted_through = 0  # Highest sequence number no longer replayable
+        self.finished = False
+
+    def append(self, message: Dict[str, Any], payload: str):
+        seq = message["seq"]
+        event_type = message.get("type")
+        agent = message.get("data", {}).get("agent")
+
+        if event_type == WorkflowEventType.THOUGHT_CHUNK.value:
+            block = self.open_blocks.get(agent)
+            if block is None:
+                block = self.open_blocks[agent] = _ThoughtBlock(message)
+                self.entries.append(block)
+            block.add(message)
+        else:
+            if event_type in _BLOCK_BOUNDARIES:
+                self.open_blocks.pop(agent, None)
+            self.entries.append((seq, message, payload))
+
+        self.last_seq = max(self.last_seq, seq)
+        while len(self.entries) > self.size:
+            evicted = self.entries.popleft()
+            if isinstance(evicted, _ThoughtBlock):
+                self.evicted_through = max(self.evicted_through, evicted.last_seq)
+                self.open_blocks = {a: b for a, b in self.open_blocks.items() if b is not evicted}
+            else:
+                self.evicted_through = max(self.evicted_through, evicted[0])
+
+    def replay(self, since: int) -> Tuple[Dict[str, Any], List[Replayed]]:
+        """
+        Events after `since`, in order, with thought streams compacted.
+
+        Returns:
+            (replay info, [(message, payload), ...])
+        """
+        # A client ahead of us saw an earlier server process: start over
+        reset = since > self.last_seq
+        if reset:
+            since = 0
+
+        items: List[Replayed] = []
+        for entry in self.entries:
+            if isinstance(entry, _ThoughtBlock):
+                replayed = entry.since(since)
+                if replayed:
+                    items.append(replayed)
+            elif entry[0] > since:
+                items.append((entry[1], entry[2]))
+
+        info = {
+            "run_id": self.run_id,
+            "since": since,
+            "last_seq": self.last_seq,
+            "events": len(items),
+            "gap": since < self.evicted_through,
+            "reset": reset,
+        }
+        return info, items
+
+
+class EventBuffers:
+    """Replay buffers for active runs plus the most recently finished ones."""
+
+    def __init__(self, size: int = EVENT_BUFFER_SIZE, retained_runs: int = EVENT_BUFFER_RETAINED_RUNS):
+        self.size = size
+        self.retained_runs = retained_runs
+        self.runs: "OrderedDict[str, RunEventBuffer]" = OrderedDict()
+
+    def append(self, message: Dict[str, Any], payload: str):
+        """Record a dispatched event (must carry `seq` and `data.run_id`)."""
+        run_id = message.get("data", {}).get("run_id")
+        if not run_id or message.get("seq") is None:
+            return
+
+        buffer = self.runs.get(run_id)
+        if buffer is None:
+            buffer = self.runs[run_id] = RunEventBuffer(run_id, self.size)
+        buffer.append(message, payload)
+
+        if message.get("type") in _RUN_END:
+            buffer.finished = True
+            self.runs.move_to_end(run_id)
+            self._evict_finished()
+        else:
+            buffer.finished = False
+
+    def _evict_finished(self):
+        finished = [run_id for run_id, buffer in self.runs.items() if buffer.finished]
+        for run_id in finished[:max(len(finished) - self.retained_runs, 0)]:
+            del self.runs[run_id]
+
+    def replay(self, run_id: str, since: int = 0) -> List[Replayed]:
+        """
+        Replay for a subscriber: a "replay" header followed by the events.
+
+        The header tells the client where the replay ends (`last_seq`) and
+        whether events between `since` and the oldest buffered one were lost
+        (`gap`), in which case it should refresh from the REST endpoints.
+        """
+        buffer = self.runs.get(run_id)
+        if buffer is None:
+            # Never seen or already dropped: the client has to refresh from REST
+            info = {"run_id": run_id, "since": since, "last_seq": 0, "events": 0, "gap": True, "reset": False}
+            items = []
+        else:
+            info, items = buffer.replay(since)
+        header = {"type": WorkflowEventType.REPLAY.value, "data": info, "timestamp": datetime.now().isoformat()}
+        return [(header, orjson.dumps(header).decode())] + items
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "run_id": run_id,
+                "entries": len(buffer.entries),
+                "last_seq": buffer.last_seq,
+                "evicted_through": buffer.evicted_through,
+                "finished": buffer.finished,
+            }
+            for run_id, buffer in self.runs.items()
+        ]
@@ -1,29 +1,31 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, BackgroundTasks, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 import asyncio
-import queue
+import time
 from datetime import datetime
 import orjson
-import sqlite3
-from langgraph.checkpoint.sqlite import SqliteSaver
 
-# Database Path
-DB_PATH = "data/checkpoints.sqlite"
-
-# Create connection
-conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+from ..workflow.graph import create_qa_graph
+from ..workflow.runner import get_checkpointer
+from ..core import event_log, metrics
+from ..core.broker import get_broker
+from ..core.config import ARTIFACTS_DIR, EMBEDDED_WORKERS, BROKER_POLL_INTERVAL_SECONDS
+
+from ..core.run_manager import get_run_metadata, list_all_runs, update_run_status
+from ..core.archive import find_run_file, read_run_file, start_archiver
+from ..core.idea_index import idea_index, load_requirements
+from ..core.search_index import search_index
+from ..core.token_ledger import ledger
+from .broadcast import ConnectionManager
+from .event_buffer import EventBuffers
 
 # Global Checkpointer (SQLite Persistence)
-checkpointer = SqliteSaver(conn)
-
-from ..workflow.graph import create_qa_graph
-from ..workflow.state import AgentState
-from ..core.events import WorkflowEvent, WorkflowEventType, STOPPED_RUNS
-from ..core.config import ARTIFACTS_DIR, HITL_CONFIG
+checkpointer = get_checkpointer()
 
-from ..core.run_manager import save_run_metadata, list_all_runs, update_run_status
+# Jobs, events and stop signals (in-process or shared between processes)
+broker = get_broker()
 
 app = FastAPI(title="Multi-Agent QA System API")
 
@@ -36,46 +38,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global Event Queue (Thread-safe)
-# Global event queue
-event_queue = queue.Queue()
-
 @app.post("/stop/{run_id}")
-async def stop_workflow(run_id: str):
-    """Signal a workflow to stop."""
-    STOPPED_RUNS.add(run_id)
+def stop_workflow(run_id: str):
+    """Signal a workflow to stop (whichever worker process executes it)."""
+    broker.send_control(run_id, "stop")
     update_run_status(run_id, "stopped")
     return {"status": "stopping", "run_id": run_id}
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(orjson.dumps(message).decode())
-            except Exception:
-                pass  # Handle disconnects gracefully
-
 manager = ConnectionManager()
+event_buffers = EventBuffers()
 
-# Background task to process events from Queue -> WebSockets
+# Background task to process events from the broker -> WebSockets
 async def event_processor():
+    subscription = broker.subscribe()
     while True:
         try:
-            if not event_queue.empty():
-                event: WorkflowEvent = event_queue.get()
-                await manager.broadcast(event.to_dict())
-            else:
-                await asyncio.sleep(0.1)
+            # Events arrive already numbered by the run that emitted them
+            items = subscription.read()
+            if not items:
+                await asyncio.sleep(BROKER_POLL_INTERVAL_SECONDS)
+                continue
+            for message, payload in items:
+                event_buffers.append(message, payload)
+                await manager.broadcast(message, payload)
         except Exception as e:
             print(f"Error in event processor: {e}")
             await asyncio.sleep(1)
@@ -83,134 +68,58 @@ async def event_processor():
 @app.on_event("startup")
 async def startup_event():
     asyncio.create_task(event_processor())
+    # Catch up on runs written while the API was down (changed files only)
+    search_index.reindex()
+    start_archiver()
+    if EMBEDDED_WORKERS:
+        from ..worker import start_workers
+        start_workers(broker, EMBEDDED_WORKERS)
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, run_id: Optional[str] = None,
+                             since: Optional[int] = None, only_run: bool = False):
+    """
+    Live event stream.
+
+    `?run_id=<id>&since=<seq>` first replays that run's buffered events after
+    `seq` (0 for everything still buffered), then continues live.
+    `only_run=true` restricts the stream to that run.
+    """
+    replay = None
+    if run_id and since is not None:
+        replay = lambda: event_buffers.replay(run_id, since)
+    client = await manager.connect(websocket, run_filter=run_id if only_run else None, replay=replay)
     try:
         while True:
             await websocket.receive_text()  # Keep connection alive
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: socket already closed by an eviction
+        manager.disconnect(client)
+
+@app.get("/ws/stats")
+async def websocket_stats():
+    """Per-client delivered / dropped / lagging counters."""
+    return {"clients": manager.stats(), "replay_buffers": event_buffers.stats(), "broker": broker.stats()}
 
 class RunRequest(BaseModel):
     product_idea: str
     hitl_enabled: bool = False
+    token_budget: Optional[int] = None  # Max input+output tokens (default: RUN_TOKEN_BUDGET)
+    budget_action: Optional[Literal["degrade", "stop"]] = None  # Default: RUN_BUDGET_ACTION
+    reuse: Optional[Literal["off", "suggest", "auto"]] = None  # Requirements reuse (default: IDEA_REUSE_MODE)
+    reuse_run_id: Optional[str] = None  # Reuse this run's MRS/SRS as they are
 
 class ResumeRequest(BaseModel):
     hitl_enabled: bool = True
 
-def run_orchestrator(product_idea: str, run_id: str, hitl_enabled: bool):
-# ... (rest of run_orchestrator remains same until graph creation)
-    """Run LangGraph workflow in a thread."""
-    
-    # Save Metadata
-    save_run_metadata(run_id, product_idea)
-    
-    # Structured Logging
-    from ..core.log_manager import log_agent_start, log_completion, log_artifact, log_json
-
-    def emit(type: WorkflowEventType, data: dict):
-        # Inject run_id into event data for frontend correlation
-        data["run_id"] = run_id
-        
-        # Thought Stream Unescaping (Affects both Terminal and UI)
-        if type == WorkflowEventType.THOUGHT_CHUNK:
-            chunk = data.get("chunk", "")
-            if not hasattr(emit, "_buffer"): emit._buffer = ""
-            emit._buffer += chunk
-            
-            if "\\" in emit._buffer:
-                emit._buffer = emit._buffer.replace("\\n", "\n").replace('\\"', '"').replace("\\t", "\t")
-            
-            # Collapse multiple newlines (3+) into 2 to prevent huge gaps
-            # We do this only on the unescaped buffer
-            import re
-            emit._buffer = re.sub(r'\n{3,}', '\n\n', emit._buffer)
-
-            if not emit._buffer.endswith("\\"):
-                # Update the chunk in data so UI gets the unescaped version
-                data["chunk"] = emit._buffer
-                print(emit._buffer, end="", flush=True)
-                emit._buffer = ""
-            else:
-                # If we have a trailing backslash, it's a partial escape
-                # Don't send this chunk yet, wait for the next part
-                return
-
-        event_queue.put(WorkflowEvent(type=type, data=data))
-        
-        # Other Terminal Output
-        if type == WorkflowEventType.AGENT_START:
-            log_agent_start(data.get("agent"), data.get("role"))
-        elif type == WorkflowEventType.ARTIFACT_GENERATED:
-            log_artifact(data.get("agent"), data.get("filename"), data.get("type"))
-        elif type == WorkflowEventType.AGENT_COMPLETE:
-            log_completion(data.get("agent"), data.get("success"))
-        elif type == WorkflowEventType.WORKFLOW_COMPLETE:
-            print("\n") # Newline after stream
-            if data["status"] == "success":
-                print("✓ Workflow Finished")
-            else:
-                print("✗ Workflow Error")
-        
-    try:
-        emit(WorkflowEventType.WORKFLOW_START, {"product_idea": product_idea, "run_id": run_id})
-        
-        # Initial State
-        initial_state: AgentState = {
-            "run_id": run_id,
-            "product_idea": product_idea,
-            "mrs": None,
-            "srs": None,
-            "test_strategy": None,
-            "step": None,
-            "test_plan": None,
-            "task_assignments": None,
-            "automation_tests": None,
-            "manual_tests": None,
-            "bugs": [],
-            "errors": [],
-            "logs": []
-        }
-        
-        # Determine interrupts
-        interrupt_before = []
-        if hitl_enabled:
-            # Pause before Test Manager and Test Lead and Automation/Manual
-            # interruption happens BEFORE the node executes.
-            # We want to pause AFTER PM (before TestManager), AFTER TestManager (before TestLead)
-            interrupt_before = HITL_CONFIG["interrupt_before"]
-            
-        graph = create_qa_graph(checkpointer=checkpointer, interrupt_before=interrupt_before)
-        
-        # Invoke with thread_id for persistence
-        config = {"configurable": {"thread_id": run_id, "emitter": emit}}
-        
-        # Use invoke for synchronous execution derived from graph
-        final_state = graph.invoke(initial_state, config=config)
-        
-        # Check if we finished or paused
-        snapshot = graph.get_state(config)
-        if snapshot.next:
-            # We are paused
-            emit(WorkflowEventType.WORKFLOW_PAUSED, {"next": snapshot.next})
-            update_run_status(run_id, "paused")
-        else:
-            status = "success" if not final_state.get("errors") else "error"
-            total_tokens = final_state.get("total_tokens", 0)
-            
-            emit(WorkflowEventType.WORKFLOW_COMPLETE, {"status": status, "total_tokens": total_tokens})
-            update_run_status(run_id, status, total_tokens=total_tokens)
-        
-    except Exception as e:
-        print(f"Graph execution failed: {e}")
-        emit(WorkflowEventType.ERROR, {"message": str(e)})
-        emit(WorkflowEventType.WORKFLOW_COMPLETE, {"status": "error"})
-        update_run_status(run_id, "error")
+class ForkRequest(BaseModel):
+    checkpoint_id: Optional[str] = None  # Latest checkpoint if omitted
+    overrides: Dict[str, Any] = {}  # State values to replace, e.g. {"review": None}
+    start: bool = True  # Resume the fork immediately
+    hitl_enabled: bool = False
 
 @app.post("/run")
-async def run_workflow(request: RunRequest, background_tasks: BackgroundTasks):
+async def run_workflow(request: RunRequest):
     """Start the multi-agent workflow."""
     # Generate Run ID with Product Slug
     import re
@@ -218,71 +127,62 @@ async def run_workflow(request: RunRequest, background_tasks: BackgroundTasks):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     run_id = f"{timestamp}_{slug}"
     
-    # Run in background thread to not block main loop
-    background_tasks.add_task(run_orchestrator, request.product_idea, run_id, request.hitl_enabled)
-    return {"status": "started", "run_id": run_id, "message": "Workflow started in background"}
+    budget = {}
+    if request.token_budget is not None:
+        budget["max_total_tokens"] = request.token_budget
+    if request.budget_action:
+        budget["action"] = request.budget_action
+
+    if request.reuse_run_id and load_requirements(request.reuse_run_id) is None:
+        raise HTTPException(status_code=404, detail=f"Run {request.reuse_run_id} has no requirements to reuse")
+    plan = idea_index.plan_reuse(request.product_idea, mode=request.reuse, run_id=request.reuse_run_id)
+    reuse = {k: plan[k] for k in ("action", "run_id", "score")} if plan["action"] else None
+
+    # Executed by the next free run worker
+    broker.submit_job("run", {"product_idea": request.product_idea, "run_id": run_id, "hitl_enabled": request.hitl_enabled,
+                              "token_budget": budget, "requirements_reuse": reuse})
+    return {"status": "started", "run_id": run_id, "message": "Workflow started in background",
+            "requirements_reuse": reuse, "similar_runs": plan["similar"]}
+
+@app.get("/search")
+def search_artifacts(q: str, limit: int = 20, run_id: Optional[str] = None, kind: Optional[str] = None):
+    """Full-text search over all runs' artifacts; `kind` is requirements, testing, bugs or source."""
+    started = time.perf_counter()
+    results = search_index.search(q, limit=limit, run_id=run_id, kind=kind)
+    return {"query": q, "results": results, "took_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+@app.get("/ideas/similar")
+def similar_ideas(q: str, limit: int = 5):
+    """Earlier runs whose product idea and requirements are most similar to `q`."""
+    return {"query": q, "similar_runs": idea_index.search(q, limit=limit)}
 
 @app.post("/resume/{run_id}")
-async def resume_workflow(run_id: str, request: ResumeRequest, background_tasks: BackgroundTasks):
+async def resume_workflow(run_id: str, request: ResumeRequest):
     """Resume a paused workflow."""
-    
-    def resume_task():
-        # Re-create graph
-        interrupt_before = HITL_CONFIG["interrupt_before"] if request.hitl_enabled else []
-        graph = create_qa_graph(checkpointer=checkpointer, interrupt_before=interrupt_before)
-        
-        def emit(type: WorkflowEventType, data: dict):
-            data["run_id"] = run_id
-            
-            # Thought Stream Unescaping
-            if type == WorkflowEventType.THOUGHT_CHUNK:
-                chunk = data.get("chunk", "")
-                if not hasattr(emit, "_buffer"): emit._buffer = ""
-                emit._buffer += chunk
-                
-                if "\\" in emit._buffer:
-                    emit._buffer = emit._buffer.replace("\\n", "\n").replace('\\"', '"').replace("\\t", "\t")
-                
-                # Collapse multiple newlines
-                import re
-                emit._buffer = re.sub(r'\n{3,}', '\n\n', emit._buffer)
-
-                if not emit._buffer.endswith("\\"):
-                    data["chunk"] = emit._buffer
-                    print(emit._buffer, end="", flush=True)
-                    emit._buffer = ""
-                else:
-                    return
-
-            event_queue.put(WorkflowEvent(type=type, data=data))
-
-        config = {"configurable": {"thread_id": run_id, "emitter": emit}}
-        
-        try:
-            # Resume by invoking with None (inputs are loaded from checkpoint)
-            emit(WorkflowEventType.PHASE_START, {"phase": "Resuming Workflow", "agent": "System"})
-            
-            # Run the next step(s)
-            final_state = graph.invoke(None, config=config)
-            
-            # Check status again
-            snapshot = graph.get_state(config)
-            if snapshot.next:
-                emit(WorkflowEventType.WORKFLOW_PAUSED, {"next": snapshot.next})
-                update_run_status(run_id, "paused")
-            else:
-                status = "success" if not final_state.get("errors") else "error"
-                total_tokens = final_state.get("total_tokens", 0)
-                emit(WorkflowEventType.WORKFLOW_COMPLETE, {"status": status, "total_tokens": total_tokens})
-                update_run_status(run_id, status, total_tokens=total_tokens)
-                
-        except Exception as e:
-            print(f"Resume failed: {e}")
-            emit(WorkflowEventType.ERROR, {"message": str(e)})
-
-    background_tasks.add_task(resume_task)
+    broker.submit_job("resume", {"run_id": run_id, "hitl_enabled": request.hitl_enabled})
     return {"status": "resumed", "run_id": run_id}
 
+@app.get("/runs/{run_id}/checkpoints")
+async def get_run_checkpoints(run_id: str, limit: int = 50):
+    """List a run's checkpoints (newest first) to choose a fork point."""
+    from ..workflow.fork import list_checkpoints
+    graph = create_qa_graph(checkpointer=checkpointer)
+    return {"run_id": run_id, "checkpoints": list_checkpoints(graph, run_id, limit=limit)}
+
+@app.post("/runs/{run_id}/fork")
+async def fork_workflow(run_id: str, request: ForkRequest):
+    """Create a new run from a checkpoint of an existing run, sharing its artifacts."""
+    from ..workflow.fork import fork_run
+    try:
+        new_run_id = fork_run(checkpointer, run_id, checkpoint_id=request.checkpoint_id, overrides=request.overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=404 if "No checkpoint" in str(e) else 400, detail=str(e))
+    
+    if request.start:
+        await resume_workflow(new_run_id, ResumeRequest(hitl_enabled=request.hitl_enabled))
+        return {"status": "started", "run_id": new_run_id, "forked_from": run_id}
+    return {"status": "paused", "run_id": new_run_id, "forked_from": run_id}
+
 @app.get("/runs")
 async def list_runs():
     """List all available runs with metadata."""
@@ -294,17 +194,66 @@ async def get_agents():
     from ..core.config import AGENT_CONFIG
     return AGENT_CONFIG
 
+@app.get("/llm/backends")
+async def get_llm_backends():
+    """Health, models and load of the LLM backend pool."""
+    from ..core.backends import backend_pool
+    return backend_pool.status()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Runtime metrics, including per-agent structured output statistics."""
+    from ..agents.base_agent import structured_output_report
+    return {"agents": structured_output_report(), "websocket_clients": manager.stats(), **metrics.snapshot()}
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    """Unix seconds or an ISO datetime -> Unix seconds."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+@app.get("/runs/{run_id}/events")
+def get_run_events(run_id: str, from_seq: Optional[int] = None, to_seq: Optional[int] = None,
+                   since: Optional[str] = None, until: Optional[str] = None, limit: int = 1000):
+    """Read a sequence or time range of a run's persisted event log."""
+    try:
+        from_ts, to_ts = _parse_time(since), _parse_time(until)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since/until must be Unix seconds or ISO datetimes")
+    event_log.writer.flush(timeout=1.0)  # Include events still queued for writing
+    events = event_log.read_events(run_id, from_seq, to_seq, from_ts, to_ts, limit=limit + 1)
+    more = len(events) > limit
+    events = events[:limit]
+    return {
+        "run_id": run_id,
+        "events": events,
+        "next_seq": events[-1].get("seq", 0) + 1 if more else None,
+    }
+
+@app.get("/runs/{run_id}/tokens")
+def get_run_tokens(run_id: str):
+    """Token usage of a run by agent, model and Developer/Reviewer iteration."""
+    metadata = get_run_metadata(run_id)
+    if metadata is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    report = ledger.summary(run_id)
+    report.setdefault("budget", metadata.get("token_budget"))
+    return {"run_id": run_id, **report}
 
 @app.get("/runs/{run_id}/artifacts")
 async def get_run_artifacts(run_id: str):
     """Get list of artifacts for a specific run."""
     run_dir = ARTIFACTS_DIR / run_id
-    manifest_file = run_dir / "artifacts_manifest.json"
+    # Served from bundle.zip for archived runs
+    manifest = read_run_file(run_id, "artifacts_manifest.json")
     
-    if manifest_file.exists():
+    if manifest is not None:
         try:
-            manifest = orjson.loads(manifest_file.read_text())
-            return {"artifacts": manifest}
+            return {"artifacts": orjson.loads(manifest)}
         except:
             return {"artifacts": []}
     
@@ -325,15 +274,18 @@ async def get_run_artifacts(run_id: str):
 async def get_artifact(filename: str, run_id: Optional[str] = None):
     """Fetch artifact content by filename, optionally for a specific run."""
     try:
-        # Search area
-        search_dir = ARTIFACTS_DIR
         if run_id:
-            search_dir = ARTIFACTS_DIR / run_id
-            if not search_dir.exists():
+            if not (ARTIFACTS_DIR / run_id).exists():
                  return {"error": "Run ID not found", "content": ""}
-        
+            # Looks in bundle.zip too (member index, no extraction)
+            path = find_run_file(run_id, filename)
+            if path is None:
+                return {"error": "File not found", "content": ""}
+            content = read_run_file(run_id, path).decode("utf-8")
+            return {"filename": filename, "content": content}
+
         # Security check logic remains similar but scoped
-        found = list(search_dir.rglob(filename))
+        found = list(ARTIFACTS_DIR.rglob(filename))
         
         if not found:
             return {"error": "File not found", "content": ""}
@@ -0,0 +1,242 @@
+"""Multi-Agent QA System - Run Archival
+
+A finished run leaves dozens of small files under artifacts/<run_id>/, plus
+the virtualenv the Executor created in src/.venv. Runs idle for longer than
+ARCHIVE_IDLE_SECONDS are archived:
+
+- .venv, __pycache__ and .pytest_cache directories are deleted
+- every other file is packed into <run_id>/bundle.zip (deflate); the zip
+  central directory is the member index, so one member is read by seeking
+  to it, without extracting the bundle
+- run bookkeeping (metadata, event log, token ledger) stays unpacked, so
+  listing runs, replaying events and token reports work as before
+
+`read_run_file` / `find_run_file` read from the directory or the bundle
+transparently. Resuming or forking a run unarchives it first; the next
+archival pass packs it again once it is idle.
+
+A lock file (<run_id>/.archive.lock) keeps archival and unarchival of the
+same run from overlapping across processes.
+"""
+import os
+import shutil
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from . import config as cfg
+from .event_log import EVENT_LOG_FILES
+from .token_ledger import LEDGER_FILE
+from .run_manager import annotate_run, get_run_metadata
+
+ARCHIVE_FILE = "bundle.zip"
+_LOCK_FILE = ".archive.lock"
+_STALE_LOCK_SECONDS = 3600
+# Read in place by the API and by resumed runs: never packed
+_KEPT_FILES = frozenset({"run_metadata.json", LEDGER_FILE, ARCHIVE_FILE, _LOCK_FILE, *EVENT_LOG_FILES})
+_DROPPED_DIRS = frozenset({".venv", "__pycache__", ".pytest_cache"})
+_ACTIVE_STATUSES = {"running"}
+
+
+def is_archived(run_id: str) -> bool:
+    return (cfg.ARTIFACTS_DIR / run_id / ARCHIVE_FILE).exists()
+
+
+def read_run_file(run_id: str, path: str) -> Optional[bytes]:
+    """Content of a file of a run (relative POSIX path), from its directory or its bundle."""
+    run_dir = cfg.ARTIFACTS_DIR / run_id
+    file = run_dir / path
+    if file.is_file():
+        return file.read_bytes()
+    bundle = run_dir / ARCHIVE_FILE
+    if not bundle.exists():
+        return None
+    with zipfile.ZipFile(bundle) as zf:
+        try:
+            return zf.read(path)
+        except KeyError:
+            return None
+
+
+def find_run_file(run_id: str, filename: str) -> Optional[str]:
+    """Relative path of the first run file named (or ending in) `filename`, like rglob."""
+    run_dir = cfg.ARTIFACTS_DIR / run_id
+    found = next(run_dir.rglob(filename), None) if run_dir.exists() else None
+    if found is not None:
+        return found.relative_to(run_dir).as_posix()
+    bundle = run_dir / ARCHIVE_FILE
+    if not bundle.exists():
+        return None
+    suffix = "/" + filename.lstrip("/")
+    with zipfile.ZipFile(bundle) as zf:
+        return next((name for name in zf.namelist() if name == filename or name.endswith(suffix)), None)
+
+
+def archive_run(run_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Drop a run's virtualenvs and pack its files into bundle.zip.
+
+    Returns:
+        Archive statistics, or None if the run was skipped (active, locked or already archived)
+    """
+    run_dir = cfg.ARTIFACTS_DIR / run_id
+    if not run_dir.is_dir() or is_archived(run_id):
+        return None
+    if (get_run_metadata(run_id) or {}).get("status") in _ACTIVE_STATUSES:
+        return None
+
+    with _run_lock(run_dir) as locked:
+        if not locked or is_archived(run_id):
+            return None
+
+        dropped = 0
+        for directory in sorted(run_dir.rglob("*"), reverse=True):
+            if directory.is_dir() and directory.name in _DROPPED_DIRS:
+                dropped += _tree_size(directory)
+                shutil.rmtree(directory, ignore_errors=True)
+
+        members = _packable(run_dir)
+        if not members:
+            return None
+        size = sum(path.stat().st_size for path in members)
+        tmp = run_dir / f".{ARCHIVE_FILE}.{os.getpid()}.tmp"
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+            for path in members:
+                zf.write(path, path.relative_to(run_dir).as_posix())
+        os.replace(tmp, run_dir / ARCHIVE_FILE)
+
+        # The bundle is complete: remove the packed files and emptied directories
+        for path in members:
+            path.unlink(missing_ok=True)
+        for directory in sorted((p for p in run_dir.rglob("*") if p.is_dir()), reverse=True):
+            try:
+                directory.rmdir()
+            except OSError:
+                pass
+
+        stats = {
+            "archived_at": datetime.now().isoformat(),
+            "files": len(members),
+            "bytes": size,
+            "bundle_bytes": (run_dir / ARCHIVE_FILE).stat().st_size,
+            "venv_bytes_dropped": dropped,
+        }
+        annotate_run(run_id, archived=stats)
+        return stats
+
+
+def unarchive_run(run_id: str) -> bool:
+    """Extract a run's bundle back into its directory (no-op if it is not archived)."""
+    run_dir = cfg.ARTIFACTS_DIR / run_id
+    if not is_archived(run_id):
+        return False
+    with _run_lock(run_dir, wait=True) as locked:
+        bundle = run_dir / ARCHIVE_FILE
+        if not locked or not bundle.exists():
+            return False
+        with zipfile.ZipFile(bundle) as zf:
+            for name in zf.namelist():
+                target = run_dir / name
+                if target.exists():
+                    continue  # Written after archival (should not happen): keep the newer file
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(zf.read(name))
+        bundle.unlink()
+        annotate_run(run_id, archived=None)
+        return True
+
+
+def archive_idle_runs(idle_seconds: Optional[float] = None) -> List[str]:
+    """Archive every run whose files have not changed for `idle_seconds` (default ARCHIVE_IDLE_SECONDS)."""
+    idle_seconds = cfg.ARCHIVE_IDLE_SECONDS if idle_seconds is None else idle_seconds
+    if idle_seconds is None or not cfg.ARTIFACTS_DIR.exists():
+        return []
+    cutoff = time.time() - idle_seconds
+    archived = []
+    for run_dir in cfg.ARTIFACTS_DIR.iterdir():
+        if not run_dir.is_dir() or run_dir.name.startswith(".") or (run_dir / ARCHIVE_FILE).exists():
+            continue
+        if _last_modified(run_dir) > cutoff:
+            continue
+        try:
+            if archive_run(run_dir.name):
+                archived.append(run_dir.name)
+        except Exception as e:
+            print(f"Error archiving run {run_dir.name}: {e}")
+    return archived
+
+
+_archiver: Optional[threading.Thread] = None
+_archiver_lock = threading.Lock()
+
+
+def start_archiver() -> Optional[threading.Thread]:
+    """Run `archive_idle_runs` every ARCHIVE_CHECK_INTERVAL_SECONDS on a daemon thread."""
+    global _archiver
+    if cfg.ARCHIVE_IDLE_SECONDS is None:
+        return None
+    with _archiver_lock:
+        if _archiver is None:
+            def loop():
+                while True:
+                    archived = archive_idle_runs()
+                    if archived:
+                        print(f"Archived {len(archived)} idle run(s)")
+                    time.sleep(cfg.ARCHIVE_CHECK_INTERVAL_SECONDS)
+
+            _archiver = threading.Thread(target=loop, name="run-archiver", daemon=True)
+            _archiver.start()
+    return _archiver
+
+
+def _packable(run_dir: Path) -> List[Path]:
+    return [path for path in run_dir.rglob("*")
+            if path.is_file() and path.relative_to(run_dir).as_posix() not in _KEPT_FILES
+            and not path.name.endswith(".tmp")]
+
+
+def _last_modified(run_dir: Path) -> float:
+    """Newest file mtime of a run (virtualenvs excluded)."""
+    latest = None
+    for root, dirs, files in os.walk(run_dir):
+        dirs[:] = [d for d in dirs if d not in _DROPPED_DIRS]
+        for name in files:
+            mtime = os.stat(os.path.join(root, name)).st_mtime
+            latest = mtime if latest is None else max(latest, mtime)
+    return run_dir.stat().st_mtime if latest is None else latest
+
+
+def _tree_size(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file() and not path.is_symlink())
+
+
+@contextmanager
+def _run_lock(run_dir: Path, wait: bool = False) -> Iterator[bool]:
+    """Exclusive per-run lock file; yields False if it could not be taken."""
+    lock = run_dir / _LOCK_FILE
+    deadline = time.monotonic() + (60 if wait else 0)
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime > _STALE_LOCK_SECONDS:
+                    lock.unlink(missing_ok=True)  # Left behind by a crashed process
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() >= deadline:
+                yield False
+                return
+            time.sleep(0.2)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield True
+    finally:
+        lock.unlink(missing_ok=True)
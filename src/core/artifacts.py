@@ -1,9 +1,13 @@
 """Multi-Agent QA System - Artifact Storage"""
+import os
+import shutil
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
 from .config import ARTIFACTS_DIR, REQUIREMENTS_DIR, TESTING_DIR, BUGS_DIR, ensure_directories
+from .search_index import search_index
 
 
 import orjson
@@ -18,9 +22,57 @@ ARTIFACT_MAP = {
     "test_plan": ("Test_Plan.md", "testing"),
     "automation_tests": ("Automation_Tests.py", "testing"),
     "manual_tests": ("Manual_Test_Cases.md", "testing"),
+    "automation_results": ("Automation_Results.json", "testing"),
     "bugs": ("Bugs.md", "bugs"),
 }
 
+def atomic_write_bytes(path: Path, data: bytes):
+    """
+    Write a file by replacing its directory entry instead of truncating it.
+
+    Forked runs share unchanged artifacts through hardlinks, so an in-place
+    write would leak into the other run. Replacing the entry gives the writer
+    its own copy (copy-on-write) and readers never see a half-written file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+def atomic_write_text(path: Path, content: str):
+    """Text variant of atomic_write_bytes (UTF-8)."""
+    atomic_write_bytes(path, content.encode("utf-8"))
+
+def link_tree(source: Path, target: Path, skip_dirs: frozenset = frozenset({".venv", "__pycache__", ".pytest_cache"}),
+              skip_files: frozenset = frozenset()) -> int:
+    """
+    Share a directory tree by hardlinking every file (copying across devices).
+
+    Args:
+        source: Existing directory
+        target: Directory to populate
+        skip_dirs: Directory names not to descend into
+        skip_files: Relative POSIX paths not to link
+
+    Returns:
+        Number of files linked or copied
+    """
+    count = 0
+    for path in source.rglob("*"):
+        rel = path.relative_to(source)
+        if not path.is_file() or any(part in skip_dirs for part in rel.parts) or rel.as_posix() in skip_files:
+            continue
+        dest = target / rel
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(path, dest)
+        except FileExistsError:
+            continue
+        except OSError:
+            shutil.copy2(path, dest)
+        count += 1
+    return count
+
 def get_artifact_info(key: str) -> tuple[str, str]:
     """Get mapping info for an artifact key."""
     return ARTIFACT_MAP.get(key, (f"{key}.txt", "requirements"))
@@ -66,7 +118,7 @@ def save_artifact(content: str, filename: str, category: str = "requirements", r
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     # filepath.write_text(header + content, encoding="utf-8")
-    filepath.write_text(content, encoding="utf-8")
+    atomic_write_text(filepath, content)
     
     # Update Manifest
     if manifest_file:
@@ -90,7 +142,8 @@ def save_artifact(content: str, filename: str, category: str = "requirements", r
         manifest = [m for m in manifest if m["filename"] != filename]
         manifest.append(artifact_entry)
         
-        manifest_file.write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+        atomic_write_bytes(manifest_file, orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+        search_index.index(run_id, artifact_entry["path"], content, agent_name)
         
     return filepath
 
@@ -0,0 +1,177 @@
+"""Multi-Agent QA System - LLM Backend Pool
+
+Spreads LLM calls over the Ollama servers in LLM_BACKENDS:
+
+- health checks: GET /api/tags on every backend (on first use, then every
+  LLM_HEALTH_CHECK_INTERVAL_SECONDS on a daemon thread); it also tells which
+  models each backend has pulled
+- routing: a run sticks to the backend that served its previous call, so the
+  model stays loaded and session prompts hit the KV cache; a run without a
+  live backend goes to the healthy backend with the model and the fewest
+  outstanding requests
+- failover: a call that fails to connect (or finds the model missing) marks
+  the backend down and the run moves to another backend
+
+With a single backend (the default: [LLM_BASE_URL]) every call goes to it,
+whatever its health.
+"""
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import orjson
+
+from . import config as cfg
+from . import metrics
+
+
+def _model_key(name: str) -> str:
+    """Ollama names without a tag mean ':latest'."""
+    return name if ":" in name else f"{name}:latest"
+
+
+@dataclass
+class Backend:
+    url: str
+    healthy: bool = True
+    models: Optional[Set[str]] = None  # None until the first health check
+    outstanding: int = 0
+    served: int = 0
+    failures: int = 0
+    checked_at: Optional[float] = None
+    error: Optional[str] = None
+
+    def has_model(self, model: str) -> bool:
+        return self.models is None or _model_key(model) in self.models
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "models": sorted(self.models) if self.models is not None else None,
+            "outstanding": self.outstanding,
+            "served": self.served,
+            "failures": self.failures,
+            "error": self.error,
+        }
+
+
+class BackendPool:
+    """Health-checked Ollama backends with run-sticky, least-outstanding routing."""
+
+    def __init__(self, urls: Optional[List[str]] = None):
+        self._urls = urls
+        self._backends: Optional[Dict[str, Backend]] = None
+        self._sticky: Dict[str, str] = {}  # run_id -> backend url
+        self._lock = threading.Lock()
+        self._checker: Optional[threading.Thread] = None
+
+    @property
+    def backends(self) -> List[Backend]:
+        if self._backends is None:
+            with self._lock:
+                if self._backends is None:
+                    urls = self._urls or cfg.LLM_BACKENDS or [cfg.LLM_BASE_URL]
+                    self._backends = {url.rstrip("/"): Backend(url.rstrip("/")) for url in urls}
+        return list(self._backends.values())
+
+    def select(self, model: str, run_id: Optional[str] = None, exclude: Optional[Set[str]] = None) -> Backend:
+        """Backend for the next call of `run_id` (sticky while it is healthy and has the model)."""
+        backends = self.backends
+        if len(backends) > 1:
+            self._ensure_checker()
+        exclude = exclude or set()
+        with self._lock:
+            candidates = [b for b in backends if b.healthy and b.has_model(model) and b.url not in exclude]
+            if not candidates:
+                # Nothing known to work: try the others rather than fail without a request
+                candidates = [b for b in backends if b.url not in exclude] or backends
+            sticky = self._sticky.get(run_id) if run_id else None
+            chosen = next((b for b in candidates if b.url == sticky), None)
+            if chosen is None:
+                chosen = min(candidates, key=lambda b: (b.outstanding, b.served))
+                if run_id:
+                    if sticky is not None:
+                        metrics.incr("llm_backend_failovers")
+                    self._sticky[run_id] = chosen.url
+            return chosen
+
+    @contextmanager
+    def acquire(self, model: str, run_id: Optional[str] = None,
+                exclude: Optional[Set[str]] = None) -> Iterator[Backend]:
+        """Select a backend and count the call as outstanding on it while the block runs."""
+        backend = self.select(model, run_id, exclude)
+        with self._lock:
+            backend.outstanding += 1
+            backend.served += 1
+        metrics.incr("llm_backend_calls", backend=backend.url)
+        try:
+            yield backend
+        finally:
+            with self._lock:
+                backend.outstanding -= 1
+
+    def mark_failed(self, backend: Backend, error: str, model: Optional[str] = None):
+        """Take a backend out of rotation (or, with `model`, only for that model) until a health check passes."""
+        with self._lock:
+            backend.failures += 1
+            backend.error = error
+            if len(self._backends or {}) < 2:
+                pass  # Nowhere else to go and no health checks to bring it back
+            elif model is not None and backend.models is not None:
+                backend.models.discard(_model_key(model))
+            else:
+                backend.healthy = False
+        metrics.incr("llm_backend_failures", backend=backend.url)
+        print(f"LLM backend {backend.url} failed: {error}")
+
+    def release(self, run_id: str):
+        """Forget a finished run's sticky backend."""
+        with self._lock:
+            self._sticky.pop(run_id, None)
+
+    def check_all(self):
+        for backend in self.backends:
+            self.check(backend)
+
+    def check(self, backend: Backend) -> bool:
+        """Refresh a backend's health and model list from GET /api/tags."""
+        try:
+            with urllib.request.urlopen(f"{backend.url}/api/tags", timeout=cfg.LLM_HEALTH_CHECK_TIMEOUT_SECONDS) as resp:
+                tags = orjson.loads(resp.read())
+            models = {_model_key(m.get("model") or m.get("name", "")) for m in tags.get("models", [])}
+            healthy, error = True, None
+        except Exception as e:
+            models, healthy, error = backend.models, False, str(e)
+        with self._lock:
+            if healthy and not backend.healthy:
+                print(f"LLM backend {backend.url} is back")
+            backend.healthy, backend.models, backend.error = healthy, models, error
+            backend.checked_at = time.time()
+        return healthy
+
+    def status(self) -> List[Dict[str, Any]]:
+        backends = self.backends
+        with self._lock:
+            return [b.status() for b in backends]
+
+    def _ensure_checker(self):
+        if self._checker is not None:
+            return
+        with self._lock:
+            if self._checker is not None:
+                return
+            self._checker = threading.Thread(target=self._check_loop, name="llm-health", daemon=True)
+        self.check_all()  # Model lists before the first routing decision
+        self._checker.start()
+
+    def _check_loop(self):
+        while True:
+            time.sleep(cfg.LLM_HEALTH_CHECK_INTERVAL_SECONDS)
+            self.check_all()
+
+
+backend_pool = BackendPool()
@@ -0,0 +1,287 @@
+"""Multi-Agent QA System - Broker
+
+Decouples the API process from workflow execution through three channels:
+
+- jobs:     API workers submit runs/resumes; run workers claim and execute them
+- events:   run workers publish numbered event messages; every API worker
+            reads all of them, so any API worker can serve websockets for any run
+- controls: stop signals, delegated to the shared cancellation store
+
+Backends (BROKER_BACKEND):
+- "inprocess": queues inside one process; runs execute on embedded worker threads
+- "sqlite":    a shared SQLite file (BROKER_DB_PATH), so several uvicorn workers
+               and `python -m src.worker` processes on one host cooperate
+"""
+import atexit
+import itertools
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from . import config as cfg
+from .cancellation import cancellation
+
+EventItem = Tuple[Dict[str, Any], str]  # (message, serialized payload)
+
+_EVENT_BATCH_SIZE = 1000
+_PRUNE_INTERVAL_SECONDS = 60
+
+
+@dataclass
+class Job:
+    """A unit of work for a run worker."""
+    id: int
+    kind: str  # "run" | "resume"
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+
+class EventSubscription(ABC):
+    """One consumer's position in the event stream."""
+
+    @abstractmethod
+    def read(self, max_items: int = 500) -> List[EventItem]:
+        """Return events published since the last read (never blocks)."""
+
+
+class Broker(ABC):
+    """Job queue, event stream and control signals."""
+
+    # Jobs
+    @abstractmethod
+    def submit_job(self, kind: str, payload: Dict[str, Any]) -> int:
+        """Queue a job and return its ID."""
+
+    @abstractmethod
+    def claim_job(self, worker_id: str, timeout: float) -> Optional[Job]:
+        """Take the oldest queued job, waiting up to `timeout` seconds."""
+
+    @abstractmethod
+    def finish_job(self, job_id: int, status: str):
+        """Mark a claimed job as done/failed."""
+
+    # Events
+    @abstractmethod
+    def publish(self, message: Dict[str, Any]):
+        """Publish a dispatched event message (never blocks on I/O)."""
+
+    @abstractmethod
+    def subscribe(self) -> EventSubscription:
+        """Start reading events published from now on."""
+
+    # Controls
+    def send_control(self, run_id: str, signal: str) -> float:
+        """
+        Send a control signal to a run, wherever it executes.
+
+        Returns:
+            Time the signal was first requested
+        """
+        if signal != "stop":
+            raise ValueError(f"Unknown control signal: {signal}")
+        return cancellation.request(run_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__}
+
+
+class _QueueSubscription(EventSubscription):
+    def __init__(self, events: queue.SimpleQueue):
+        self._events = events
+
+    def read(self, max_items: int = 500) -> List[EventItem]:
+        items = []
+        while len(items) < max_items:
+            try:
+                message = self._events.get_nowait()
+            except queue.Empty:
+                break
+            items.append((message, orjson.dumps(message).decode()))
+        return items
+
+
+class InProcessBroker(Broker):
+    """Single-process broker: jobs and events are in-memory queues (one event subscriber)."""
+
+    def __init__(self):
+        self._jobs: queue.Queue = queue.Queue()
+        self._events: queue.SimpleQueue = queue.SimpleQueue()
+        self._ids = itertools.count(1)
+
+    def submit_job(self, kind: str, payload: Dict[str, Any]) -> int:
+        job = Job(id=next(self._ids), kind=kind, payload=payload)
+        self._jobs.put(job)
+        return job.id
+
+    def claim_job(self, worker_id: str, timeout: float) -> Optional[Job]:
+        try:
+            return self._jobs.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def finish_job(self, job_id: int, status: str):
+        pass
+
+    def publish(self, message: Dict[str, Any]):
+        self._events.put(message)
+
+    def subscribe(self) -> EventSubscription:
+        return _QueueSubscription(self._events)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "inprocess", "queued_jobs": self._jobs.qsize()}
+
+
+class _SqliteSubscription(EventSubscription):
+    def __init__(self, broker: "SqliteBroker"):
+        self._broker = broker
+        self.cursor = broker._query("SELECT COALESCE(MAX(id), 0) FROM events")[0][0]
+
+    def read(self, max_items: int = 500) -> List[EventItem]:
+        rows = self._broker._query(
+            "SELECT id, payload FROM events WHERE id > ? ORDER BY id LIMIT ?", (self.cursor, max_items)
+        )
+        if rows:
+            self.cursor = rows[-1][0]
+        return [(orjson.loads(payload), payload) for _, payload in rows]
+
+
+class SqliteBroker(Broker):
+    """
+    Multi-process broker on a shared SQLite file (WAL mode).
+
+    Publishing only enqueues; a writer thread inserts events in batches, one
+    transaction per batch, and prunes events older than
+    BROKER_EVENT_RETENTION_SECONDS.
+    """
+
+    def __init__(self, path=None):
+        path = path or cfg.BROKER_DB_PATH
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=10, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "  id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+                "  status TEXT NOT NULL DEFAULT 'queued', worker TEXT,"
+                "  created_at REAL NOT NULL, claimed_at REAL, finished_at REAL);"
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);"
+                "CREATE TABLE IF NOT EXISTS events ("
+                "  id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT, payload TEXT NOT NULL, created_at REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS events_created ON events (created_at);"
+            )
+        self._outbox: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def submit_job(self, kind: str, payload: Dict[str, Any]) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (kind, payload, created_at) VALUES (?, ?, ?)",
+                (kind, orjson.dumps(payload).decode(), time.time()),
+            )
+            return cursor.lastrowid
+
+    def claim_job(self, worker_id: str, timeout: float) -> Optional[Job]:
+        deadline = time.monotonic() + timeout
+        while True:
+            # Atomic claim: only one worker's UPDATE matches a queued row
+            rows = self._query(
+                "UPDATE jobs SET status = 'running', worker = ?, claimed_at = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1) "
+                "RETURNING id, kind, payload",
+                (worker_id, time.time()),
+            )
+            if rows:
+                job_id, kind, payload = rows[0]
+                return Job(id=job_id, kind=kind, payload=orjson.loads(payload))
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(cfg.BROKER_POLL_INTERVAL_SECONDS)
+
+    def finish_job(self, job_id: int, status: str):
+        self._query("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?", (status, time.time(), job_id))
+
+    def publish(self, message: Dict[str, Any]):
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_events, name="broker-event-writer", daemon=True)
+                    self._writer.start()
+                    atexit.register(self.flush)
+        self._outbox.put(message)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything published so far is committed."""
+        if self._writer is None:
+            return True
+        done = threading.Event()
+        self._outbox.put(done)
+        return done.wait(timeout)
+
+    def _write_events(self):
+        last_prune = 0.0
+        while True:
+            batch = [self._outbox.get()]
+            while len(batch) < _EVENT_BATCH_SIZE:
+                try:
+                    batch.append(self._outbox.get_nowait())
+                except queue.Empty:
+                    break
+            waiters = [item for item in batch if isinstance(item, threading.Event)]
+            now = time.time()
+            rows = [(m.get("data", {}).get("run_id"), orjson.dumps(m).decode(), now)
+                    for m in batch if not isinstance(m, threading.Event)]
+            try:
+                with self._lock:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany("INSERT INTO events (run_id, payload, created_at) VALUES (?, ?, ?)", rows)
+                    if now - last_prune > _PRUNE_INTERVAL_SECONDS:
+                        self._conn.execute("DELETE FROM events WHERE created_at < ?", (now - cfg.BROKER_EVENT_RETENTION_SECONDS,))
+                        last_prune = now
+                    self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                print(f"Error publishing events: {e}")
+                with self._lock:
+                    if self._conn.in_transaction:
+                        self._conn.execute("ROLLBACK")
+            for waiter in waiters:
+                waiter.set()
+
+    def subscribe(self) -> EventSubscription:
+        return _SqliteSubscription(self)
+
+    def stats(self) -> Dict[str, Any]:
+        counts = dict(self._query("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        return {"backend": "sqlite", "jobs": counts}
+
+
+_broker: Optional[Broker] = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> Broker:
+    """Process-wide broker for the configured BROKER_BACKEND."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                if cfg.BROKER_BACKEND == "sqlite":
+                    _broker = SqliteBroker()
+                elif cfg.BROKER_BACKEND == "inprocess":
+                    _broker = InProcessBroker()
+                else:
+                    raise ValueError(f"Unknown BROKER_BACKEND: {cfg.BROKER_BACKEND}")
+    return _broker
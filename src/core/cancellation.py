@@ -0,0 +1,300 @@
+"""Multi-Agent QA System - Run Cancellation
+
+Cancellation requests are written to a shared SQLite store
+(CONTROL_DB_PATH), so `/stop` works whichever API worker receives it. Each
+process keeps a local token per run it executes; a watcher thread polls the
+store for those runs every CANCEL_POLL_INTERVAL_SECONDS (a request handled
+by the executing process triggers immediately).
+
+Triggering a token does not wait for the next token or node boundary: it
+calls every abort callback registered for the run, which shut down the
+in-flight Ollama HTTP connection (see llm.stream_llm) and kill running
+subprocesses (see run_subprocess). The code blocked on them then raises
+RunCancelled.
+
+Latency from request to abort is recorded as the `cancel_abort_seconds`
+metric.
+
+Deadlines use the same path: `deadline(run_id, seconds, reason)` requests
+cancellation with that reason if its block is still running when the time is
+up (checked by the watcher thread). The run ends as "stopped" at its last
+checkpoint, so it can be resumed.
+"""
+import itertools
+import os
+import signal
+import sqlite3
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from . import config as cfg
+from . import metrics
+
+
+class RunCancelled(InterruptedError):
+    """Raised inside a run whose cancellation was requested."""
+
+
+class CancellationStore:
+    """Cancellation requests shared between processes (SQLite stand-in for a shared store)."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=5, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cancellations ("
+            "run_id TEXT PRIMARY KEY, requested_at REAL NOT NULL, reason TEXT)"
+        )
+        self._lock = threading.Lock()
+
+    def request(self, run_id: str, reason: str) -> float:
+        requested_at = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO cancellations (run_id, requested_at, reason) VALUES (?, ?, ?)",
+                (run_id, requested_at, reason),
+            )
+            row = self._conn.execute("SELECT requested_at FROM cancellations WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0]
+
+    def pending(self, run_ids: List[str]) -> Dict[str, tuple]:
+        """run_id -> (requested_at, reason) for the given runs that have a request."""
+        if not run_ids:
+            return {}
+        placeholders = ",".join("?" * len(run_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT run_id, requested_at, reason FROM cancellations WHERE run_id IN ({placeholders})",
+                run_ids,
+            ).fetchall()
+        return {run_id: (requested_at, reason) for run_id, requested_at, reason in rows}
+
+    def clear(self, run_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cancellations WHERE run_id = ?", (run_id,))
+
+
+class _RunToken:
+    """Local cancellation state of one executing run."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.requested_at: Optional[float] = None
+        self.reason: Optional[str] = None
+        self.aborts: Dict[int, Callable[[], None]] = {}
+        self.lock = threading.Lock()
+
+
+class CancellationManager:
+    """Local tokens for executing runs, backed by the shared store."""
+
+    def __init__(self):
+        self._store: Optional[CancellationStore] = None
+        self._tokens: Dict[str, _RunToken] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._watcher: Optional[threading.Thread] = None
+        self._deadlines: Dict[int, tuple] = {}  # key -> (run_id, monotonic deadline, reason)
+
+    @property
+    def store(self) -> CancellationStore:
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = CancellationStore(cfg.CONTROL_DB_PATH)
+        return self._store
+
+    def activate(self, run_id: str):
+        """Start watching a run executed by this process."""
+        with self._lock:
+            self._tokens.setdefault(run_id, _RunToken())
+            self._ensure_watcher()
+
+    def deactivate(self, run_id: str):
+        with self._lock:
+            self._tokens.pop(run_id, None)
+
+    def clear(self, run_id: str):
+        """Forget an earlier request (e.g. before resuming a stopped run)."""
+        self.store.clear(run_id)
+        with self._lock:
+            if run_id in self._tokens:
+                self._tokens[run_id] = _RunToken()
+
+    def request(self, run_id: str, reason: str = "user") -> float:
+        """
+        Request cancellation of a run, wherever it executes.
+
+        Returns:
+            The time of the (first) request
+        """
+        requested_at = self.store.request(run_id, reason)
+        self._trigger(run_id, requested_at, reason)
+        return requested_at
+
+    def is_cancelled(self, run_id: Optional[str]) -> bool:
+        token = self._tokens.get(run_id) if run_id else None
+        return token is not None and token.event.is_set()
+
+    def requested_at(self, run_id: str) -> Optional[float]:
+        token = self._tokens.get(run_id)
+        return token.requested_at if token else None
+
+    def reason(self, run_id: str) -> Optional[str]:
+        """Why the run was cancelled ("user", "budget", ...), if it was."""
+        token = self._tokens.get(run_id)
+        return token.reason if token else None
+
+    def check(self, run_id: Optional[str]):
+        """Raise RunCancelled if the run was cancelled."""
+        if self.is_cancelled(run_id):
+            raise self.cancelled_error(run_id)
+
+    def cancelled_error(self, run_id: str) -> RunCancelled:
+        reason = self.reason(run_id) or "user"
+        if reason == "user":
+            return RunCancelled(f"Workflow execution for {run_id} was stopped by user.")
+        return RunCancelled(f"Workflow execution for {run_id} was stopped ({reason}).")
+
+    @contextmanager
+    def deadline(self, run_id: Optional[str], seconds: Optional[float], reason: str):
+        """Cancel the run with `reason` if the block is still running after `seconds` (None: no limit)."""
+        if not run_id or seconds is None:
+            yield
+            return
+        key = next(self._ids)
+        with self._lock:
+            self._deadlines[key] = (run_id, time.monotonic() + seconds, reason)
+            self._ensure_watcher()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._deadlines.pop(key, None)
+
+    @contextmanager
+    def abort_on_cancel(self, run_id: Optional[str], abort: Optional[Callable[[], None]]):
+        """Call `abort` (from another thread) if the run is cancelled while the block runs."""
+        token = self._tokens.get(run_id) if run_id else None
+        if token is None or abort is None:
+            yield
+            return
+        key = next(self._ids)
+        with token.lock:
+            token.aborts[key] = abort
+            cancelled = token.event.is_set()
+        if cancelled:
+            _safe_call(abort)
+        try:
+            yield
+        finally:
+            with token.lock:
+                token.aborts.pop(key, None)
+
+    def _trigger(self, run_id: str, requested_at: float, reason: str):
+        token = self._tokens.get(run_id)
+        if token is None:
+            return
+        with token.lock:
+            if token.event.is_set():
+                return
+            token.requested_at = requested_at
+            token.reason = reason
+            token.event.set()
+            aborts = list(token.aborts.values())
+        for abort in aborts:
+            _safe_call(abort)
+        metrics.observe("cancel_abort_seconds", max(time.time() - requested_at, 0.0))
+
+    def _ensure_watcher(self):
+        # Caller holds self._lock
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="cancellation-watcher", daemon=True)
+            self._watcher.start()
+
+    def _expire_deadlines(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, at, _) in self._deadlines.items() if at <= now]
+            expired = [self._deadlines.pop(key) for key in expired]
+        for run_id, _, reason in expired:
+            if self.is_cancelled(run_id):
+                continue
+            print(f"Run {run_id} exceeded its time limit ({reason}); stopping it")
+            metrics.incr("run_timeouts", reason=reason.split(":", 1)[0])
+            try:
+                self.request(run_id, reason)
+            except sqlite3.Error as e:
+                print(f"Cancellation store unavailable: {e}")
+                self._trigger(run_id, time.time(), reason)
+
+    def _watch(self):
+        while True:
+            time.sleep(cfg.CANCEL_POLL_INTERVAL_SECONDS)
+            self._expire_deadlines()
+            with self._lock:
+                waiting = [run_id for run_id, token in self._tokens.items() if not token.event.is_set()]
+            if not waiting:
+                continue
+            try:
+                pending = self.store.pending(waiting)
+            except sqlite3.Error as e:
+                print(f"Cancellation store unavailable: {e}")
+                continue
+            for run_id, (requested_at, reason) in pending.items():
+                self._trigger(run_id, requested_at, reason)
+
+
+def _safe_call(abort: Callable[[], None]):
+    try:
+        abort()
+    except Exception as e:
+        print(f"Abort callback failed: {e}")
+
+
+cancellation = CancellationManager()
+
+
+def _kill_process_tree(proc: subprocess.Popen):
+    """Kill a process started by run_subprocess together with its children."""
+    if proc.poll() is not None:
+        return
+    if os.name == "nt":
+        proc.kill()
+    else:
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+def run_subprocess(run_id: Optional[str], cmd: List[str], timeout: Optional[float] = None,
+                   check: bool = False, **kwargs) -> subprocess.CompletedProcess:
+    """
+    subprocess.run() that is killed (with its children) when the run is cancelled.
+
+    Output is captured. Raises subprocess.TimeoutExpired / CalledProcessError
+    like subprocess.run, and RunCancelled if the run was cancelled.
+    """
+    cancellation.check(run_id)
+    kwargs.setdefault("stdout", subprocess.PIPE)
+    kwargs.setdefault("stderr", subprocess.PIPE)
+    if os.name != "nt":
+        kwargs["start_new_session"] = True  # Own process group, so pip/pytest children die too
+
+    with subprocess.Popen(cmd, **kwargs) as proc:
+        with cancellation.abort_on_cancel(run_id, lambda: _kill_process_tree(proc)):
+            try:
+                stdout, stderr = proc.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                _kill_process_tree(proc)
+                proc.communicate()
+                raise
+        retcode = proc.poll()
+
+    cancellation.check(run_id)
+    if check and retcode:
+        raise subprocess.CalledProcessError(retcode, cmd, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(cmd, retcode, stdout, stderr)
@@ -1,4 +1,5 @@
 """Multi-Agent QA System - Configuration"""
+import os
 from pathlib import Path
 
 
@@ -6,8 +7,23 @@ from pathlib import Path
 LLM_MODEL = "qwen2.5:7b"  # Options: qwen2.5:7b, qwen3:8b
 CODING_LLM_MODEL = "qwen2.5-coder:7b"
 LLM_BASE_URL = "http://localhost:11434"
+# Ollama servers LLM calls are spread over (see src/core/backends.py): runs stick
+# to one backend, new runs go to the least busy one, dead backends fail over.
+LLM_BACKENDS = [LLM_BASE_URL]
+LLM_HEALTH_CHECK_INTERVAL_SECONDS = 15
+LLM_HEALTH_CHECK_TIMEOUT_SECONDS = 2
+# Streaming client (see src/core/llm.py): "langchain" (ChatOllama) or "native"
+# (direct /api/chat over pooled keep-alive connections, less per-chunk overhead)
+LLM_CLIENT = "langchain"
 LLM_TEMPERATURE = 0.7
 LLM_NUM_CTX = 8192  # Context window size
+# Pass the Pydantic output schema through Ollama's native JSON-schema `format`
+# instead of pasting it into the system prompt. Falls back automatically when
+# the backend rejects it.
+LLM_STRUCTURED_OUTPUT = False
+# Abort an LLM stream when no chunk arrives for this long (None disables);
+# covers prompt evaluation before the first token
+LLM_STREAM_IDLE_SECONDS = 120
 PERSONALITY = "software"  # Default personality
 
 # Project Paths
@@ -16,6 +32,44 @@ ARTIFACTS_DIR = PROJECT_ROOT / "artifacts"
 SCHEMAS_DIR = PROJECT_ROOT / "schemas"
 PROMPTS_DIR = PROJECT_ROOT / "prompts"
 
+# Cross-process run control (cancellation requests), shared by all API workers
+CONTROL_DB_PATH = PROJECT_ROOT / "data" / "control.sqlite"
+CANCEL_POLL_INTERVAL_SECONDS = 0.25  # Upper bound on cross-process cancellation latency
+
+# Job/event broker between API workers and run workers (see src/core/broker.py).
+# "inprocess" runs everything in the API process; "sqlite" lets several uvicorn
+# workers and `python -m src.worker` processes on one host share runs.
+BROKER_BACKEND = "inprocess"
+BROKER_DB_PATH = PROJECT_ROOT / "data" / "broker.sqlite"
+BROKER_POLL_INTERVAL_SECONDS = 0.05
+BROKER_EVENT_RETENTION_SECONDS = 3600
+EMBEDDED_WORKERS = 4  # Run-worker threads inside each API process (0: dedicated workers only)
+
+# Console output of runs (see src/core/console_sink.py): "off" | "summary" | "full"
+SERVER_CONSOLE_MODE = "summary"  # API server and run workers (`python -m src.worker --console`)
+CLI_CONSOLE_MODE = "full"  # CLI (`--console`)
+CONSOLE_MAX_LINES_PER_SECOND = 50  # Thought lines per second in server mode; the rest are counted
+CONSOLE_QUEUE_SIZE = 10000  # Records buffered for the console writer before dropping
+
+# Per-run token budget (see src/core/token_ledger.py); /run can override both.
+RUN_TOKEN_BUDGET = None  # Max input+output tokens per run (None: unlimited)
+RUN_BUDGET_ACTION = "degrade"  # "degrade": stop the dev/review loops, "stop": cancel the run
+
+# Shared caches (dot-prefixed so they are never listed as runs)
+CACHE_DIR = ARTIFACTS_DIR / ".cache"
+NODE_CACHE_DIR = CACHE_DIR / "nodes"
+IDEA_INDEX_PATH = CACHE_DIR / "idea_index.jsonl"
+SEARCH_INDEX_PATH = CACHE_DIR / "search.sqlite"
+EXECUTION_CACHE_DIR = CACHE_DIR / "executions"
+
+# Full-text search over all runs' artifacts (see src/core/search_index.py)
+SEARCH_INDEX_ENABLED = True
+SEARCH_MAX_FILE_BYTES = 1024 * 1024  # Larger files are not indexed
+
+# Runs idle this long lose their .venv and are packed into bundle.zip (see src/core/archive.py)
+ARCHIVE_IDLE_SECONDS = 7 * 24 * 3600  # None disables archival
+ARCHIVE_CHECK_INTERVAL_SECONDS = 3600
+
 # Artifact subdirectories
 REQUIREMENTS_DIR = ARTIFACTS_DIR / "requirements"
 TESTING_DIR = ARTIFACTS_DIR / "testing"
@@ -30,7 +84,35 @@ def ensure_directories():
 
 # Agent Configuration
 AGENT_MAX_RETRIES = 3
-AGENT_TIMEOUT_SECONDS = 120
+# Time limits; hitting one stops the run (status "stopped", resumable from its
+# last checkpoint) with stop_reason "node_timeout:<node>" / "run_deadline".
+AGENT_TIMEOUT_SECONDS = 600  # Per node execution (None: unlimited)
+NODE_TIMEOUT_SECONDS = {"Executor": 900, "AutomationExecutor": 900}  # Overrides (dependency installs)
+RUN_DEADLINE_SECONDS = 3 * 3600  # Wall clock per run/resume invocation (None: unlimited)
+# On review/test-failure loops the Developer returns diffs against the files on
+# disk instead of regenerating the whole project (falls back to full regeneration).
+DEV_PATCH_MODE = True
+# Make-style memoization: skip LLM nodes whose inputs, prompts and model are
+# byte-identical to a previous run and reuse that run's artifacts.
+NODE_CACHE_ENABLED = True
+# Developer/Reviewer iterations continue one conversation per run instead of
+# re-sending the full prompt, so Ollama can reuse its cached prompt prefix.
+AGENT_SESSION_MODE = True
+SESSION_CONTEXT_FRACTION = 0.6  # Re-seed the session when its prompt would pass this share of LLM_NUM_CTX
+# Requirements reuse across runs with similar ideas (see src/core/idea_index.py); /run can override the mode.
+IDEA_REUSE_MODE = "suggest"  # "off" | "suggest": report similar runs | "auto": reuse/warm start by score
+IDEA_REUSE_THRESHOLD = 0.8  # Copy the prior MRS/SRS without calling the ProductManager
+IDEA_WARM_START_THRESHOLD = 0.5  # Give the prior SRS to the ProductManager as a reference
+# Static checks (syntax, imports vs. requirements.txt, test files) before the Executor's venv/pytest work
+PRECHECKS_ENABLED = True
+# Executor results by source-tree hash, shared by all runs (see src/core/execution_cache.py)
+EXECUTION_CACHE_ENABLED = True
+EXECUTION_CACHE_MAX_BYTES = 32 * 1024 * 1024  # Least recently used entries are evicted beyond this
+# AutomationQA suite execution (see src/core/execution.py)
+AUTOMATION_SHARDS = max(1, min(4, os.cpu_count() or 1))  # Parallel pytest processes per suite
+AUTOMATION_MIN_TESTS_PER_SHARD = 5  # Smaller suites use fewer processes
+AUTOMATION_TIMEOUT_SECONDS = 120  # Per pytest process
+AUTOMATION_BACKGROUND_RUNS = 2  # Suites started ahead of the AutomationExecutor node at once
 
 AGENT_CONFIG = {
     "ProductManager": {"name": "Product Manager", "role": "Product Manager", "icon": "Bot"},
@@ -42,6 +124,23 @@ AGENT_CONFIG = {
     "ManualQA": {"name": "Manual QA", "role": "Manual QA", "icon": "CheckCircle"},
 }
 
+# WebSocket fan-out (see src/api/broadcast.py)
+WS_CLIENT_QUEUE_SIZE = 1000  # Events buffered per client before it is considered lagging
+WS_SEND_TIMEOUT_SECONDS = 5
+WS_EVICT_AFTER_LAG_SECONDS = 30
+WS_EVICT_AFTER_DROPS = 200
+WS_COALESCE_FLUSH_SECONDS = 0.25
+
+# Per-run event replay (see src/api/event_buffer.py)
+EVENT_BUFFER_SIZE = 500  # Entries kept per run; a thought stream block counts as one entry
+EVENT_BUFFER_RETAINED_RUNS = 20  # Finished/paused runs kept for late joiners
+
+# Persistent per-run event log (see src/core/event_log.py)
+EVENT_LOG_ENABLED = True
+EVENT_LOG_FSYNC_SECONDS = 1.0
+EVENT_LOG_INDEX_INTERVAL = 256  # Frames between index entries
+EVENT_LOG_BATCH_SIZE = 1024  # Max events per write
+
 # HITL Configuration
 HITL_CONFIG = {
     "interrupt_before": ["Developer", "Reviewer", "TestManager", "TestLead", "AutomationQA", "ManualQA"]
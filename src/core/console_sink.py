@@ -0,0 +1,267 @@
+"""Multi-Agent QA System - Console Sink
+
+Console output of runs goes through a sink instead of being printed from the
+workflow threads. Emitters only enqueue (a full queue drops records rather
+than blocking a run); a writer thread renders the records in batches, so a
+slow terminal or journald never stalls token streaming.
+
+Modes (SERVER_CONSOLE_MODE for the API server and run workers,
+CLI_CONSOLE_MODE / --console for the CLI):
+- "off":     no run output
+- "summary": phases, agent start/finish, artifacts, run status and errors
+- "full":    summary plus the agents' thought streams
+
+With prefix_runs (server) every line starts with the run ID and thought
+streams are line-buffered per run and agent, so concurrent runs never
+interleave mid-line; thought lines beyond CONSOLE_MAX_LINES_PER_SECOND are
+dropped and reported as a count. Without it (CLI, one run) thoughts are
+streamed token by token and summary events use the Rich panels of log_manager.
+"""
+import atexit
+import queue
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+from . import config as cfg
+from .events import WorkflowEventType
+
+CONSOLE_MODES = ("off", "summary", "full")
+
+_SUMMARY_EVENTS = {
+    WorkflowEventType.PHASE_START,
+    WorkflowEventType.AGENT_START,
+    WorkflowEventType.AGENT_COMPLETE,
+    WorkflowEventType.ARTIFACT_GENERATED,
+    WorkflowEventType.WORKFLOW_PAUSED,
+    WorkflowEventType.WORKFLOW_COMPLETE,
+    WorkflowEventType.ERROR,
+}
+_RUN_END_EVENTS = {WorkflowEventType.WORKFLOW_PAUSED, WorkflowEventType.WORKFLOW_COMPLETE, WorkflowEventType.ERROR}
+_BATCH_SIZE = 500
+_MAX_PARTIAL_LINE = 400  # Thought text without a newline is cut into lines of this size
+
+Record = Tuple[Optional[str], WorkflowEventType, Dict[str, Any]]
+
+
+class ConsoleSink:
+    """Buffered, rate-limited console output of workflow events."""
+
+    def __init__(self, mode: str, prefix_runs: bool,
+                 max_lines_per_second: Optional[float] = None, queue_size: Optional[int] = None):
+        if mode not in CONSOLE_MODES:
+            raise ValueError(f"Unknown console mode: {mode} (expected one of {', '.join(CONSOLE_MODES)})")
+        self.mode = mode
+        self.prefix_runs = prefix_runs
+        self._rate = max_lines_per_second or cfg.CONSOLE_MAX_LINES_PER_SECOND
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size or cfg.CONSOLE_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self.dropped = 0  # Records lost to a full queue
+
+        # Writer-thread state
+        self._partial: Dict[Tuple[str, str], str] = {}
+        self._suppressed: Dict[str, int] = defaultdict(int)
+        self._allowance = self._rate
+        self._last_refill = time.monotonic()
+        self._reported_drops = 0
+        self._at_line_start = True
+
+    def event(self, run_id: Optional[str], type: WorkflowEventType, data: Dict[str, Any]):
+        """Queue a workflow event for output (never blocks)."""
+        if self.mode == "off":
+            return
+        if type == WorkflowEventType.THOUGHT_CHUNK:
+            if self.mode != "full":
+                return
+        elif type not in _SUMMARY_EVENTS:
+            return
+        self._put((run_id, type, data))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is written."""
+        if self._writer is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _put(self, record: Record):
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write, name="console-sink", daemon=True)
+                    self._writer.start()
+                    atexit.register(self.flush)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < _BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            waiters = [item for item in batch if isinstance(item, threading.Event)]
+            try:
+                if self.prefix_runs:
+                    self._write_prefixed([item for item in batch if not isinstance(item, threading.Event)])
+                else:
+                    self._write_stream([item for item in batch if not isinstance(item, threading.Event)])
+            except Exception as e:
+                print(f"Error writing console output: {e}", file=sys.stderr)
+            for waiter in waiters:
+                waiter.set()
+
+    # Server: one prefixed line per record / thought line
+
+    def _write_prefixed(self, records):
+        lines = []
+        self._refill()
+        for run_id, type, data in records:
+            run_id = run_id or "-"
+            if type == WorkflowEventType.THOUGHT_CHUNK:
+                key = (run_id, data.get("agent") or "?")
+                text = self._partial.pop(key, "") + data.get("chunk", "")
+                *complete, rest = text.split("\n")
+                while len(rest) > _MAX_PARTIAL_LINE:
+                    complete.append(rest[:_MAX_PARTIAL_LINE])
+                    rest = rest[_MAX_PARTIAL_LINE:]
+                if rest:
+                    self._partial[key] = rest
+                for line in complete:
+                    if line.strip():
+                        self._thought_line(lines, run_id, key[1], line)
+                continue
+
+            if type == WorkflowEventType.AGENT_COMPLETE:
+                self._end_thoughts(lines, run_id, data.get("agent") or "?")
+            elif type in _RUN_END_EVENTS:
+                for agent in [agent for run, agent in self._partial if run == run_id]:
+                    self._end_thoughts(lines, run_id, agent)
+            self._report_suppressed(lines, run_id)
+            lines.append(f"[{run_id}] {_summary_line(type, data)}\n")
+
+        self._report_drops(lines)
+        if lines:
+            sys.stdout.write("".join(lines))
+            sys.stdout.flush()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._allowance = min(self._rate, self._allowance + (now - self._last_refill) * self._rate)
+        self._last_refill = now
+
+    def _thought_line(self, lines, run_id: str, agent: str, line: str):
+        if self._allowance < 1:
+            self._suppressed[run_id] += 1
+            return
+        self._allowance -= 1
+        self._report_suppressed(lines, run_id)
+        lines.append(f"[{run_id}] {agent} | {line}\n")
+
+    def _end_thoughts(self, lines, run_id: str, agent: str):
+        rest = self._partial.pop((run_id, agent), "")
+        if rest.strip():
+            self._thought_line(lines, run_id, agent, rest)
+
+    def _report_suppressed(self, lines, run_id: str):
+        count = self._suppressed.pop(run_id, 0)
+        if count:
+            lines.append(f"[{run_id}] … {count} thought line(s) suppressed (rate limit)\n")
+
+    def _report_drops(self, lines):
+        if self.dropped > self._reported_drops:
+            lines.append(f"[console] {self.dropped - self._reported_drops} record(s) dropped (queue full)\n")
+            self._reported_drops = self.dropped
+
+    # CLI: raw token stream plus Rich panels
+
+    def _write_stream(self, records):
+        from .log_manager import console, log_agent_start, log_artifact, log_completion
+
+        chunks = []
+        for _, type, data in records:
+            if type == WorkflowEventType.THOUGHT_CHUNK:
+                chunks.append(data.get("chunk", ""))
+                continue
+            self._write_chunks(chunks)
+            chunks = []
+            if not self._at_line_start:
+                sys.stdout.write("\n")
+                self._at_line_start = True
+
+            if type == WorkflowEventType.PHASE_START:
+                console.print(f"\n[bold blue]═══ Phase: {data.get('phase')} ═══[/bold blue]\n")
+            elif type == WorkflowEventType.AGENT_START:
+                log_agent_start(data.get("agent"), data.get("role"))
+            elif type == WorkflowEventType.ARTIFACT_GENERATED:
+                log_artifact(data.get("agent"), data.get("filename"), data.get("type"))
+            elif type == WorkflowEventType.AGENT_COMPLETE:
+                log_completion(data.get("agent"), data.get("success"))
+            elif type == WorkflowEventType.WORKFLOW_COMPLETE:
+                status = data.get("status")
+                if status == "success":
+                    console.print("\n[bold green]✓ Workflow Finished[/bold green]")
+                elif status == "stopped":
+                    console.print("\n[yellow]■ Workflow Stopped[/yellow]")
+                else:
+                    console.print("\n[bold red]✗ Workflow Error[/bold red]")
+            else:
+                console.print(_summary_line(type, data))
+        self._write_chunks(chunks)
+
+        lines = []
+        self._report_drops(lines)
+        if lines:
+            sys.stdout.write("".join(lines))
+        sys.stdout.flush()
+
+    def _write_chunks(self, chunks):
+        text = "".join(chunks)
+        if text:
+            sys.stdout.write(text)
+            self._at_line_start = text.endswith("\n")
+
+
+def _summary_line(type: WorkflowEventType, data: Dict[str, Any]) -> str:
+    agent = data.get("agent")
+    if type == WorkflowEventType.PHASE_START:
+        return f"=== Phase: {data.get('phase')} ==="
+    if type == WorkflowEventType.AGENT_START:
+        return f"▶ {agent} started ({data.get('role')})"
+    if type == WorkflowEventType.AGENT_COMPLETE:
+        return f"✓ {agent} completed" if data.get("success") else f"✗ {agent} failed"
+    if type == WorkflowEventType.ARTIFACT_GENERATED:
+        return f"📄 {agent} generated {data.get('filename')} ({data.get('type')})"
+    if type == WorkflowEventType.WORKFLOW_PAUSED:
+        return f"⏸ Workflow paused before {', '.join(data.get('next') or [])}"
+    if type == WorkflowEventType.WORKFLOW_COMPLETE:
+        tokens = data.get("total_tokens")
+        return f"■ Workflow {data.get('status')}" + (f" ({tokens} tokens)" if tokens else "")
+    if type == WorkflowEventType.ERROR:
+        return f"✗ Error: {data.get('message')}"
+    return type.value
+
+
+_server_sink: Optional[ConsoleSink] = None
+_server_sink_lock = threading.Lock()
+
+
+def server_sink() -> ConsoleSink:
+    """Process-wide sink for runs executed by the API server and run workers."""
+    global _server_sink
+    if _server_sink is None:
+        with _server_sink_lock:
+            if _server_sink is None:
+                _server_sink = ConsoleSink(cfg.SERVER_CONSOLE_MODE, prefix_runs=True)
+    return _server_sink
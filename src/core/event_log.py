@@ -0,0 +1,288 @@
+"""Multi-Agent QA System - Persistent Per-Run Event Log
+
+Every dispatched WorkflowEvent is appended to artifacts/<run_id>/events.log
+so a run's timeline survives the process for analysis and UI playback.
+
+Format (little-endian):
+- events.log: frames of [length u32][crc32 u32][dispatch time f64][orjson payload]
+  The CRC covers the time and payload; a torn frame at the end (crash
+  mid-write) fails the check and ends the log.
+- events.idx: [seq u64][dispatch time f64][offset i64] for every
+  EVENT_LOG_INDEX_INTERVAL-th frame, so reads seek close to the requested
+  sequence or time instead of scanning from the start.
+
+Writes never happen on the caller's thread: `append` only enqueues. A single
+writer thread drains the queue in batches (one write per run per batch) and
+fsyncs at most every EVENT_LOG_FSYNC_SECONDS, plus when a run finishes or
+pauses.
+"""
+import atexit
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+from . import config as cfg
+from .events import WorkflowEvent, WorkflowEventType, sequencer
+
+LOG_FILE = "events.log"
+INDEX_FILE = "events.idx"
+# Files owned by the event log, not by any agent
+EVENT_LOG_FILES = frozenset({LOG_FILE, INDEX_FILE})
+
+_FRAME = struct.Struct("<IId")
+_INDEX = struct.Struct("<Qdq")
+_RUN_END = {WorkflowEventType.WORKFLOW_COMPLETE.value, WorkflowEventType.WORKFLOW_PAUSED.value}
+_MAX_OPEN_LOGS = 64
+
+
+def _checksum(ts_bytes: bytes, payload: bytes) -> int:
+    return zlib.crc32(payload, zlib.crc32(ts_bytes))
+
+
+class _RunLog:
+    """Open log + index files of one run (used by the writer thread only)."""
+
+    def __init__(self, run_dir: Path):
+        run_dir.mkdir(parents=True, exist_ok=True)
+        self.log = open(run_dir / LOG_FILE, "ab")
+        self.index = open(run_dir / INDEX_FILE, "ab")
+        self.offset = self.log.seek(0, os.SEEK_END)
+        valid_end = _valid_end(run_dir)
+        if valid_end < self.offset:
+            # Drop a torn frame so new frames stay reachable
+            self.log.truncate(valid_end)
+            self.offset = valid_end
+        self.since_index = cfg.EVENT_LOG_INDEX_INTERVAL  # Index the first frame of every session
+        self.last_sync = time.monotonic()
+
+    def write(self, records: List[Tuple[Dict[str, Any], float]]):
+        frames = bytearray()
+        entries = bytearray()
+        for message, ts in records:
+            payload = orjson.dumps(message)
+            ts_bytes = struct.pack("<d", ts)
+            if self.since_index >= cfg.EVENT_LOG_INDEX_INTERVAL:
+                entries += _INDEX.pack(message.get("seq") or 0, ts, self.offset + len(frames))
+                self.since_index = 0
+            frames += _FRAME.pack(len(payload), _checksum(ts_bytes, payload), ts) + payload
+            self.since_index += 1
+        self.log.write(frames)
+        self.log.flush()
+        if entries:
+            self.index.write(entries)
+            self.index.flush()
+        self.offset += len(frames)
+
+    def sync(self):
+        os.fsync(self.log.fileno())
+        os.fsync(self.index.fileno())
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        self.sync()
+        self.log.close()
+        self.index.close()
+
+
+class EventLogWriter:
+    """Background writer: batched appends, periodic fsync."""
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._logs: "OrderedDict[str, _RunLog]" = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def append(self, run_id: str, message: Dict[str, Any]):
+        """Queue an event for the run's log (never blocks on I/O)."""
+        self._ensure_started()
+        self._queue.put((run_id, message, time.time()))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is written and synced."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=cfg.EVENT_LOG_FSYNC_SECONDS)
+            except queue.Empty:
+                self._sync_due(force=True)
+                continue
+
+            batch = [item]
+            while len(batch) < cfg.EVENT_LOG_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"Error writing event log: {e}")
+
+    def _write_batch(self, batch: list):
+        by_run: Dict[str, List[Tuple[Dict[str, Any], float]]] = {}
+        waiters = []
+        for item in batch:
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+                continue
+            run_id, message, ts = item
+            by_run.setdefault(run_id, []).append((message, ts))
+
+        for run_id, records in by_run.items():
+            self._open(run_id).write(records)
+            if any(message.get("type") in _RUN_END for message, _ in records):
+                self._logs.pop(run_id).close()
+
+        self._sync_due(force=bool(waiters))
+        for waiter in waiters:
+            waiter.set()
+
+    def _open(self, run_id: str) -> _RunLog:
+        run_log = self._logs.get(run_id)
+        if run_log is None:
+            run_log = self._logs[run_id] = _RunLog(cfg.ARTIFACTS_DIR / run_id)
+            while len(self._logs) > _MAX_OPEN_LOGS:
+                self._logs.popitem(last=False)[1].close()
+        self._logs.move_to_end(run_id)
+        return run_log
+
+    def _sync_due(self, force: bool = False):
+        now = time.monotonic()
+        for run_log in self._logs.values():
+            if force or now - run_log.last_sync >= cfg.EVENT_LOG_FSYNC_SECONDS:
+                run_log.sync()
+
+
+writer = EventLogWriter()
+
+
+def dispatch(event: WorkflowEvent) -> Dict[str, Any]:
+    """
+    Number an event for its run, queue it for the run's log and return the
+    message to broadcast. Events without a run_id are passed through.
+    """
+    run_id = event.data.get("run_id")
+    if run_id and event.seq is None:
+        if sequencer.last(run_id) == 0:
+            # First event of this run in this process: continue the logged numbering
+            sequencer.seed(run_id, last_logged_seq(run_id))
+        event.seq = sequencer.next(run_id)
+    message = event.to_dict()
+    if run_id and cfg.EVENT_LOG_ENABLED:
+        writer.append(run_id, message)
+    return message
+
+
+def _iter_frames(path: Path, offset: int = 0) -> Iterator[Tuple[float, Dict[str, Any], int]]:
+    """Yield (dispatch time, message, end offset) per frame from `offset` until the end or a torn frame."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            header = f.read(_FRAME.size)
+            if len(header) < _FRAME.size:
+                return
+            length, crc, ts = _FRAME.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or _checksum(header[8:], payload) != crc:
+                return
+            offset += _FRAME.size + length
+            yield ts, orjson.loads(payload), offset
+
+
+def _load_index(run_dir: Path) -> List[Tuple[int, float, int]]:
+    index_file = run_dir / INDEX_FILE
+    if not index_file.exists():
+        return []
+    data = index_file.read_bytes()
+    usable = len(data) - len(data) % _INDEX.size
+    return list(_INDEX.iter_unpack(data[:usable]))
+
+
+def _valid_end(run_dir: Path) -> int:
+    """Offset just past the last intact frame of a run's log."""
+    index = _load_index(run_dir)
+    end = index[-1][2] if index else 0
+    for _, _, frame_end in _iter_frames(run_dir / LOG_FILE, end):
+        end = frame_end
+    return end
+
+
+def last_logged_seq(run_id: str) -> int:
+    """Highest sequence number in a run's log (0 if there is none)."""
+    run_dir = cfg.ARTIFACTS_DIR / run_id
+    if not (run_dir / LOG_FILE).exists():
+        return 0
+    index = _load_index(run_dir)
+    last = index[-1][0] if index else 0
+    for _, message, _ in _iter_frames(run_dir / LOG_FILE, index[-1][2] if index else 0):
+        last = max(last, message.get("seq") or 0)
+    return last
+
+
+def read_events(run_id: str, from_seq: Optional[int] = None, to_seq: Optional[int] = None,
+                from_ts: Optional[float] = None, to_ts: Optional[float] = None,
+                limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Read a sequence and/or time range of a run's logged events.
+
+    Args:
+        run_id: Run to read
+        from_seq / to_seq: Inclusive sequence bounds
+        from_ts / to_ts: Inclusive dispatch-time bounds (Unix seconds)
+        limit: Maximum number of events to return
+
+    Returns:
+        Event dicts in log order, each with its dispatch time as `logged_at`
+    """
+    run_dir = cfg.ARTIFACTS_DIR / run_id
+    if not (run_dir / LOG_FILE).exists():
+        return []
+
+    # Seek to the last indexed frame at or before the start of the range
+    offset = 0
+    index = _load_index(run_dir)
+    if index and (from_seq is not None or from_ts is not None):
+        position = bisect_right([entry[0] for entry in index], from_seq) if from_seq is not None else len(index)
+        if from_ts is not None:
+            position = min(position, bisect_right([entry[1] for entry in index], from_ts))
+        if position > 0:
+            offset = index[position - 1][2]
+
+    events = []
+    for ts, message, _ in _iter_frames(run_dir / LOG_FILE, offset):
+        seq = message.get("seq") or 0
+        if (to_seq is not None and seq > to_seq) or (to_ts is not None and ts > to_ts):
+            break
+        if (from_seq is not None and seq < from_seq) or (from_ts is not None and ts < from_ts):
+            continue
+        message["logged_at"] = ts
+        events.append(message)
+        if limit is not None and len(events) >= limit:
+            break
+    return events
@@ -1,7 +1,8 @@
+import threading
 from enum import Enum, auto
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 class WorkflowEventType(Enum):
     """Types of events emitted by the orchestrator."""
@@ -15,9 +16,7 @@ class WorkflowEventType(Enum):
     ARTIFACT_GENERATED = "artifact_generated"
     THOUGHT_CHUNK = "thought_chunk"
     ERROR = "error"
-
-# Track which runs have been requested to stop
-STOPPED_RUNS = set()
+    REPLAY = "replay"  # Sent to a subscriber before its replayed events
 
 
 @dataclass
@@ -26,10 +25,40 @@ class WorkflowEvent:
     type: WorkflowEventType
     data: Dict[str, Any]
     timestamp: datetime = field(default_factory=datetime.now)
+    seq: Optional[int] = None  # Per-run sequence number, assigned on dispatch
 
     def to_dict(self):
-        return {
+        event = {
             "type": self.type.value,
             "data": self.data,
             "timestamp": self.timestamp.isoformat()
         }
+        if self.seq is not None:
+            event["seq"] = self.seq
+        return event
+
+
+class EventSequencer:
+    """Thread-safe, monotonically increasing sequence numbers per run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last: Dict[str, int] = {}
+
+    def next(self, run_id: str) -> int:
+        with self._lock:
+            seq = self._last.get(run_id, 0) + 1
+            self._last[run_id] = seq
+            return seq
+
+    def last(self, run_id: str) -> int:
+        with self._lock:
+            return self._last.get(run_id, 0)
+
+    def seed(self, run_id: str, last_seq: int):
+        """Continue numbering after `last_seq` (never moves backwards)."""
+        with self._lock:
+            self._last[run_id] = max(self._last.get(run_id, 0), last_seq)
+
+
+sequencer = EventSequencer()
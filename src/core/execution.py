@@ -0,0 +1,300 @@
+"""Multi-Agent QA System - Test Execution
+
+Shared by the two execution stages of a run:
+- Executor: the Developer's own tests in src/, inside the run's virtualenv
+- AutomationExecutor: the AutomationQA suite (testing/test_app.py) run
+  against src/ in the same virtualenv
+
+The automation suite is sharded: its test IDs are collected once, split
+round-robin into up to AUTOMATION_SHARDS groups, and each group runs in its
+own pytest process. Every process writes JUnit XML, so results are
+structured (test id, outcome, message) instead of scraped from stdout. The
+Executor's failures are condensed by `failure_digest` into the feedback the
+Developer gets on its next iteration.
+
+automation_qa_node starts the suite in the background as soon as the test
+script is written (the code already exists at that point), so it executes
+while ManualQA is still generating; the AutomationExecutor node then only
+collects the result, or runs the suite itself if nothing was started
+(resumed run, node cache hit).
+"""
+import math
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import config as cfg
+from .cancellation import run_subprocess
+from .hashing import content_hash
+
+StatusFn = Callable[[str], None]
+
+# Installed next to the generated requirements so the test tooling is always there
+BASE_TEST_PACKAGES = ["pytest", "fastapi", "httpx"]
+# Executor's pytest invocation in src/ (plus --junitxml)
+UNIT_TEST_ARGS = [".", "-q", "-p", "no:cacheprovider", "--tb=short", "--continue-on-collection-errors"]
+
+# Failure digest limits (the Developer's prompt only needs the failing assertion and our frames)
+_DIGEST_MAX_FAILURES = 10
+_DIGEST_MAX_FRAMES = 3
+_DIGEST_MAX_ERROR_LINES = 8
+_DIGEST_MAX_LINE = 200
+_FRAME = re.compile(r"^(?P<file>\S[^:]*\.py):(?P<line>\d+): ")
+_THIRD_PARTY = ("site-packages", ".venv")
+
+_venv_locks: Dict[Path, threading.Lock] = {}
+_venv_locks_guard = threading.Lock()
+
+
+@dataclass
+class CaseResult:
+    """Outcome of one test case."""
+    id: str
+    outcome: str  # "passed" | "failed" | "error" | "skipped"
+    message: str = ""
+    details: str = ""
+    duration: float = 0.0
+
+
+def venv_tools(venv_dir: Path) -> Dict[str, str]:
+    """Paths of python, pip and pytest inside a virtualenv."""
+    if os.name == "nt":
+        bin_dir, suffix = venv_dir / "Scripts", ".exe"
+    else:
+        bin_dir, suffix = venv_dir / "bin", ""
+    return {tool: str(bin_dir / f"{tool}{suffix}") for tool in ("python", "pip", "pytest")}
+
+
+def prepare_venv(run_id: str, src_dir: Path, status: Optional[StatusFn] = None) -> Optional[str]:
+    """
+    Create the run's virtualenv (src/.venv) if needed and install its dependencies.
+
+    Returns:
+        None when ready, otherwise the error text (e.g. pip output)
+    """
+    status = status or (lambda message: None)
+    venv_dir = src_dir / ".venv"
+    tools = venv_tools(venv_dir)
+    with _venv_lock(venv_dir):
+        if not venv_dir.exists():
+            status("Creating virtual environment...\n")
+            run_subprocess(run_id, [sys.executable, "-m", "venv", str(venv_dir)], cwd=src_dir, check=True)
+
+        req_file = src_dir / "requirements.txt"
+        if req_file.exists() or not Path(tools["pytest"]).exists():
+            status("Installing dependencies...\n")
+            run_subprocess(run_id, [tools["pip"], "install", *BASE_TEST_PACKAGES], cwd=src_dir)
+        if req_file.exists():
+            install_res = run_subprocess(run_id, [tools["pip"], "install", "-r", "requirements.txt"], cwd=src_dir, text=True)
+            if install_res.returncode != 0:
+                return f"Dependency Installation Failed:\n{install_res.stderr}\n{install_res.stdout}"
+    return None
+
+
+def parse_junit(path: Path) -> List[CaseResult]:
+    """Test case results from a pytest JUnit XML report."""
+    results = []
+    for case in ET.parse(path).getroot().iter("testcase"):
+        classname, name = case.get("classname", ""), case.get("name", "")
+        case_id = f"{classname}::{name}" if classname else name
+        outcome, message, details = "passed", "", ""
+        for tag in ("failure", "error", "skipped"):
+            element = case.find(tag)
+            if element is not None:
+                outcome = "failed" if tag == "failure" else tag
+                message = element.get("message", "")
+                details = element.text or ""
+                break
+        results.append(CaseResult(case_id, outcome, message, details, float(case.get("time") or 0.0)))
+    return results
+
+
+def summarize(cases: List[CaseResult]) -> Dict[str, int]:
+    counts = {"passed": 0, "failed": 0, "error": 0, "skipped": 0}
+    for case in cases:
+        counts[case.outcome] = counts.get(case.outcome, 0) + 1
+    return counts
+
+
+def failure_digest(cases: List[CaseResult], root: Optional[Path] = None) -> str:
+    """
+    Compact feedback for failing tests: test id, the failing assertion /
+    exception, and the traceback frames that are in generated files (paths
+    relative to `root`; interpreter and site-packages frames are dropped).
+    """
+    counts = summarize(cases)
+    failing = [case for case in cases if case.outcome in ("failed", "error")]
+    totals = ", ".join(f"{counts[k]} {k}" for k in ("failed", "error", "passed", "skipped") if counts.get(k))
+    lines = [f"Tests Failed: {totals}"]
+    for number, case in enumerate(failing[:_DIGEST_MAX_FAILURES], 1):
+        lines += ["", f"{number}. {case.id} ({case.outcome})"]
+        frames, errors = _split_traceback(case.details, root)
+        for frame in frames[-_DIGEST_MAX_FRAMES:]:
+            lines += [f"   {_clip(line)}" for line in frame]
+        if not errors and case.message:
+            errors = [f"E   {line}" for line in case.message.splitlines()]
+        lines += [f"   {_clip(line)}" for line in errors[:_DIGEST_MAX_ERROR_LINES]]
+        if len(errors) > _DIGEST_MAX_ERROR_LINES:
+            lines.append(f"   ... {len(errors) - _DIGEST_MAX_ERROR_LINES} more line(s)")
+    if len(failing) > _DIGEST_MAX_FAILURES:
+        lines += ["", f"... and {len(failing) - _DIGEST_MAX_FAILURES} more failing test(s)"]
+    return "\n".join(lines)
+
+
+def _split_traceback(details: str, root: Optional[Path]) -> Tuple[List[List[str]], List[str]]:
+    """Frames in generated files (header plus source lines) and the `E` lines of a --tb=short report."""
+    frames: List[List[str]] = []
+    errors: List[str] = []
+    current: Optional[List[str]] = None
+    prefix = f"{root}{os.sep}" if root else None
+    for line in details.splitlines():
+        match = _FRAME.match(line)
+        if match:
+            path = match.group("file")
+            if prefix and path.startswith(prefix):
+                path = path[len(prefix):]
+                line = path + line[len(match.group("file")):]
+            generated = not os.path.isabs(path) and not any(part in path for part in _THIRD_PARTY)
+            current = [line] if generated else None
+            if current is not None:
+                frames.append(current)
+        elif line.startswith("E "):
+            errors.append(line)
+            current = None
+        elif current is not None and line.strip() and not set(line.strip()) <= {"^", "~"}:
+            current.append(line)
+    return frames, errors
+
+
+def _clip(line: str) -> str:
+    return line if len(line) <= _DIGEST_MAX_LINE else line[:_DIGEST_MAX_LINE] + "..."
+
+
+class AutomationExecutor:
+    """Runs AutomationQA suites in sharded pytest processes, optionally ahead of time."""
+
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=cfg.AUTOMATION_BACKGROUND_RUNS, thread_name_prefix="automation")
+        self._started: Dict[str, Tuple[str, Future]] = {}  # run_id -> (suite hash, result)
+        self._lock = threading.Lock()
+
+    def start(self, run_id: str, src_dir: Path, test_file: Path):
+        """Start the suite in the background; `collect` picks the result up."""
+        key = content_hash(test_file.read_text(encoding="utf-8"))
+        with self._lock:
+            if run_id in self._started and self._started[run_id][0] == key:
+                return
+            self._started[run_id] = (key, self._pool.submit(self.run, run_id, src_dir, test_file))
+
+    def collect(self, run_id: str, src_dir: Path, test_file: Path, status: Optional[StatusFn] = None) -> Dict[str, Any]:
+        """Result of the suite started for this exact test file, or of a fresh run."""
+        key = content_hash(test_file.read_text(encoding="utf-8"))
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is not None and started[0] == key:
+            if status and not started[1].done():
+                status("Waiting for the automation suite started after AutomationQA...\n")
+            return started[1].result()
+        return self.run(run_id, src_dir, test_file, status)
+
+    def run(self, run_id: str, src_dir: Path, test_file: Path, status: Optional[StatusFn] = None) -> Dict[str, Any]:
+        """
+        Run the suite against `src_dir` and return structured results.
+
+        `status` is "passed", "failed" (per-test results and counts, where
+        "error" counts errored tests) or "error" when the suite could not run
+        (the reason is in `error_message`).
+        """
+        status = status or (lambda message: None)
+        started = time.monotonic()
+        result: Dict[str, Any] = {"status": "error", "shards": 0, "tests": [], "duration": 0.0,
+                                  **summarize([])}
+        try:
+            error = prepare_venv(run_id, src_dir, status)
+            if error:
+                result["error_message"] = error
+                return result
+
+            tools = venv_tools(src_dir / ".venv")
+            env = {**os.environ, "PYTHONPATH": str(src_dir)}
+            rootdir = test_file.parent.parent
+            common = ["-p", "no:cacheprovider", f"--rootdir={rootdir}"]
+
+            collected = run_subprocess(run_id, [tools["pytest"], "--collect-only", "-q", *common, str(test_file)],
+                                       cwd=src_dir, env=env, text=True, timeout=cfg.AUTOMATION_TIMEOUT_SECONDS)
+            test_ids = _collected_ids(collected.stdout)
+            if collected.returncode not in (0, 5):
+                result["error_message"] = f"Test collection failed:\n{collected.stdout[-2000:]}\n{collected.stderr[-2000:]}"
+                return result
+            if not test_ids:
+                result["error_message"] = "No tests collected."
+                return result
+
+            shard_count = max(1, min(cfg.AUTOMATION_SHARDS, math.ceil(len(test_ids) / cfg.AUTOMATION_MIN_TESTS_PER_SHARD)))
+            shards = [test_ids[i::shard_count] for i in range(shard_count)]
+            status(f"Running {len(test_ids)} automation tests in {shard_count} process(es)...\n")
+
+            with tempfile.TemporaryDirectory(prefix="automation_") as tmp:
+                with ThreadPoolExecutor(max_workers=shard_count) as pool:
+                    futures = [pool.submit(self._run_shard, run_id, tools, env, common, src_dir, rootdir, ids,
+                                           Path(tmp) / f"shard_{i}.xml")
+                               for i, ids in enumerate(shards)]
+                    cases = [case for future in futures for case in future.result()]
+
+            result.update(summarize(cases))
+            result["shards"] = shard_count
+            result["tests"] = [asdict(case) for case in cases]
+            result["status"] = "passed" if result["failed"] == 0 and result["error"] == 0 else "failed"
+            return result
+        except subprocess.TimeoutExpired:
+            result["error_message"] = f"Test collection took longer than {cfg.AUTOMATION_TIMEOUT_SECONDS} seconds."
+            return result
+        except InterruptedError:
+            raise
+        except Exception as e:
+            result["error_message"] = f"Execution Error: {e}"
+            return result
+        finally:
+            result["duration"] = round(time.monotonic() - started, 2)
+
+    def _run_shard(self, run_id: str, tools: Dict[str, str], env: Dict[str, str], common: List[str],
+                   src_dir: Path, rootdir: Path, test_ids: List[str], report: Path) -> List[CaseResult]:
+        # Collected IDs are relative to the rootdir; pytest runs from src/
+        args = [str(rootdir / test_id) for test_id in test_ids]
+        try:
+            run_subprocess(run_id, [tools["pytest"], "-q", *common, f"--junitxml={report}", *args],
+                           cwd=src_dir, env=env, text=True, timeout=cfg.AUTOMATION_TIMEOUT_SECONDS)
+        except subprocess.TimeoutExpired:
+            return [CaseResult(test_id, "error", f"Timed out after {cfg.AUTOMATION_TIMEOUT_SECONDS} seconds")
+                    for test_id in test_ids]
+        if not report.exists():
+            return [CaseResult(test_id, "error", "pytest produced no report") for test_id in test_ids]
+        return parse_junit(report)
+
+
+def _collected_ids(output: str) -> List[str]:
+    """Test IDs from `pytest --collect-only -q` (listed before the first blank line)."""
+    ids = []
+    for line in output.splitlines():
+        if not line.strip():
+            break
+        if "::" in line and not line[0].isspace():
+            ids.append(line.strip())
+    return ids
+
+
+def _venv_lock(venv_dir: Path) -> threading.Lock:
+    with _venv_locks_guard:
+        return _venv_locks.setdefault(venv_dir, threading.Lock())
+
+
+automation_executor = AutomationExecutor()
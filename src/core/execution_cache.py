@@ -0,0 +1,107 @@
+"""Multi-Agent QA System - Execution Result Cache
+
+The Developer often returns a byte-identical tree (e.g. after a review in
+which only its explanation changed), and the Executor would then repeat the
+venv, pip and pytest cycle for the same result. Completed executions are
+cached under EXECUTION_CACHE_DIR, keyed by a hash of:
+
+- the generated source tree (requirements.txt included)
+- the executor configuration (pytest arguments, base test packages, Python
+  version and platform)
+
+The cache is shared by all runs and forks. Entries are small JSON files; a
+hit refreshes the entry's mtime, and once the directory grows beyond
+EXECUTION_CACHE_MAX_BYTES the least recently used entries are deleted.
+
+Only finished pytest runs are cached: dependency install failures, timeouts
+and executor errors may be transient and are always retried.
+"""
+import os
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from . import config as cfg
+from .artifacts import atomic_write_bytes
+from .hashing import stable_hash, tree_hash
+
+# Bump when the cached test_results format changes
+_FORMAT_VERSION = 1
+# Eviction trims the cache to this fraction of EXECUTION_CACHE_MAX_BYTES
+_EVICT_TO = 0.8
+
+
+class ExecutionCache:
+    """Executor results by source-tree hash, shared across runs."""
+
+    def __init__(self, path=None):
+        self._path = path
+        self._evict_lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path or cfg.EXECUTION_CACHE_DIR
+
+    def key(self, files: Dict[str, str], pytest_args: List[str], packages: List[str]) -> str:
+        return stable_hash({
+            "tree": tree_hash(files),
+            "pytest_args": pytest_args,
+            "packages": packages,
+            "python": list(sys.version_info[:3]),
+            "platform": sys.platform,
+            "format": _FORMAT_VERSION,
+        })
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached {tests_passed, test_results, run_id, created}, or None."""
+        if not cfg.EXECUTION_CACHE_ENABLED:
+            return None
+        entry_file = self.path / f"{key}.json"
+        try:
+            entry = orjson.loads(entry_file.read_bytes())
+            os.utime(entry_file)  # Recently used: evicted last
+        except (OSError, orjson.JSONDecodeError):
+            return None
+        return entry
+
+    def put(self, key: str, run_id: str, tests_passed: bool, test_results: str):
+        if not cfg.EXECUTION_CACHE_ENABLED:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "tests_passed": tests_passed,
+            "test_results": test_results,
+            "run_id": run_id,
+            "created": datetime.now().isoformat(),
+        }
+        atomic_write_bytes(self.path / f"{key}.json", orjson.dumps(entry))
+        self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries while the cache exceeds its size limit."""
+        limit = cfg.EXECUTION_CACHE_MAX_BYTES
+        with self._evict_lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.path):
+                if entry.is_file() and entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            if total <= limit:
+                return
+            entries.sort()
+            for _, size, entry_path in entries:
+                if total <= limit * _EVICT_TO:
+                    break
+                try:
+                    os.unlink(entry_path)
+                    total -= size
+                except FileNotFoundError:
+                    pass  # Evicted by another process
+
+
+execution_cache = ExecutionCache()
@@ -0,0 +1,25 @@
+"""Multi-Agent QA System - Content Hashing Helpers"""
+import hashlib
+from typing import Any
+
+import orjson
+
+
+def content_hash(content: str) -> str:
+    """Short, stable hash of a text blob (used for change detection)."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+def stable_hash(value: Any) -> str:
+    """Hash a JSON-like value independently of dict ordering."""
+    payload = orjson.dumps(value, option=orjson.OPT_SORT_KEYS, default=str)
+    return hashlib.sha256(payload).hexdigest()
+
+
+def tree_hash(files: dict[str, str]) -> str:
+    """Hash of a file tree (relative path -> content)."""
+    digest = hashlib.sha256()
+    for filename in sorted(files):
+        digest.update(filename.encode("utf-8") + b"\0")
+        digest.update(files[filename].encode("utf-8") + b"\0")
+    return digest.hexdigest()
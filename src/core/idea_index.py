@@ -0,0 +1,244 @@
+"""Multi-Agent QA System - Similar Idea Index
+
+TF-IDF index over past runs' product ideas and their generated MRS/SRS, so a
+near-duplicate idea ("todo app with auth" / "a simple todo app with login")
+can reuse earlier requirements instead of paying for a new ProductManager
+generation.
+
+Documents are appended to IDEA_INDEX_PATH (JSON lines) when the
+ProductManager produces requirements; every process tails the file, so
+updates are incremental and shared. A missing index is backfilled from the
+runs on disk. Terms are lowercased words with light stemming, a small
+synonym table (a stand-in for embeddings) and word bigrams. The score is
+cosine similarity against the idea, blended with similarity against the
+requirements' most frequent terms.
+
+Reuse policy (IDEA_REUSE_MODE, or `reuse` on /run):
+- "off":     never look
+- "suggest": report similar runs; reuse only when a run is chosen explicitly
+- "auto":    reuse the SRS/MRS directly at IDEA_REUSE_THRESHOLD, use them as
+             a warm start (reference for the ProductManager) at
+             IDEA_WARM_START_THRESHOLD
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from . import config as cfg
+from .archive import read_run_file
+from .run_manager import get_run_metadata
+
+REUSE_MODES = ("off", "suggest", "auto")
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and app application are as at be build by can for from has have i in into is it its let me my "
+    "need of on or our simple so that the their them this to tool use user users want we web which "
+    "will with you your".split()
+)
+_SYNONYMS = {
+    "login": "auth", "logins": "auth", "signin": "auth", "signup": "auth", "authentication": "auth",
+    "authenticate": "auth", "authorization": "auth", "password": "auth", "passwords": "auth",
+    "todo": "task", "todos": "task", "tasks": "task", "checklist": "task",
+    "shop": "store", "ecommerce": "store", "cart": "store",
+    "chat": "message", "messaging": "message", "messages": "message",
+    "blog": "post", "posts": "post", "article": "post", "articles": "post",
+}
+_IDEA_WEIGHT = 0.75  # Remainder: similarity against the requirements' terms
+_REQUIREMENT_TERMS = 200  # Most frequent MRS/SRS terms kept per document
+
+
+def _stem(word: str) -> str:
+    word = _SYNONYMS.get(word, word)
+    for suffix in ("ing", "ies", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            word = word[: -len(suffix)] + ("y" if suffix == "ies" else "")
+            break
+    return _SYNONYMS.get(word, word)
+
+
+def terms(text: str) -> Counter:
+    """Term counts of a text: stemmed words plus word bigrams."""
+    words = [_stem(w) for w in _WORD.findall(text.lower().replace("-", "")) if w not in _STOPWORDS and len(w) > 1]
+    counts = Counter(words)
+    counts.update(f"{a}_{b}" for a, b in zip(words, words[1:]))
+    return counts
+
+
+class IdeaIndex:
+    """Incrementally updated TF-IDF index over runs' ideas and requirements."""
+
+    def __init__(self, path=None):
+        self._path = path
+        self._docs: Dict[str, Dict[str, Any]] = {}  # run_id -> {idea, idea_terms, req_terms}
+        self._df: Counter = Counter()  # Idea documents containing each term
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path or cfg.IDEA_INDEX_PATH
+
+    def add(self, run_id: str, product_idea: str, mrs: str = "", srs: str = ""):
+        """Index (or re-index) a run's idea and requirements."""
+        doc = _document(run_id, product_idea, mrs, srs)
+        with self._lock:
+            self._refresh()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(orjson.dumps(doc) + b"\n")
+            self._refresh()
+
+    def search(self, product_idea: str, limit: int = 5, exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most similar indexed runs, best first, as {run_id, product_idea, score}."""
+        with self._lock:
+            self._refresh()
+            if not self._docs:
+                return []
+            n_docs = len(self._docs)
+            idf = lambda term: math.log((1 + n_docs) / (1 + self._df.get(term, 0))) + 1.0
+            query = {term: count * idf(term) for term, count in terms(product_idea).items()}
+            query_norm = _norm(query)
+            if not query_norm:
+                return []
+
+            results = []
+            for run_id, doc in self._docs.items():
+                if run_id == exclude:
+                    continue
+                idea_score = _cosine(query, query_norm, doc["idea_vec"], doc["idea_norm"])
+                req_score = _cosine(query, query_norm, doc["req_vec"], doc["req_norm"])
+                score = _IDEA_WEIGHT * idea_score + (1 - _IDEA_WEIGHT) * req_score
+                if score > 0:
+                    results.append({"run_id": run_id, "product_idea": doc["idea"], "score": round(score, 4)})
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:limit]
+
+    def plan_reuse(self, product_idea: str, mode: Optional[str] = None,
+                   run_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Decide how a new run uses prior requirements.
+
+        Returns:
+            {"action": "reuse" | "warm_start" | None, "run_id", "score", "similar"}
+        """
+        mode = mode or cfg.IDEA_REUSE_MODE
+        if mode not in REUSE_MODES:
+            raise ValueError(f"Unknown reuse mode: {mode}")
+        if run_id:
+            return {"action": "reuse", "run_id": run_id, "score": None, "similar": []}
+        if mode == "off":
+            return {"action": None, "run_id": None, "score": None, "similar": []}
+
+        similar = self.search(product_idea)
+        plan = {"action": None, "run_id": None, "score": None, "similar": similar}
+        if mode == "auto" and similar:
+            best = similar[0]
+            if best["score"] >= cfg.IDEA_REUSE_THRESHOLD:
+                plan.update(action="reuse", run_id=best["run_id"], score=best["score"])
+            elif best["score"] >= cfg.IDEA_WARM_START_THRESHOLD:
+                plan.update(action="warm_start", run_id=best["run_id"], score=best["score"])
+        return plan
+
+    def _refresh(self):
+        """Load documents appended since the last read (by any process); backfill a missing index."""
+        if not self.path.exists():
+            if self._offset == 0 and not self._docs:
+                self._backfill()
+            return
+        size = self.path.stat().st_size
+        if size < self._offset:
+            # Rewritten: reload from scratch
+            self._docs.clear()
+            self._df.clear()
+            self._offset = 0
+        if size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        complete = data.rfind(b"\n") + 1  # Ignore a line still being written
+        for line in data[:complete].splitlines():
+            try:
+                self._load(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                continue
+        self._offset += complete
+
+    def _load(self, doc: Dict[str, Any]):
+        old = self._docs.get(doc["run_id"])
+        if old is not None:
+            self._df.subtract(old["idea_vec"].keys())
+        idea_vec = {term: float(count) for term, count in doc["idea_terms"].items()}
+        req_vec = {term: 1.0 + math.log(count) for term, count in doc["req_terms"].items()}
+        self._docs[doc["run_id"]] = {
+            "idea": doc["idea"],
+            "idea_vec": idea_vec,
+            "idea_norm": _norm(idea_vec),
+            "req_vec": req_vec,
+            "req_norm": _norm(req_vec),
+        }
+        self._df.update(idea_vec.keys())
+
+    def _backfill(self):
+        """Index the requirements of runs already on disk."""
+        if not cfg.ARTIFACTS_DIR.exists():
+            return
+        docs = []
+        for run_dir in cfg.ARTIFACTS_DIR.iterdir():
+            if run_dir.name.startswith(".") or not run_dir.is_dir():
+                continue
+            prior = load_requirements(run_dir.name)
+            if prior is None or not prior["product_idea"]:
+                continue
+            docs.append(_document(run_dir.name, prior["product_idea"], prior["mrs"], prior["srs"]))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(b"".join(orjson.dumps(doc) + b"\n" for doc in docs))
+        self._refresh()
+
+
+def load_requirements(run_id: str) -> Optional[Dict[str, str]]:
+    """A run's idea, MRS and SRS (from its directory or archive), or None if it has no SRS."""
+    srs = read_run_file(run_id, "requirements/SRS.md")
+    if srs is None:
+        return None
+    mrs = read_run_file(run_id, "requirements/MRS.md") or b""
+    metadata = get_run_metadata(run_id) or {}
+    return {
+        "product_idea": metadata.get("title") or "",
+        "mrs": mrs.decode("utf-8"),
+        "srs": srs.decode("utf-8"),
+    }
+
+
+def _document(run_id: str, product_idea: str, mrs: str, srs: str) -> Dict[str, Any]:
+    return {
+        "run_id": run_id,
+        "idea": product_idea,
+        "idea_terms": dict(terms(product_idea)),
+        "req_terms": dict(terms(f"{mrs}\n{srs}").most_common(_REQUIREMENT_TERMS)),
+        "indexed_at": round(time.time(), 3),
+    }
+
+
+def _norm(vec: Dict[str, float]) -> float:
+    return math.sqrt(sum(v * v for v in vec.values()))
+
+
+def _cosine(query: Dict[str, float], query_norm: float, vec: Dict[str, float], norm: float) -> float:
+    if not norm:
+        return 0.0
+    if len(vec) < len(query):
+        dot = sum(v * query.get(term, 0.0) for term, v in vec.items())
+    else:
+        dot = sum(v * vec.get(term, 0.0) for term, v in query.items())
+    return dot / (query_norm * norm)
+
+
+idea_index = IdeaIndex()
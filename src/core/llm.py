@@ -1,23 +1,66 @@
-"""Multi-Agent QA System - LLM Integration"""
+"""Multi-Agent QA System - LLM Integration
+
+Two clients stream chat responses from Ollama, selected by LLM_CLIENT:
+- "langchain": ChatOllama.stream on pooled abortable copies of the agent's
+  ChatOllama (message conversion and a chunk object per token)
+- "native": OllamaHTTPClient, which posts to /api/chat over pooled
+  keep-alive http.client connections and parses the NDJSON lines with orjson
+
+Both report usage from Ollama's final chunk and are aborted the same way
+(socket shutdown) by cancellation and the idle watchdog.
+"""
+import http.client
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import ollama
+import orjson
 from langchain_ollama import ChatOllama
 from rich.console import Console
-from typing import Optional, Callable
+from typing import Any, Dict, Iterator, List, Optional, Callable, Tuple, Union
 
-from .config import LLM_MODEL, LLM_BASE_URL, LLM_TEMPERATURE, LLM_NUM_CTX
+from . import config as cfg
+from . import metrics
+from .backends import backend_pool
+from .config import LLM_MODEL, LLM_BASE_URL, LLM_TEMPERATURE, LLM_NUM_CTX, LLM_STREAM_IDLE_SECONDS
+from .cancellation import cancellation
+from .token_ledger import ledger
 
 console = Console()
 
 
-def get_llm(model_name: str = LLM_MODEL) -> ChatOllama:
-    """Get configured Ollama LLM instance."""
+class LLMStreamStalled(TimeoutError):
+    """No chunk arrived from the backend within LLM_STREAM_IDLE_SECONDS."""
+
+
+def get_llm(model_name: str = LLM_MODEL, output_format: Optional[Union[str, dict[str, Any]]] = None) -> ChatOllama:
+    """
+    Get configured Ollama LLM instance.
+
+    Args:
+        model_name: Ollama model tag
+        output_format: Optional native output format ("json" or a JSON schema dict)
+    """
+    kwargs = {}
+    if output_format:
+        kwargs["format"] = output_format
     return ChatOllama(
         model=model_name,
         base_url=LLM_BASE_URL,
         temperature=LLM_TEMPERATURE,
         num_ctx=LLM_NUM_CTX,
+        **kwargs,
     )
 
 
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for prompt accounting."""
+    return (len(text) + 3) // 4
+
+
 def invoke_llm(llm: ChatOllama, messages: list[dict]) -> str:
     """
     Invoke LLM with messages and return response.
@@ -37,36 +80,403 @@ def invoke_llm(llm: ChatOllama, messages: list[dict]) -> str:
         raise
 
 
-def stream_llm(llm: ChatOllama, messages: list[dict], on_token: Optional[Callable[[str], None]] = None) -> tuple[str, dict]:
+class _AbortableLLM:
+    """A copy of a ChatOllama whose current HTTP connection can be shut down from another thread."""
+
+    def __init__(self, llm: ChatOllama, base_url: Optional[str]):
+        self.aborted = False
+        self._socket: Optional[socket.socket] = None
+
+        fields = {name: getattr(llm, name) for name in llm.model_fields_set}
+        client_kwargs = dict(llm.sync_client_kwargs or {})
+        hooks = dict(client_kwargs.get("event_hooks") or {})
+        hooks["request"] = [*hooks.get("request", []), self._on_request]
+        client_kwargs["event_hooks"] = hooks
+        fields["sync_client_kwargs"] = client_kwargs
+        if base_url:
+            fields["base_url"] = base_url
+        self.llm = type(llm)(**fields)
+
+    def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            sock = info["return_value"].get_extra_info("socket")
+            if sock is not None:
+                self._socket = sock
+
+    def _on_request(self, request):
+        request.extensions["trace"] = self._trace
+
+    def abort(self):
+        self.aborted = True
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        client = getattr(self.llm, "_client", None)
+        if client is not None:
+            client.close()
+
+
+class AbortableClients:
+    """
+    Idle abortable ChatOllama copies, reused across calls per (model, base_url and other fields).
+
+    A copy is leased to one call at a time, so its HTTP client holds at most
+    one connection: the socket recorded by the httpcore trace hook when that
+    connection was opened is the one the call's response arrives on, and
+    shutting it down wakes the blocked read and makes Ollama drop the
+    generation. Copies go back to the pool only after a fully read response
+    (keeping the keep-alive connection); aborted or failed ones are closed.
+    """
+
+    def __init__(self, max_idle_per_key: int = 8):
+        self._idle: Dict[Tuple[str, bytes], List[_AbortableLLM]] = {}
+        self._lock = threading.Lock()
+        self._max_idle = max_idle_per_key
+
+    def acquire(self, llm: ChatOllama, base_url: Optional[str] = None) -> _AbortableLLM:
+        key = self._key(llm, base_url)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        return _AbortableLLM(llm, base_url)
+
+    def release(self, lease: _AbortableLLM, reuse: bool):
+        if reuse and not lease.aborted:
+            with self._lock:
+                idle = self._idle.setdefault(self._key(lease.llm, None), [])
+                if len(idle) < self._max_idle:
+                    idle.append(lease)
+                    return
+        lease.close()
+
+    @staticmethod
+    def _key(llm: ChatOllama, base_url: Optional[str]) -> Tuple[str, bytes]:
+        fields = {name: getattr(llm, name) for name in llm.model_fields_set if name not in ("base_url", "sync_client_kwargs")}
+        return (base_url or llm.base_url or "", orjson.dumps(fields, option=orjson.OPT_SORT_KEYS, default=repr))
+
+
+abortable_clients = AbortableClients()
+
+
+# Stream items: (content, usage) where usage is set on the chunk that reports it
+StreamItem = Tuple[str, Optional[Dict[str, Any]]]
+
+# ChatOllama fields sent as Ollama `options`
+_OPTION_FIELDS = ("mirostat", "mirostat_eta", "mirostat_tau", "num_ctx", "num_gpu", "num_thread", "num_predict",
+                  "repeat_last_n", "repeat_penalty", "temperature", "seed", "stop", "tfs_z", "top_k", "top_p")
+# Failures of the transport (not of the request), whichever client is used
+_TRANSPORT_ERRORS = (httpx.TransportError, http.client.HTTPException, ConnectionError)
+
+
+def _final_usage(part: Dict[str, Any]) -> Dict[str, Any]:
+    """Usage from Ollama's final chunk (done=true)."""
+    usage = {
+        "input_tokens": part.get("prompt_eval_count") or 0,
+        "output_tokens": part.get("eval_count") or 0,
+    }
+    usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+    if part.get("prompt_eval_duration"):
+        usage["prompt_eval_ms"] = part["prompt_eval_duration"] / 1e6
+    return usage
+
+
+class OllamaHTTPClient:
+    """
+    Minimal streaming client for Ollama's /api/chat.
+
+    Connections are kept alive and reused per backend (a stream's connection
+    returns to the pool once its response is fully read). A connection
+    aborted mid-stream is closed instead.
     """
-    Stream LLM response to console and return full content with usage stats.
+
+    def __init__(self, max_idle_per_host: int = 8):
+        self._idle: Dict[Tuple[str, int], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._max_idle = max_idle_per_host
+
+    def chat_stream(self, llm: ChatOllama, base_url: str,
+                    messages: List[dict]) -> Tuple[Iterator[StreamItem], Callable[[], None]]:
+        """Lazy stream of (content, usage) for `messages`, plus an abort function usable from other threads."""
+        body = orjson.dumps(self._payload(llm, messages))
+        url = urlsplit(base_url)
+        host = (url.hostname or "localhost", url.port or (443 if url.scheme == "https" else 80))
+        secure = url.scheme == "https"
+        current: Dict[str, Any] = {"conn": None, "aborted": False}
+
+        def abort():
+            current["aborted"] = True
+            conn = current["conn"]
+            if conn is not None and conn.sock is not None:
+                try:
+                    conn.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+        def stream() -> Iterator[StreamItem]:
+            conn, response = self._send(host, secure, body, current)
+            reusable = False
+            try:
+                if response.status != 200:
+                    text = response.read().decode("utf-8", "replace")
+                    try:
+                        text = orjson.loads(text).get("error", text)
+                    except (orjson.JSONDecodeError, AttributeError):
+                        pass
+                    raise ollama.ResponseError(text, response.status)
+                done = False
+                for line in response:
+                    if not line.strip():
+                        continue
+                    part = orjson.loads(line)
+                    if part.get("error"):
+                        raise ollama.ResponseError(part["error"])
+                    done = bool(part.get("done"))
+                    content = (part.get("message") or {}).get("content") or ""
+                    yield content, _final_usage(part) if done else None
+                if not done or current["aborted"]:
+                    # A shut-down socket can end the body like a clean EOF
+                    raise ConnectionAbortedError("Ollama stream ended before its final chunk")
+                reusable = not response.will_close
+            finally:
+                if reusable:
+                    self._release(host, conn)
+                else:
+                    conn.close()
+
+        return stream(), abort
+
+    def _send(self, host: Tuple[str, int], secure: bool, body: bytes,
+              current: Dict[str, Any]) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        headers = {"Content-Type": "application/json", "Accept": "application/x-ndjson"}
+        conn, reused = self._acquire(host, secure)
+        current["conn"] = conn
+        try:
+            conn.request("POST", "/api/chat", body=body, headers=headers)
+            return conn, conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused or current["aborted"]:
+                raise
+        # The server closed the idle keep-alive connection: once more on a new one
+        conn, _ = self._acquire(host, secure, fresh=True)
+        current["conn"] = conn
+        try:
+            conn.request("POST", "/api/chat", body=body, headers=headers)
+            return conn, conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+
+    def _acquire(self, host: Tuple[str, int], secure: bool, fresh: bool = False) -> Tuple[http.client.HTTPConnection, bool]:
+        if not fresh:
+            with self._lock:
+                idle = self._idle.get(host)
+                if idle:
+                    return idle.pop(), True
+        factory = http.client.HTTPSConnection if secure else http.client.HTTPConnection
+        return factory(*host), False
+
+    def _release(self, host: Tuple[str, int], conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(host, [])
+            if len(idle) < self._max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    @staticmethod
+    def _payload(llm: ChatOllama, messages: List[dict]) -> Dict[str, Any]:
+        options = {name: getattr(llm, name) for name in _OPTION_FIELDS if getattr(llm, name, None) is not None}
+        payload = {
+            "model": llm.model,
+            "messages": [{"role": m.get("role", "user"), "content": m.get("content", "")} for m in messages],
+            "stream": True,
+            "options": options,
+        }
+        if llm.format:
+            payload["format"] = llm.format
+        if llm.keep_alive is not None:
+            payload["keep_alive"] = llm.keep_alive
+        return payload
+
+
+native_client = OllamaHTTPClient()
+
+
+def _langchain_stream(llm: ChatOllama, messages: List[dict]) -> Iterator[StreamItem]:
+    for chunk in llm.stream(messages):
+        usage = None
+        if getattr(chunk, "usage_metadata", None):
+            usage = {key: chunk.usage_metadata.get(key, 0) for key in ("input_tokens", "output_tokens", "total_tokens")}
+        # Ollama timings (last chunk): how long prompt evaluation took
+        prompt_eval_ns = (getattr(chunk, "response_metadata", None) or {}).get("prompt_eval_duration")
+        if prompt_eval_ns:
+            usage = usage or {}
+            usage["prompt_eval_ms"] = prompt_eval_ns / 1e6
+        yield chunk.content, usage
+
+
+class _IdleWatchdog:
+    """Calls `abort` from a helper thread when `touch` was not called for `seconds` (None: disabled)."""
+
+    def __init__(self, seconds: Optional[float], abort: Optional[Callable[[], None]]):
+        self.seconds = seconds if abort is not None else None
+        self.abort = abort
+        self.fired = False
+        self._last = time.monotonic()
+        self._done = threading.Event()
+
+    def __enter__(self):
+        if self.seconds:
+            threading.Thread(target=self._run, name="llm-watchdog", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._done.set()
+
+    def touch(self):
+        self._last = time.monotonic()
+
+    def _run(self):
+        while not self._done.wait(max(self._last + self.seconds - time.monotonic(), 0.05)):
+            if time.monotonic() - self._last >= self.seconds:
+                self.fired = True
+                self.abort()
+                return
+
+
+class _BackendUnavailable(Exception):
+    """The backend could not serve the call before producing anything (so it can go elsewhere)."""
+
+    def __init__(self, model_missing: bool):
+        super().__init__()
+        self.model_missing = model_missing
+
+
+def _unavailable(e: Exception) -> Optional[_BackendUnavailable]:
+    if isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, ConnectionError)):
+        return _BackendUnavailable(model_missing=False)
+    if isinstance(e, ollama.ResponseError) and (e.status_code == 404 or e.status_code >= 500):
+        return _BackendUnavailable(model_missing=e.status_code == 404)
+    return None
+
+
+def stream_llm(llm: ChatOllama, messages: list[dict], on_token: Optional[Callable[[str], None]] = None,
+               run_id: Optional[str] = None) -> tuple[str, dict]:
+    """
+    Stream LLM response and return full content with usage stats.
     
+    The call goes to a backend of the pool (see backends.py). If the backend
+    is unreachable or lacks the model before anything was streamed, the call
+    fails over to the next backend.
+
     Args:
         llm: ChatOllama instance
         messages: List of message dicts
+        run_id: Run the call belongs to; cancelling the run (or crossing its
+            "stop" token budget) aborts the stream
         
     Returns:
         Tuple of (Full response content, Usage dict)
+
+    Raises:
+        RunCancelled: if the run was cancelled (or hit a deadline) before or during the call
+        LLMStreamStalled: if no chunk arrived for LLM_STREAM_IDLE_SECONDS
     """
-    full_response = ""
+    if run_id:
+        cancellation.check(run_id)
+    model = getattr(llm, "model", None) or LLM_MODEL
+    tried = set()
+    while True:
+        with backend_pool.acquire(model, run_id, exclude=tried) as backend:
+            try:
+                return _stream(llm, backend.url, messages, on_token, run_id)
+            except _BackendUnavailable as e:
+                failure = e.__cause__
+                tried.add(backend.url)
+                backend_pool.mark_failed(backend, str(failure), model=model if e.model_missing else None)
+                if len(tried) >= len(backend_pool.backends):
+                    console.print(f"[red]LLM Streaming Error: {failure}[/red]")
+                    raise failure
+            except _TRANSPORT_ERRORS as e:
+                # Died mid-stream: the tokens are gone, but the next call goes elsewhere
+                backend_pool.mark_failed(backend, str(e))
+                raise
+
+
+def _stream(llm: ChatOllama, base_url: str, messages: list[dict], on_token: Optional[Callable[[str], None]],
+            run_id: Optional[str]) -> tuple[str, dict]:
+    """One streaming call against `base_url`."""
+    parts = []
     usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    received = False
+    guard = ledger.stream_guard(run_id) if run_id else None
+    lease = None
+    completed = False
+    if cfg.LLM_CLIENT == "native":
+        chunks, abort = native_client.chat_stream(llm, base_url, messages)
+    else:
+        lease = abortable_clients.acquire(llm, base_url)
+        chunks, abort = _langchain_stream(lease.llm, messages), lease.abort
     
+    watchdog = _IdleWatchdog(LLM_STREAM_IDLE_SECONDS, abort)
     try:
-        # Stream chunks
-        for chunk in llm.stream(messages):
-            content = chunk.content
-            if content:
-                full_response += content
-                if on_token:
-                    on_token(content)
-            
-            # Capture usage if available (usually in the last chunk)
-            if hasattr(chunk, "usage_metadata") and chunk.usage_metadata:
-                usage = chunk.usage_metadata
+        with cancellation.abort_on_cancel(run_id, abort), watchdog:
+            # Stream chunks
+            for content, chunk_usage in chunks:
+                received = True
+                watchdog.touch()
+                if content:
+                    parts.append(content)
+                    if on_token:
+                        on_token(content)
+                    if guard:
+                        guard()
                 
-        console.print()  # Newline at end
+                # Usage is reported per chunk (usually only the last one); add it up
+                if chunk_usage:
+                    for key in usage:
+                        usage[key] += chunk_usage.get(key, 0)
+                    if "prompt_eval_ms" in chunk_usage:
+                        usage["prompt_eval_ms"] = chunk_usage["prompt_eval_ms"]
+
+        full_response = "".join(parts)
+        if watchdog.fired:
+            # The shut-down connection ended the stream without an error
+            raise LLMStreamStalled(f"No response from the LLM for {LLM_STREAM_IDLE_SECONDS} seconds")
+
+        if not usage["total_tokens"]:
+            # Backend reported nothing: estimate so ledgers and budgets still work
+            usage["input_tokens"] = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+            usage["output_tokens"] = estimate_tokens(full_response)
+            usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+
+        completed = True
         return full_response, usage
         
+    except InterruptedError:
+        raise
     except Exception as e:
+        # The connection was shut down on purpose
+        if cancellation.is_cancelled(run_id):
+            raise cancellation.cancelled_error(run_id) from e
+        if not received and not watchdog.fired:
+            unavailable = _unavailable(e)
+            if unavailable is not None:
+                raise unavailable from e
+        if watchdog.fired:
+            metrics.incr("llm_stream_stalls")
+            console.print(f"[red]LLM stream stalled: no chunk for {LLM_STREAM_IDLE_SECONDS} seconds[/red]")
+            if isinstance(e, LLMStreamStalled):
+                raise
+            raise LLMStreamStalled(f"No response from the LLM for {LLM_STREAM_IDLE_SECONDS} seconds") from e
         console.print(f"[red]LLM Streaming Error: {e}[/red]")
         raise
+    finally:
+        if lease is not None:
+            abortable_clients.release(lease, reuse=completed)
@@ -0,0 +1,63 @@
+"""Multi-Agent QA System - Runtime Metrics"""
+import threading
+from collections import defaultdict
+from typing import Any
+
+# Process-wide registry. Keys are (metric name, sorted label tuple).
+_lock = threading.Lock()
+_counters: dict[tuple, float] = defaultdict(float)
+_summaries: dict[tuple, dict[str, float]] = {}
+
+
+def _key(name: str, labels: dict[str, Any]) -> tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+def incr(name: str, value: float = 1, **labels):
+    """Increment a counter, e.g. incr("agent_calls", agent="Developer")."""
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def observe(name: str, value: float, **labels):
+    """Record one observation (latency, size, ...) into a count/sum/max summary."""
+    with _lock:
+        summary = _summaries.setdefault(_key(name, labels), {"count": 0, "sum": 0.0, "max": 0.0})
+        summary["count"] += 1
+        summary["sum"] += value
+        summary["max"] = max(summary["max"], value)
+
+
+def get_counter(name: str, **labels) -> float:
+    """Read a single counter value (0 if never incremented)."""
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+
+def snapshot() -> dict:
+    """
+    Export all metrics as plain dicts.
+
+    Returns:
+        {"counters": {name: {"k=v,...": value}}, "summaries": {name: {"k=v,...": {...}}}}
+    """
+    def label_str(label_items: tuple) -> str:
+        return ",".join(f"{k}={v}" for k, v in label_items) or "_"
+
+    counters: dict[str, dict] = defaultdict(dict)
+    summaries: dict[str, dict] = defaultdict(dict)
+    with _lock:
+        for (name, label_items), value in _counters.items():
+            counters[name][label_str(label_items)] = value
+        for (name, label_items), summary in _summaries.items():
+            entry = dict(summary)
+            entry["avg"] = summary["sum"] / summary["count"] if summary["count"] else 0.0
+            summaries[name][label_str(label_items)] = entry
+    return {"counters": dict(counters), "summaries": dict(summaries)}
+
+
+def reset():
+    """Clear all metrics (mainly for benchmarks and scripts)."""
+    with _lock:
+        _counters.clear()
+        _summaries.clear()
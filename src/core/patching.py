@@ -0,0 +1,159 @@
+"""Multi-Agent QA System - Patch Application for Developer Iterations"""
+import os
+import re
+from pathlib import Path, PurePosixPath
+from typing import Optional
+
+
+class PatchError(Exception):
+    """Raised when a Developer edit cannot be applied cleanly."""
+
+
+# Directories inside artifacts/<run_id>/src that are not part of the generated project
+IGNORED_DIRS = {".venv", "__pycache__", ".pytest_cache"}
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def iter_tree_files(root: Path):
+    """Files under root, without descending into IGNORED_DIRS (a venv holds thousands of files)."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames if name not in IGNORED_DIRS)
+        for name in sorted(filenames):
+            yield Path(dirpath) / name
+
+
+def read_source_tree(src_dir: Path) -> dict[str, str]:
+    """Read all generated project files (relative POSIX path -> content)."""
+    files = {}
+    if not src_dir.exists():
+        return files
+    for path in iter_tree_files(src_dir):
+        rel = path.relative_to(src_dir)
+        try:
+            files[rel.as_posix()] = path.read_text(encoding="utf-8")
+        except UnicodeDecodeError:
+            continue
+    return files
+
+
+def _check_path(filename: str) -> str:
+    """Reject paths that would escape the source directory."""
+    path = PurePosixPath(filename.replace("\\", "/"))
+    if path.is_absolute() or ".." in path.parts or not path.parts:
+        raise PatchError(f"Unsafe path in patch: {filename}")
+    return path.as_posix()
+
+
+def _parse_hunks(diff: str) -> list[tuple[int, list[tuple[str, str]]]]:
+    """Split a unified diff into (old start line, [(tag, text), ...]) hunks."""
+    hunks = []
+    current = None
+    for line in diff.splitlines():
+        header = _HUNK_HEADER.match(line)
+        if header:
+            current = []
+            hunks.append((int(header.group(1)), current))
+            continue
+        if current is None or line.startswith(("--- ", "+++ ", "diff ", "index ", "\\ No newline")):
+            continue
+        if line == "":
+            # Models often drop the leading space of empty context lines
+            current.append((" ", ""))
+        elif line[0] in " +-":
+            current.append((line[0], line[1:]))
+        else:
+            current.append((" ", line))
+    return hunks
+
+
+def _find_block(lines: list[str], block: list[str], start: int, hint: int) -> Optional[int]:
+    """Locate `block` in `lines`, preferring the hint, then exact, then whitespace-insensitive."""
+    size = len(block)
+    candidates = range(start, len(lines) - size + 1)
+    if start <= hint < len(lines) - size + 1 and lines[hint:hint + size] == block:
+        return hint
+    for i in candidates:
+        if lines[i:i + size] == block:
+            return i
+    stripped = [b.strip() for b in block]
+    for i in candidates:
+        if [l.strip() for l in lines[i:i + size]] == stripped:
+            return i
+    return None
+
+
+def apply_unified_diff(original: str, diff: str) -> str:
+    """
+    Apply a unified diff to a file's content.
+
+    Hunk line numbers are only used as a hint: LLM-written diffs often get
+    them wrong, so each hunk is located by its context and removed lines.
+
+    Raises:
+        PatchError: if there are no hunks or a hunk's context cannot be found
+    """
+    hunks = _parse_hunks(diff)
+    if not hunks:
+        raise PatchError("Patch contains no hunks")
+
+    lines = original.splitlines()
+    position = 0
+    for old_start, hunk in hunks:
+        old = [text for tag, text in hunk if tag in " -"]
+        new = [text for tag, text in hunk if tag in " +"]
+        if not old:
+            # Pure insertion: the header is all we have
+            index = min(max(old_start, 0), len(lines))
+        else:
+            index = _find_block(lines, old, position, max(old_start - 1, 0))
+            if index is None:
+                raise PatchError(f"Hunk at line {old_start} does not match the current file")
+        lines[index:index + len(old)] = new
+        position = index + len(new)
+
+    trailing = "\n" if (original.endswith("\n") or not original) and lines else ""
+    return "\n".join(lines) + trailing
+
+
+def apply_patch_set(src_dir: Path, patches: dict[str, str], files: dict[str, str],
+                    deleted: list[str]) -> dict[str, Optional[str]]:
+    """
+    Validate a Developer edit set against the current tree without writing.
+
+    Args:
+        src_dir: artifacts/<run_id>/src
+        patches: filename -> unified diff for existing files
+        files: filename -> full content for new or replaced files
+        deleted: filenames to remove
+
+    Returns:
+        filename -> new content (None for deletions), only for files that change
+
+    Raises:
+        PatchError: if any edit is unsafe or does not apply
+    """
+    changes: dict[str, Optional[str]] = {}
+
+    for filename, diff in patches.items():
+        rel = _check_path(filename)
+        path = src_dir / rel
+        if not path.is_file():
+            raise PatchError(f"Patch targets missing file: {rel}")
+        original = path.read_text(encoding="utf-8")
+        updated = apply_unified_diff(original, diff)
+        if updated != original:
+            changes[rel] = updated
+
+    for filename, content in files.items():
+        rel = _check_path(filename)
+        path = src_dir / rel
+        if not path.is_file() or path.read_text(encoding="utf-8") != content:
+            changes[rel] = content
+
+    for filename in deleted:
+        rel = _check_path(filename)
+        if (src_dir / rel).is_file():
+            changes[rel] = None
+
+    return changes
@@ -0,0 +1,211 @@
+"""Multi-Agent QA System - Static Pre-Execution Checks
+
+Many Developer outputs fail for trivial reasons (a syntax error, an import
+of a module that was not generated, a package missing from
+requirements.txt), which the Executor would only find after creating the
+venv, running pip and starting pytest. These checks run in-process on the
+generated tree in milliseconds:
+
+- every .py file byte-compiles
+- imports of generated packages resolve to generated modules
+- relative imports resolve to generated files
+- the tree contains test files
+
+executor_node skips the expensive execution when any of these fails and
+returns the structured issues to the Developer instead.
+
+Absolute imports that are neither generated, the standard library, a
+declared requirement nor one of the packages the Executor always installs
+are only reported as warnings: transitive dependencies (werkzeug through
+flask, sqlalchemy through flask-sqlalchemy) and extras (email_validator
+through pydantic[email]) are installed in the venv without being declared,
+so they cannot be judged from requirements.txt alone. Imports guarded by
+`except ImportError` are skipped.
+"""
+import ast
+import re
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import Dict, List, Optional, Set, Tuple
+
+from .execution import BASE_TEST_PACKAGES
+
+# Import names of distributions whose name differs from their module
+_DIST_MODULES = {
+    "pyyaml": ["yaml"], "pillow": ["PIL"], "scikit-learn": ["sklearn"], "beautifulsoup4": ["bs4"],
+    "opencv-python": ["cv2"], "opencv-python-headless": ["cv2"], "python-dateutil": ["dateutil"],
+    "python-dotenv": ["dotenv"], "pyjwt": ["jwt"], "python-jose": ["jose"], "python-multipart": ["multipart"],
+    "attrs": ["attr", "attrs"], "pymongo": ["pymongo", "bson", "gridfs"], "psycopg2-binary": ["psycopg2"],
+    "protobuf": ["google"],
+}
+# Modules importable through BASE_TEST_PACKAGES and their dependencies
+_PREINSTALLED = {
+    "pytest", "_pytest", "pluggy", "iniconfig", "packaging", "fastapi", "starlette", "pydantic",
+    "pydantic_core", "annotated_types", "typing_extensions", "anyio", "sniffio", "idna", "httpx",
+    "httpcore", "h11", "certifi",
+}
+_REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+_IMPORT_ERRORS = {"ImportError", "ModuleNotFoundError", "Exception", "BaseException"}
+# Kinds that only warn; everything else skips execution
+_WARNING_KINDS = {"undeclared_import"}
+
+
+@dataclass
+class PrecheckIssue:
+    """One problem found before execution."""
+    kind: str  # "syntax" | "import" | "relative_import" | "no_tests" | "undeclared_import"
+    file: Optional[str]
+    line: Optional[int]
+    message: str
+
+    @property
+    def blocking(self) -> bool:
+        return self.kind not in _WARNING_KINDS
+
+    def __str__(self) -> str:
+        location = f"{self.file}:{self.line}: " if self.file and self.line else (f"{self.file}: " if self.file else "")
+        return f"- [{self.kind}] {location}{self.message}"
+
+
+def run_prechecks(files: Dict[str, str]) -> List[PrecheckIssue]:
+    """Check a generated source tree (relative POSIX path -> content)."""
+    issues: List[PrecheckIssue] = []
+    modules = _local_modules(files)
+    declared = _declared_modules(files.get("requirements.txt", ""))
+
+    for path, content in files.items():
+        if not path.endswith(".py"):
+            continue
+        try:
+            tree = ast.parse(content, filename=path)
+            compile(tree, path, "exec")
+        except SyntaxError as e:
+            issues.append(PrecheckIssue("syntax", path, e.lineno, f"{type(e).__name__}: {e.msg}"))
+            continue
+
+        for node in _unguarded_imports(tree):
+            if isinstance(node, ast.ImportFrom) and node.level:
+                target = _resolve_relative(path, node)
+                if target is not None and target not in modules:
+                    issues.append(PrecheckIssue("relative_import", path, node.lineno,
+                                                f"imports '{'.' * node.level}{node.module or ''}', which was not generated"))
+                continue
+            names = [alias.name for alias in node.names] if isinstance(node, ast.Import) else [node.module or ""]
+            for name in names:
+                top = name.split(".")[0]
+                if not top:
+                    continue
+                if top in modules:
+                    # A generated package: the submodule must have been generated too
+                    if name not in modules:
+                        issues.append(PrecheckIssue("import", path, node.lineno,
+                                                    f"imports '{name}', which was not generated"))
+                    continue
+                if top in declared or top in _PREINSTALLED or top in sys.stdlib_module_names:
+                    continue
+                issues.append(PrecheckIssue("undeclared_import", path, node.lineno,
+                                            f"imports '{name}', which is not declared in requirements.txt "
+                                            "(fine if a declared package installs it)"))
+
+    if not any(_is_test_file(path) for path in files):
+        issues.append(PrecheckIssue("no_tests", None, None, "No test files (test_*.py or *_test.py) were generated."))
+    return issues
+
+
+def format_issues(issues: List[PrecheckIssue], elapsed_ms: float) -> str:
+    """Feedback for the Developer."""
+    lines = [f"PRE-EXECUTION CHECKS FAILED ({len(issues)} issue(s), tests were not run):"]
+    lines += [str(issue) for issue in issues]
+    lines.append(f"(checked in {elapsed_ms:.1f} ms)")
+    return "\n".join(lines)
+
+
+def format_warnings(warnings: List[PrecheckIssue]) -> str:
+    lines = [f"Pre-execution warnings ({len(warnings)}, running tests anyway):"]
+    lines += [str(issue) for issue in warnings]
+    return "\n".join(lines)
+
+
+def check_tree(files: Dict[str, str]) -> Tuple[Optional[str], Optional[str]]:
+    """Run the checks.
+
+    Returns (feedback, warnings): feedback text when a blocking check fails
+    (None when the tree looks executable) and warning text for the
+    non-blocking findings (None when there are none).
+    """
+    started = time.perf_counter()
+    issues = run_prechecks(files)
+    blocking = [issue for issue in issues if issue.blocking]
+    warnings = [issue for issue in issues if not issue.blocking]
+    feedback = format_issues(blocking, (time.perf_counter() - started) * 1000) if blocking else None
+    return feedback, format_warnings(warnings) if warnings else None
+
+
+def _local_modules(files: Dict[str, str]) -> Set[str]:
+    """Importable names of generated modules: top-level names and dotted paths from every directory."""
+    modules = set()
+    for path in files:
+        if not path.endswith(".py"):
+            continue
+        parts = list(PurePosixPath(path).with_suffix("").parts)
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        # Test runners put test directories (and src/ itself) on sys.path, so
+        # any suffix of the path is a potential import name
+        for start in range(len(parts)):
+            for end in range(start + 1, len(parts) + 1):
+                modules.add(".".join(parts[start:end]))
+    return modules
+
+
+def _declared_modules(requirements: str) -> Set[str]:
+    modules = set()
+    for line in requirements.splitlines():
+        match = _REQUIREMENT_NAME.match(line.split("#", 1)[0])
+        if not match or line.lstrip().startswith("-"):
+            continue
+        dist = match.group(1).lower().replace("_", "-").split("[")[0]
+        modules.update(_DIST_MODULES.get(dist, []))
+        modules.add(dist.replace("-", "_").replace(".", "_"))  # e.g. email-validator -> email_validator
+    for package in BASE_TEST_PACKAGES:
+        modules.add(package)
+    return modules
+
+
+def _unguarded_imports(tree: ast.AST):
+    """Import statements not inside `try: ... except ImportError` (or TYPE_CHECKING)."""
+    guarded = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Try) and any(_catches_import_error(handler) for handler in node.handlers):
+            guarded.update(id(child) for stmt in node.body for child in ast.walk(stmt))
+        elif isinstance(node, ast.If) and "TYPE_CHECKING" in ast.unparse(node.test):
+            guarded.update(id(child) for stmt in node.body for child in ast.walk(stmt))
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)) and id(node) not in guarded:
+            yield node
+
+
+def _catches_import_error(handler: ast.ExceptHandler) -> bool:
+    if handler.type is None:
+        return True
+    names = handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]
+    return any(isinstance(name, ast.Name) and name.id in _IMPORT_ERRORS for name in names)
+
+
+def _resolve_relative(path: str, node: ast.ImportFrom) -> Optional[str]:
+    """Dotted module a relative import refers to (None if it leaves the tree)."""
+    package = list(PurePosixPath(path).parent.parts)
+    if node.level - 1 > len(package):
+        return None
+    base = package[:len(package) - (node.level - 1)]
+    if node.module:
+        return ".".join(base + node.module.split("."))
+    # `from . import x`: x may be a module or a name of the package itself
+    return None
+
+
+def _is_test_file(path: str) -> bool:
+    name = PurePosixPath(path).name
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
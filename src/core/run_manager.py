@@ -1,10 +1,22 @@
 """Run Metadata Management"""
 import orjson
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
 
 from .config import ARTIFACTS_DIR
+from .artifacts import atomic_write_bytes
+
+# Nodes of one superstep (e.g. AutomationQA and ManualQA) update the same
+# run_metadata.json concurrently; read-modify-writes are serialized per run
+_metadata_locks: Dict[str, threading.Lock] = {}
+_metadata_locks_guard = threading.Lock()
+
+
+def _metadata_lock(run_id: str) -> threading.Lock:
+    with _metadata_locks_guard:
+        return _metadata_locks.setdefault(run_id, threading.Lock())
 
 def save_run_metadata(run_id: str, product_idea: str):
     """Save metadata for a run."""
@@ -18,19 +30,44 @@ def save_run_metadata(run_id: str, product_idea: str):
         "status": "running"
     }
     
-    (run_dir / "run_metadata.json").write_bytes(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+    atomic_write_bytes(run_dir / "run_metadata.json", orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
 
 def update_run_status(run_id: str, status: str, **kwargs):
     """Update the status of a run and other metadata."""
     run_dir = ARTIFACTS_DIR / run_id
     metadata_file = run_dir / "run_metadata.json"
     
-    if metadata_file.exists():
-        metadata = orjson.loads(metadata_file.read_text())
-        metadata["status"] = status
-        metadata["end_time"] = datetime.now().isoformat()
-        metadata.update(kwargs)
-        metadata_file.write_bytes(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+    with _metadata_lock(run_id):
+        if metadata_file.exists():
+            metadata = orjson.loads(metadata_file.read_text())
+            metadata["status"] = status
+            metadata["end_time"] = datetime.now().isoformat()
+            metadata.update(kwargs)
+            atomic_write_bytes(metadata_file, orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+
+def record_node_cache(run_id: str, node: str, status: str):
+    """Append a node memoization result ('hit' / 'recomputed') to the run report."""
+    metadata_file = ARTIFACTS_DIR / run_id / "run_metadata.json"
+    
+    with _metadata_lock(run_id):
+        if metadata_file.exists():
+            metadata = orjson.loads(metadata_file.read_text())
+            metadata.setdefault("node_cache", []).append({"node": node, "status": status})
+            atomic_write_bytes(metadata_file, orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+
+def annotate_run(run_id: str, **fields):
+    """Set (or, with None, remove) metadata fields without touching the run's status."""
+    metadata_file = ARTIFACTS_DIR / run_id / "run_metadata.json"
+    
+    with _metadata_lock(run_id):
+        if metadata_file.exists():
+            metadata = orjson.loads(metadata_file.read_text())
+            for key, value in fields.items():
+                if value is None:
+                    metadata.pop(key, None)
+                else:
+                    metadata[key] = value
+            atomic_write_bytes(metadata_file, orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
 
 def get_run_metadata(run_id: str) -> Optional[Dict]:
     """Get metadata for a specific run."""
@@ -46,7 +83,7 @@ def list_all_runs() -> List[Dict]:
         
     runs = []
     for run_dir in ARTIFACTS_DIR.iterdir():
-        if run_dir.is_dir():
+        if run_dir.is_dir() and not run_dir.name.startswith("."):
             metadata = get_run_metadata(run_dir.name)
             if metadata:
                 runs.append(metadata)
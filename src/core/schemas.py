@@ -9,9 +9,21 @@ class DeveloperOutput(BaseModel):
     code: str = Field(description="Source Code Explanation (Markdown content)")
     files: dict[str, str] = Field(description="Dictionary of filename to file content")
 
+class DeveloperPatchOutput(BaseModel):
+    code: str = Field(description="Explanation of the changes (Markdown content)")
+    patches: dict[str, str] = Field(default_factory=dict, description="Dictionary of existing filename to unified diff")
+    files: dict[str, str] = Field(default_factory=dict, description="Dictionary of new or fully replaced filename to file content")
+    deleted: List[str] = Field(default_factory=list, description="Filenames to delete")
+
+class FileReview(BaseModel):
+    filename: str = Field(description="Reviewed file path")
+    approved: bool = Field(description="Whether this file is acceptable as-is")
+    findings: str = Field(default="", description="Short findings for this file (Markdown content)")
+
 class ReviewerOutput(BaseModel):
     review: str = Field(description="Code Review Report (Markdown content)")
     approved: bool = Field(description="Whether the code is approved for testing")
+    file_reviews: List[FileReview] = Field(default_factory=list, description="Per-file verdicts for the files under review")
 
 class TestStrategyOutput(BaseModel):
     test_strategy: str = Field(description="Test Specification Document (Markdown content)")
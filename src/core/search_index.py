@@ -0,0 +1,292 @@
+"""Multi-Agent QA System - Artifact Search Index
+
+SQLite FTS5 index over every run's artifacts (MRS, SRS, STS, STEP, test
+plans and cases, bugs, generated source) at SEARCH_INDEX_PATH, so finding
+which run produced a requirement or a bug is an index lookup instead of a
+walk over artifacts/.
+
+Updates are incremental: `save_artifact` and the Developer's file writes
+queue the new content, and a writer thread applies the queue in batches (one
+transaction per batch). `index_run` / `reindex` rescan run directories and
+only re-read files whose mtime changed; the API reindexes on startup, which
+also backfills runs created before the index existed.
+
+Queries are plain words or "quoted phrases" (all must match; the last word
+is also matched as a prefix), ranked by BM25 with filename matches weighted
+above body matches.
+"""
+import atexit
+import queue
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from . import config as cfg
+
+# Files that are searchable text
+_TEXT_SUFFIXES = {".md", ".txt", ".py", ".feature", ".toml", ".cfg", ".ini", ".yaml", ".yml",
+                  ".json", ".html", ".css", ".js", ".ts", ".csv", ".sql", ".sh"}
+# Run bookkeeping, not artifacts
+_SKIPPED_FILES = {"artifacts_manifest.json", "run_metadata.json"}
+_SKIPPED_DIRS = {".venv", "__pycache__", ".pytest_cache", ".git", "node_modules"}
+_KINDS = {"requirements": "requirements", "testing": "testing", "bugs": "bugs", "src": "source"}
+_BATCH_SIZE = 500
+_TERM = re.compile(r'"([^"]*)"|([^\s"]+)')
+_WORD = re.compile(r"\w+")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS documents ("
+    "  id INTEGER PRIMARY KEY, run_id TEXT NOT NULL, path TEXT NOT NULL, kind TEXT NOT NULL,"
+    "  agent TEXT, mtime REAL, UNIQUE (run_id, path));"
+    "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(name, body, tokenize='porter unicode61');"
+)
+
+
+def artifact_kind(path: str) -> str:
+    """Kind of an artifact from its path inside the run directory."""
+    return _KINDS.get(path.split("/", 1)[0], "other")
+
+
+def is_indexed(path: str) -> bool:
+    """True for run files the index covers."""
+    parts = path.split("/")
+    return (parts[-1] not in _SKIPPED_FILES
+            and Path(parts[-1]).suffix.lower() in _TEXT_SUFFIXES
+            and not any(part in _SKIPPED_DIRS for part in parts))
+
+
+def match_expression(query: str) -> Optional[str]:
+    """FTS5 MATCH expression for a user query (None if it has no words)."""
+    terms = []
+    for phrase, word in _TERM.findall(query):
+        words = _WORD.findall(phrase or word)
+        if words:
+            terms.append('"' + " ".join(words) + '"')
+    if not terms:
+        return None
+    if not terms[-1].count(" "):
+        terms[-1] += "*"  # Search-as-you-type on the last word
+    return " ".join(terms)
+
+
+class ArtifactSearchIndex:
+    """Full-text index of run artifacts with a background writer."""
+
+    def __init__(self, path=None):
+        self._path = path
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._readers = threading.local()
+        self._disabled = False
+
+    @property
+    def path(self) -> Path:
+        return self._path or cfg.SEARCH_INDEX_PATH
+
+    @property
+    def enabled(self) -> bool:
+        return cfg.SEARCH_INDEX_ENABLED and not self._disabled
+
+    # Writes (queued)
+
+    def index(self, run_id: str, path: str, content: str, agent: Optional[str] = None):
+        """Queue (re)indexing of a run file; `path` is relative to the run directory."""
+        if self.enabled and is_indexed(path) and len(content) <= cfg.SEARCH_MAX_FILE_BYTES:
+            self._put(("put", run_id, path, content, agent))
+
+    def remove(self, run_id: str, path: str):
+        """Queue removal of a deleted run file."""
+        if self.enabled:
+            self._put(("remove", run_id, path))
+
+    def index_run(self, run_id: str):
+        """Queue a rescan of one run directory (changed files only)."""
+        if self.enabled:
+            self._put(("scan", run_id))
+
+    def reindex(self):
+        """Queue a rescan of every run (backfills runs missing from the index)."""
+        if self.enabled:
+            self._put(("scan", None))
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait until everything queued so far is indexed."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    # Reads
+
+    def search(self, query: str, limit: int = 20, run_id: Optional[str] = None,
+               kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Ranked matches for `query`, best first.
+
+        Returns:
+            [{run_id, path, kind, agent, snippet, score, links: {artifact, run}}]
+        """
+        expression = match_expression(query)
+        if not self.enabled or expression is None or not self.path.exists():
+            return []
+        sql = ("SELECT d.run_id, d.path, d.kind, d.agent,"
+               "       snippet(documents_fts, 1, '[', ']', '...', 16), bm25(documents_fts, 5.0, 1.0) AS rank"
+               " FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid"
+               " WHERE documents_fts MATCH ?")
+        params: list = [expression]
+        if run_id:
+            sql += " AND d.run_id = ?"
+            params.append(run_id)
+        if kind:
+            sql += " AND d.kind = ?"
+            params.append(kind)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        try:
+            rows = self._reader().execute(sql, params).fetchall()
+        except sqlite3.OperationalError:
+            return []  # Schema not created yet
+        return [{
+            "run_id": run,
+            "path": path,
+            "kind": doc_kind,
+            "agent": agent,
+            "snippet": snippet,
+            "score": round(-rank, 6),
+            "links": {
+                "artifact": f"/artifact?run_id={quote(run)}&filename={quote(path)}",
+                "run": f"/runs/{quote(run)}/artifacts",
+            },
+        } for run, path, doc_kind, agent, snippet, rank in rows]
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = self._readers.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        return conn
+
+    # Writer thread
+
+    def _put(self, item: tuple):
+        self._ensure_started()
+        self._queue.put(item)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="search-index-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+        except sqlite3.OperationalError as e:
+            # e.g. SQLite built without FTS5
+            print(f"Artifact search disabled: {e}")
+            self._disabled = True
+            conn.close()
+            return None
+        return conn
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < _BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            waiters = [item for item in batch if isinstance(item, threading.Event)]
+            if conn is not None:
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    for item in batch:
+                        if not isinstance(item, threading.Event):
+                            self._apply(conn, item)
+                    conn.execute("COMMIT")
+                except Exception as e:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    print(f"Error updating artifact search index: {e}")
+            for waiter in waiters:
+                waiter.set()
+
+    def _apply(self, conn: sqlite3.Connection, item: tuple):
+        op, run_id = item[0], item[1]
+        if op == "put":
+            _, _, path, content, agent = item
+            file = cfg.ARTIFACTS_DIR / run_id / path
+            mtime = file.stat().st_mtime if file.exists() else None
+            _upsert(conn, run_id, path, content, agent, mtime)
+        elif op == "remove":
+            _delete(conn, run_id, item[2])
+        elif op == "scan":
+            if run_id is not None:
+                _scan(conn, run_id)
+            elif cfg.ARTIFACTS_DIR.exists():
+                for run_dir in cfg.ARTIFACTS_DIR.iterdir():
+                    if run_dir.is_dir() and not run_dir.name.startswith("."):
+                        _scan(conn, run_dir.name)
+
+
+def _upsert(conn: sqlite3.Connection, run_id: str, path: str, content: str,
+            agent: Optional[str], mtime: Optional[float]):
+    doc_id = conn.execute(
+        "INSERT INTO documents (run_id, path, kind, agent, mtime) VALUES (?, ?, ?, ?, ?)"
+        " ON CONFLICT (run_id, path) DO UPDATE SET agent = COALESCE(excluded.agent, agent), mtime = excluded.mtime"
+        " RETURNING id",
+        (run_id, path, artifact_kind(path), agent, mtime),
+    ).fetchone()[0]
+    conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+    conn.execute("INSERT INTO documents_fts (rowid, name, body) VALUES (?, ?, ?)",
+                 (doc_id, path.replace("/", " ").replace("_", " "), content))
+
+
+def _delete(conn: sqlite3.Connection, run_id: str, path: str):
+    row = conn.execute("DELETE FROM documents WHERE run_id = ? AND path = ? RETURNING id", (run_id, path)).fetchone()
+    if row:
+        conn.execute("DELETE FROM documents_fts WHERE rowid = ?", row)
+
+
+def _scan(conn: sqlite3.Connection, run_id: str):
+    """Index a run's new and modified files and drop deleted ones."""
+    from .archive import ARCHIVE_FILE
+
+    run_dir = cfg.ARTIFACTS_DIR / run_id
+    if (run_dir / ARCHIVE_FILE).exists():
+        return  # Packed files stay indexed; the bundle serves them
+    known = dict(conn.execute("SELECT path, mtime FROM documents WHERE run_id = ?", (run_id,)).fetchall())
+    present = set()
+    if run_dir.exists():
+        for file in run_dir.rglob("*"):
+            path = file.relative_to(run_dir).as_posix()
+            if not is_indexed(path) or not file.is_file():
+                continue
+            present.add(path)
+            stat = file.stat()
+            if known.get(path) == stat.st_mtime or stat.st_size > cfg.SEARCH_MAX_FILE_BYTES:
+                continue
+            try:
+                content = file.read_text(encoding="utf-8")
+            except (UnicodeDecodeError, OSError):
+                continue
+            _upsert(conn, run_id, path, content, None, stat.st_mtime)
+    for path in set(known) - present:
+        _delete(conn, run_id, path)
+
+
+search_index = ArtifactSearchIndex()
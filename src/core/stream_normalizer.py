@@ -0,0 +1,131 @@
+"""Multi-Agent QA System - Thought Stream Normalizer
+
+Agents stream raw JSON text, so thought chunks carry JSON escapes (`\\n`,
+`\\"`, `\\u00e9`, ...) that are unreadable in the UI and terminal. The
+normalizer unescapes them and collapses runs of 3+ newlines into 2 as tokens
+arrive. It is a small state machine: an escape split across chunks is held
+back until the rest arrives, and the newline run is carried over between
+chunks. Each chunk is processed once, in O(len(chunk)).
+"""
+import re
+from typing import Dict, Optional
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "", '"': '"', "\\": "\\", "/": "/", "b": "", "f": ""}
+_HEX = frozenset("0123456789abcdefABCDEF")
+_MANY_NEWLINES = re.compile(r"\n{3,}")
+_MAX_NEWLINES = 2
+_REPLACEMENT = "\ufffd"
+
+
+def _is_hex_prefix(text: str) -> bool:
+    return all(ch in _HEX for ch in text)
+
+
+class ThoughtNormalizer:
+    """Streaming unescape + newline collapse for one agent's thought stream."""
+
+    __slots__ = ("_pending", "_newlines")
+
+    def __init__(self):
+        self._pending = ""  # Incomplete escape held back from the last chunk
+        self._newlines = 0  # Newlines at the end of the emitted text
+
+    def feed(self, chunk: str) -> str:
+        """Normalize the next chunk; may return "" while an escape is incomplete."""
+        text = self._pending + chunk if self._pending else chunk
+        self._pending = ""
+        if "\\" in text:
+            text = self._unescape(text)
+        return self._collapse(text)
+
+    def flush(self) -> str:
+        """Emit whatever is held back (an escape that was never completed) as-is."""
+        text, self._pending = self._pending, ""
+        return self._collapse(text)
+
+    def _unescape(self, text: str) -> str:
+        out = []
+        i = 0
+        n = len(text)
+        while True:
+            j = text.find("\\", i)
+            if j == -1:
+                out.append(text[i:])
+                break
+            out.append(text[i:j])
+            if j + 1 == n:
+                self._pending = text[j:]
+                break
+
+            ch = text[j + 1]
+            if ch != "u":
+                out.append(_ESCAPES.get(ch, text[j:j + 2]))
+                i = j + 2
+                continue
+
+            # \uXXXX, possibly the high half of a \uXXXX\uXXXX surrogate pair
+            digits = text[j + 2:j + 6]
+            if len(digits) < 4:
+                if _is_hex_prefix(digits):
+                    self._pending = text[j:]
+                    break
+                out.append(text[j:j + 2])
+                i = j + 2
+                continue
+            if not _is_hex_prefix(digits):
+                out.append(text[j:j + 2])
+                i = j + 2
+                continue
+
+            code = int(digits, 16)
+            i = j + 6
+            if 0xD800 <= code <= 0xDBFF:
+                low = text[i:i + 6]
+                if len(low) < 6 and "\\u"[:len(low)] == low[:2] and _is_hex_prefix(low[2:]):
+                    self._pending = text[j:]
+                    break
+                if low[:2] == "\\u" and _is_hex_prefix(low[2:]) and 0xDC00 <= int(low[2:], 16) <= 0xDFFF:
+                    out.append(chr(0x10000 + ((code - 0xD800) << 10) + (int(low[2:], 16) - 0xDC00)))
+                    i += 6
+                else:
+                    out.append(_REPLACEMENT)
+            elif 0xDC00 <= code <= 0xDFFF:
+                out.append(_REPLACEMENT)  # Lone low surrogate: not encodable
+            else:
+                out.append(chr(code))
+        return "".join(out)
+
+    def _collapse(self, text: str) -> str:
+        if "\n" not in text:
+            if text:
+                self._newlines = 0
+            return text
+
+        body = text.lstrip("\n")
+        leading = len(text) - len(body)
+        keep = max(min(leading, _MAX_NEWLINES - self._newlines), 0)
+        if not body:
+            self._newlines += keep
+            return "\n" * keep
+
+        body = _MANY_NEWLINES.sub("\n\n", body)
+        self._newlines = len(body) - len(body.rstrip("\n"))
+        return "\n" * keep + body
+
+
+class ThoughtStreams:
+    """The normalizers of one run, one per agent."""
+
+    def __init__(self):
+        self._normalizers: Dict[Optional[str], ThoughtNormalizer] = {}
+
+    def feed(self, agent: Optional[str], chunk: str) -> str:
+        normalizer = self._normalizers.get(agent)
+        if normalizer is None:
+            normalizer = self._normalizers[agent] = ThoughtNormalizer()
+        return normalizer.feed(chunk)
+
+    def flush(self, agent: Optional[str]) -> str:
+        """End an agent's stream, returning any held-back text."""
+        normalizer = self._normalizers.pop(agent, None)
+        return normalizer.flush() if normalizer else ""
@@ -0,0 +1,197 @@
+"""Multi-Agent QA System - Token Ledger
+
+Every LLM call of a run is recorded in ARTIFACTS_DIR/<run_id>/token_ledger.jsonl
+(agent, model, loop iteration, kind, input/output tokens), so the run report
+can break usage down per agent, model and Developer/Reviewer iteration.
+
+A run may have a token budget (RUN_TOKEN_BUDGET, or `token_budget` on /run):
+- "degrade": the current step finishes, but the Developer/Executor/Reviewer
+             loops stop iterating and the run continues to the test phases
+- "stop":    the run is cancelled like a /stop request, aborting the LLM
+             stream that crosses the budget (streamed chunks are counted as
+             output tokens while the call is in flight)
+"""
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+
+from . import config as cfg
+from .cancellation import cancellation
+
+LEDGER_FILE = "token_ledger.jsonl"
+BUDGET_ACTIONS = ("degrade", "stop")
+
+
+@dataclass
+class TokenBudget:
+    """Token budget of one run."""
+    max_total_tokens: Optional[int] = None
+    action: str = "degrade"  # "degrade" | "stop"
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "TokenBudget":
+        data = data or {}
+        budget = cls(
+            max_total_tokens=data.get("max_total_tokens", cfg.RUN_TOKEN_BUDGET),
+            action=data.get("action") or cfg.RUN_BUDGET_ACTION,
+        )
+        if budget.action not in BUDGET_ACTIONS:
+            raise ValueError(f"Unknown budget action: {budget.action}")
+        return budget
+
+
+class _RunTotals:
+    def __init__(self, budget: TokenBudget):
+        self.budget = budget
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.calls = 0
+        self.exceeded = False
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+class TokenLedger:
+    """Per-run token accounting and budget enforcement."""
+
+    def __init__(self):
+        self._runs: Dict[str, _RunTotals] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, run_id: str, budget: Optional[Dict[str, Any]] = None) -> TokenBudget:
+        """Set a run's budget; totals are reloaded from its ledger (resumed runs keep their usage)."""
+        totals = _RunTotals(TokenBudget.from_dict(budget))
+        for entry in _read_entries(run_id):
+            totals.input_tokens += entry.get("input_tokens", 0)
+            totals.output_tokens += entry.get("output_tokens", 0)
+            totals.calls += 1
+        totals.exceeded = self._over_budget(totals)
+        with self._lock:
+            self._runs[run_id] = totals
+        return totals.budget
+
+    def release(self, run_id: str):
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def record(self, run_id: Optional[str], agent: str, model: Optional[str], usage: Dict[str, int],
+               iteration: Optional[int] = None, kind: str = "generation", extra: Optional[Dict[str, Any]] = None):
+        """Append one LLM call to the run's ledger and apply its budget (`extra` is stored as-is)."""
+        if not run_id:
+            return
+        entry = {
+            "ts": round(time.time(), 3),
+            "agent": agent,
+            "model": model,
+            "iteration": iteration,
+            "kind": kind,
+            "input_tokens": int(usage.get("input_tokens", 0)),
+            "output_tokens": int(usage.get("output_tokens", 0)),
+        }
+        if usage.get("prompt_eval_ms"):
+            entry["prompt_eval_ms"] = round(usage["prompt_eval_ms"], 1)
+        if extra:
+            entry.update(extra)
+        run_dir = cfg.ARTIFACTS_DIR / run_id
+        run_dir.mkdir(parents=True, exist_ok=True)
+        with open(run_dir / LEDGER_FILE, "ab") as f:
+            f.write(orjson.dumps(entry) + b"\n")
+
+        totals = self._runs.get(run_id)
+        if totals is None:
+            return
+        with self._lock:
+            totals.input_tokens += entry["input_tokens"]
+            totals.output_tokens += entry["output_tokens"]
+            totals.calls += 1
+        self._apply_budget(run_id, totals, 0)
+
+    def exceeded(self, run_id: Optional[str]) -> bool:
+        """True once the run has used up its budget."""
+        totals = self._runs.get(run_id) if run_id else None
+        return totals is not None and totals.exceeded
+
+    def stream_guard(self, run_id: Optional[str]) -> Optional[Callable[[], None]]:
+        """
+        Per-chunk callback for an in-flight LLM stream, or None if the run has no "stop" budget.
+
+        Cancels the run as soon as recorded usage plus the chunks streamed so far
+        crosses the budget.
+        """
+        totals = self._runs.get(run_id) if run_id else None
+        if totals is None or totals.budget.action != "stop" or not totals.budget.max_total_tokens:
+            return None
+        streamed = 0
+
+        def guard():
+            nonlocal streamed
+            streamed += 1
+            self._apply_budget(run_id, totals, streamed)
+
+        return guard
+
+    def summary(self, run_id: str) -> Dict[str, Any]:
+        """Usage of a run by agent, model and loop iteration, plus its budget."""
+        report = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0, "calls": 0,
+                  "by_agent": {}, "by_model": {}, "by_iteration": {},
+                  "session": {"reused_prompt_tokens": 0, "prompt_eval_ms_saved": 0.0}}
+        for entry in _read_entries(run_id):
+            tokens = (entry.get("input_tokens", 0), entry.get("output_tokens", 0))
+            _add(report, tokens)
+            report["session"]["reused_prompt_tokens"] += entry.get("reused_prompt_tokens", 0)
+            report["session"]["prompt_eval_ms_saved"] += entry.get("prompt_eval_ms_saved", 0.0)
+            _add(report["by_agent"].setdefault(entry.get("agent") or "unknown", _bucket()), tokens)
+            _add(report["by_model"].setdefault(entry.get("model") or "unknown", _bucket()), tokens)
+            if entry.get("iteration") is not None:
+                key = f"{entry.get('agent')}#{entry['iteration']}"
+                _add(report["by_iteration"].setdefault(key, _bucket()), tokens)
+        report["session"]["prompt_eval_ms_saved"] = round(report["session"]["prompt_eval_ms_saved"], 1)
+        totals = self._runs.get(run_id)
+        if totals is not None:
+            report["budget"] = asdict(totals.budget)
+            report["budget_exceeded"] = totals.exceeded
+        return report
+
+    def _over_budget(self, totals: _RunTotals, in_flight: int = 0) -> bool:
+        limit = totals.budget.max_total_tokens
+        return bool(limit) and totals.total_tokens + in_flight > limit
+
+    def _apply_budget(self, run_id: str, totals: _RunTotals, in_flight: int):
+        if totals.exceeded or not self._over_budget(totals, in_flight):
+            return
+        totals.exceeded = True
+        print(f"Run {run_id} exceeded its token budget ({totals.budget.max_total_tokens}), "
+              f"action: {totals.budget.action}")
+        if totals.budget.action == "stop":
+            cancellation.request(run_id, reason="budget")
+
+
+def _bucket() -> Dict[str, int]:
+    return {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0, "calls": 0}
+
+
+def _add(bucket: Dict[str, int], tokens: tuple):
+    bucket["input_tokens"] += tokens[0]
+    bucket["output_tokens"] += tokens[1]
+    bucket["total_tokens"] += tokens[0] + tokens[1]
+    bucket["calls"] += 1
+
+
+def _read_entries(run_id: str):
+    path = cfg.ARTIFACTS_DIR / run_id / LEDGER_FILE
+    if not path.exists():
+        return
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue  # Torn last line after a crash
+
+
+ledger = TokenLedger()
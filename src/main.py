@@ -6,19 +6,52 @@ from rich.prompt import Prompt
 
 from .workflow.graph import create_qa_graph
 from .workflow.state import AgentState
-from .core.events import WorkflowEventType
+from .core.events import WorkflowEvent, WorkflowEventType
+from .core import event_log
+from .core.cancellation import cancellation
+from .core.console_sink import CONSOLE_MODES, ConsoleSink
+from .core.stream_normalizer import ThoughtStreams
+from .core.archive import unarchive_run
+from .core.token_ledger import ledger
 from .core.config import ensure_directories
 import argparse
 
 console = Console()
 
 
+def _make_emitter(run_id: str, sink: ConsoleSink):
+    """Event emitter for a CLI run: event log plus console output."""
+    thoughts = ThoughtStreams()
+
+    def emit(type: WorkflowEventType, data: dict):
+        if type == WorkflowEventType.THOUGHT_CHUNK:
+            data = {**data, "chunk": thoughts.feed(data.get("agent"), data.get("chunk", ""))}
+            if not data["chunk"]:
+                return  # Partial escape, wait for the next part
+        elif type == WorkflowEventType.AGENT_COMPLETE:
+            tail = thoughts.flush(data.get("agent"))
+            if tail:
+                emit(WorkflowEventType.THOUGHT_CHUNK, {"agent": data.get("agent"), "chunk": tail})
+
+        data = {**data, "run_id": run_id}
+        event_log.dispatch(WorkflowEvent(type=type, data=data))
+        sink.event(run_id, type, data)
+
+    return emit
+
+
 def main():
     """Main entry point for the Multi-Agent QA System."""
     parser = argparse.ArgumentParser(description="Multi-Agent QA System")
     parser.add_argument("idea", nargs="*", help="Product Idea")
     parser.add_argument("--mode", choices=["full", "tests_only", "sts_only"], default="full", help="Execution Mode")
     parser.add_argument("--personality", choices=["medical", "software"], default="software", help="Agent Personality")
+    parser.add_argument("--fork", metavar="RUN_ID", help="Fork an existing run from a checkpoint and continue it")
+    parser.add_argument("--checkpoint", metavar="CHECKPOINT_ID", help="Checkpoint to fork from (default: latest)")
+    parser.add_argument("--console", choices=CONSOLE_MODES, help="Run output: off, summary or full stream "
+                        "(default: CLI_CONSOLE_MODE)")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="State override for --fork (VALUE parsed as JSON when possible)")
     args = parser.parse_args()
 
     # Update Global Config
@@ -37,6 +70,10 @@ def main():
     # Ensure directories exist
     ensure_directories()
     
+    if args.fork:
+        fork_and_resume(args)
+        return
+    
     # Get product idea
     if args.idea:
         product_idea = " ".join(args.idea)
@@ -70,39 +107,8 @@ def main():
     thread_id = app_name
     
     # Event handler for Console UI
-    from .core.log_manager import log_agent_start, log_completion, log_artifact
-
-    def emit(type: WorkflowEventType, data: dict):
-        if type == WorkflowEventType.PHASE_START:
-            console.print(f"\n[bold blue]═══ Phase: {data['phase']} ═══[/bold blue]\n")
-        elif type == WorkflowEventType.AGENT_START:
-            log_agent_start(data.get("agent"), data.get("role"))
-        elif type == WorkflowEventType.THOUGHT_CHUNK:
-            chunk = data.get("chunk", "")
-            if not hasattr(emit, "_buffer"): emit._buffer = ""
-            emit._buffer += chunk
-            
-            if "\\" in emit._buffer:
-                emit._buffer = emit._buffer.replace("\\n", "\n").replace('\\"', '"').replace("\\t", "\t")
-            
-            # Collapse multiple newlines
-            import re
-            emit._buffer = re.sub(r'\n{3,}', '\n\n', emit._buffer)
-
-            if not emit._buffer.endswith("\\"):
-                # Use print for the stream, don't use console.print as it might add extra formatting/newlines
-                print(emit._buffer, end="", flush=True)
-                emit._buffer = ""
-            else:
-                return
-        elif type == WorkflowEventType.ARTIFACT_GENERATED:
-            log_artifact(data.get("agent"), data.get("filename"), data.get("type"))
-        elif type == WorkflowEventType.AGENT_COMPLETE:
-            log_completion(data.get("agent"), data.get("success"))
-        elif type == WorkflowEventType.WORKFLOW_COMPLETE:
-            print("\n")
-            if data["status"] == "success":
-                console.print(f"[bold green]Starting Workflow for: {app_name}[/bold green]")
+    sink = ConsoleSink(args.console or cfg.CLI_CONSOLE_MODE, prefix_runs=False)
+    emit = _make_emitter(thread_id, sink)
 
     if args.mode != "full":
         console.print(f"[yellow]Mode: {args.mode}[/yellow]")
@@ -131,18 +137,71 @@ def main():
     # Create Config with Thread ID and Emitter
     config = {"configurable": {"thread_id": thread_id, "emitter": emit}}
     
+    # The API's /stop endpoint can cancel CLI runs as well (shared control store)
+    cancellation.clear(thread_id)
+    cancellation.activate(thread_id)
+    ledger.configure(thread_id)  # RUN_TOKEN_BUDGET / RUN_BUDGET_ACTION
+    unarchive_run(thread_id)  # The run directory is reused
+
     # Check for existing state
     snapshot = graph.get_state(config)
-    if snapshot.values and snapshot.next:
-        console.print(f"[yellow]Resuming existing workflow (Thread: {thread_id})...[/yellow]")
-        final_state = graph.invoke(None, config=config)
-    else:
-        # Invoke Graph with initial state
-        final_state = graph.invoke(initial_state, config=config)
+    try:
+        with cancellation.deadline(thread_id, cfg.RUN_DEADLINE_SECONDS, "run_deadline"):
+            if snapshot.values and snapshot.next:
+                console.print(f"[yellow]Resuming existing workflow (Thread: {thread_id})...[/yellow]")
+                final_state = graph.invoke(None, config=config)
+            else:
+                # Invoke Graph with initial state
+                final_state = graph.invoke(initial_state, config=config)
+    except InterruptedError as e:
+        sink.flush()
+        console.print(f"\n[yellow]{e}[/yellow]")
+        sys.exit(130)
     
     # Exit code based on success
     sys.exit(0 if not final_state.get("errors") else 1)
 
 
+def fork_and_resume(args):
+    """Fork a run from one of its checkpoints (CLI checkpoint DB) and continue it."""
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    import sqlite3
+    import orjson
+    from .core import config as cfg
+    from .workflow.fork import fork_run
+
+    overrides = {}
+    for item in args.overrides:
+        key, _, value = item.partition("=")
+        try:
+            overrides[key] = orjson.loads(value)
+        except orjson.JSONDecodeError:
+            overrides[key] = value
+
+    conn = sqlite3.connect(".checkpoints.sqlite", check_same_thread=False)
+    memory = SqliteSaver(conn)
+    try:
+        run_id = fork_run(memory, args.fork, checkpoint_id=args.checkpoint, overrides=overrides)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+    console.print(f"[yellow]Forked {args.fork} -> {run_id}[/yellow]")
+
+    sink = ConsoleSink(args.console or cfg.CLI_CONSOLE_MODE, prefix_runs=False)
+    emit = _make_emitter(run_id, sink)
+
+    graph = create_qa_graph().compile(checkpointer=memory)
+    cancellation.activate(run_id)
+    ledger.configure(run_id)
+    try:
+        with cancellation.deadline(run_id, cfg.RUN_DEADLINE_SECONDS, "run_deadline"):
+            final_state = graph.invoke(None, config={"configurable": {"thread_id": run_id, "emitter": emit}})
+    except InterruptedError as e:
+        sink.flush()
+        console.print(f"\n[yellow]{e}[/yellow]")
+        sys.exit(130)
+    sys.exit(0 if not final_state.get("errors") else 1)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,76 @@
+"""Multi-Agent QA System - Run Worker
+
+Executes run/resume jobs from the broker in a dedicated process:
+
+    uv run python -m src.worker --concurrency 2
+
+Requires BROKER_BACKEND = "sqlite" so jobs and events are shared with the
+API processes. The API processes also execute jobs on EMBEDDED_WORKERS
+threads; set it to 0 to leave execution to dedicated workers.
+"""
+import argparse
+import os
+import socket
+import sys
+import threading
+from typing import Optional
+
+from .core import config as cfg
+from .core.broker import Broker, get_broker
+from .core.console_sink import CONSOLE_MODES
+
+
+def serve(broker: Broker, worker_id: str, stop: Optional[threading.Event] = None):
+    """Claim and execute jobs until `stop` is set."""
+    from .workflow.runner import execute_job
+
+    while stop is None or not stop.is_set():
+        job = broker.claim_job(worker_id, timeout=1.0)
+        if job is None:
+            continue
+        try:
+            execute_job(job, broker)
+            broker.finish_job(job.id, "done")
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            broker.finish_job(job.id, "failed")
+
+
+def start_workers(broker: Broker, count: int, name: str = "embedded") -> list[threading.Thread]:
+    """Start `count` daemon threads serving jobs from the broker."""
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    threads = []
+    for i in range(count):
+        thread = threading.Thread(target=serve, args=(broker, f"{prefix}:{name}-{i}"), name=f"run-worker-{i}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-Agent QA System - Run Worker")
+    parser.add_argument("--concurrency", type=int, default=2, help="Runs executed in parallel")
+    parser.add_argument("--console", choices=CONSOLE_MODES, help="Run output: off, summary or full stream "
+                        "(default: SERVER_CONSOLE_MODE)")
+    args = parser.parse_args()
+    if args.console:
+        cfg.SERVER_CONSOLE_MODE = args.console
+
+    if cfg.BROKER_BACKEND == "inprocess":
+        print("BROKER_BACKEND is 'inprocess': runs execute inside the API process. "
+              "Set it to 'sqlite' to use dedicated workers.")
+        sys.exit(1)
+
+    cfg.ensure_directories()
+    broker = get_broker()
+    print(f"Worker {os.getpid()} serving {args.concurrency} slot(s) from {cfg.BROKER_DB_PATH}")
+    threads = start_workers(broker, args.concurrency, name="worker")
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Multi-Agent QA System - Forking Runs from Checkpoints"""
+import copy
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .state import AgentState
+from ..core.config import ARTIFACTS_DIR
+from ..core.archive import unarchive_run
+from ..core.artifacts import link_tree
+from ..core.event_log import EVENT_LOG_FILES
+from ..core.token_ledger import LEDGER_FILE
+from ..core.search_index import search_index
+from ..core.run_manager import get_run_metadata, save_run_metadata, update_run_status
+
+# Written fresh for the fork instead of being shared with the source run
+_UNSHARED_FILES = frozenset({"run_metadata.json", LEDGER_FILE, *EVENT_LOG_FILES})
+
+
+def list_checkpoints(graph, run_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    List the checkpoints of a run's thread, newest first.
+
+    Args:
+        graph: Compiled graph bound to the checkpointer
+        run_id: Thread ID of the run
+        limit: Maximum number of checkpoints to return
+    """
+    checkpoints = []
+    for snapshot in graph.get_state_history({"configurable": {"thread_id": run_id}}, limit=limit):
+        checkpoints.append({
+            "checkpoint_id": snapshot.config["configurable"].get("checkpoint_id"),
+            "step": (snapshot.metadata or {}).get("step"),
+            "next": list(snapshot.next),
+            "created_at": snapshot.created_at,
+        })
+    return checkpoints
+
+
+def fork_run(checkpointer, source_run_id: str, checkpoint_id: Optional[str] = None,
+             overrides: Optional[Dict[str, Any]] = None, new_run_id: Optional[str] = None) -> str:
+    """
+    Create a new run from a checkpoint of an existing run.
+
+    The checkpoint is copied into a new thread with `run_id` (and any
+    overrides) replaced, so resuming the new thread continues from exactly
+    the same point. Artifacts are shared with the source run through
+    hardlinks; every artifact write replaces its file, so the runs diverge
+    copy-on-write.
+
+    Args:
+        checkpointer: LangGraph checkpointer holding the source thread
+        source_run_id: Run (thread) to fork
+        checkpoint_id: Checkpoint to fork from (latest if omitted)
+        overrides: State values to replace in the fork
+        new_run_id: ID for the new run (derived from the source if omitted)
+
+    Returns:
+        The new run ID
+
+    Raises:
+        ValueError: if the checkpoint does not exist or an override key is unknown
+    """
+    overrides = dict(overrides or {})
+    unknown = set(overrides) - set(AgentState.__annotations__)
+    if unknown:
+        raise ValueError(f"Unknown state keys in overrides: {sorted(unknown)}")
+
+    source_config = {"configurable": {"thread_id": source_run_id, "checkpoint_ns": ""}}
+    if checkpoint_id:
+        source_config["configurable"]["checkpoint_id"] = checkpoint_id
+    saved = checkpointer.get_tuple(source_config)
+    if saved is None:
+        raise ValueError(f"No checkpoint found for run {source_run_id}" + (f" ({checkpoint_id})" if checkpoint_id else ""))
+
+    if not new_run_id:
+        new_run_id = f"{source_run_id}_fork_{datetime.now().strftime('%H%M%S')}"
+
+    # Copy the checkpoint into the new thread with the fork's values
+    checkpoint = copy.deepcopy(saved.checkpoint)
+    checkpoint["channel_values"].update(overrides)
+    checkpoint["channel_values"]["run_id"] = new_run_id
+    metadata = dict(saved.metadata or {})
+    metadata["source"] = "fork"
+    metadata["forked_from"] = {"run_id": source_run_id, "checkpoint_id": saved.config["configurable"].get("checkpoint_id")}
+
+    new_config = checkpointer.put(
+        {"configurable": {"thread_id": new_run_id, "checkpoint_ns": ""}},
+        checkpoint,
+        metadata,
+        checkpoint.get("channel_versions", {}),
+    )
+
+    # Writes of tasks that already finished in the forked super-step
+    writes_by_task = defaultdict(list)
+    for task_id, channel, value in saved.pending_writes or []:
+        writes_by_task[task_id].append((channel, value))
+    for task_id, writes in writes_by_task.items():
+        checkpointer.put_writes(new_config, writes, task_id)
+
+    # Share upstream artifacts instead of copying them
+    source_dir = ARTIFACTS_DIR / source_run_id
+    unarchive_run(source_run_id)
+    if source_dir.exists():
+        link_tree(source_dir, ARTIFACTS_DIR / new_run_id, skip_files=_UNSHARED_FILES)
+        search_index.index_run(new_run_id)
+
+    source_meta = get_run_metadata(source_run_id) or {}
+    save_run_metadata(new_run_id, source_meta.get("title") or checkpoint["channel_values"].get("product_idea", new_run_id))
+    update_run_status(
+        new_run_id, "paused",
+        forked_from=source_run_id,
+        forked_checkpoint=metadata["forked_from"]["checkpoint_id"],
+        overrides=sorted(overrides),
+    )
+    return new_run_id
@@ -8,9 +8,13 @@ from .nodes import (
     test_manager_node, 
     test_lead_node, 
     automation_qa_node, 
-    manual_qa_node
+    automation_execution_node,
+    manual_qa_node,
+    with_deadline,
 )
+from .memo import memoize
 from ..core.events import WorkflowEventType
+from ..core.token_ledger import ledger
 
 def create_qa_graph(checkpointer=None, interrupt_before=None):
     """Create the QA Multi-Agent Graph."""
@@ -19,14 +23,15 @@ def create_qa_graph(checkpointer=None, interrupt_before=None):
     workflow = StateGraph(AgentState)
     
     # Add Nodes
-    workflow.add_node("ProductManager", product_manager_node)
-    workflow.add_node("Developer", developer_node)
-    workflow.add_node("Executor", executor_node)
-    workflow.add_node("Reviewer", reviewer_node)
-    workflow.add_node("TestManager", test_manager_node)
-    workflow.add_node("TestLead", test_lead_node)
-    workflow.add_node("AutomationQA", automation_qa_node)
-    workflow.add_node("ManualQA", manual_qa_node)
+    workflow.add_node("ProductManager", with_deadline("ProductManager", memoize("ProductManager", product_manager_node)))
+    workflow.add_node("Developer", with_deadline("Developer", memoize("Developer", developer_node)))
+    workflow.add_node("Executor", with_deadline("Executor", executor_node))
+    workflow.add_node("Reviewer", with_deadline("Reviewer", memoize("Reviewer", reviewer_node)))
+    workflow.add_node("TestManager", with_deadline("TestManager", memoize("TestManager", test_manager_node)))
+    workflow.add_node("TestLead", with_deadline("TestLead", memoize("TestLead", test_lead_node)))
+    workflow.add_node("AutomationQA", with_deadline("AutomationQA", memoize("AutomationQA", automation_qa_node)))
+    workflow.add_node("ManualQA", with_deadline("ManualQA", memoize("ManualQA", manual_qa_node)))
+    workflow.add_node("AutomationExecutor", with_deadline("AutomationExecutor", automation_execution_node))
     
     # Smart Start Routing
     def route_start(state: AgentState):
@@ -59,6 +64,9 @@ def create_qa_graph(checkpointer=None, interrupt_before=None):
         if count >= 3:
             print(f"WARNING: Max dev execution retries ({count}) reached. Proceeding to Reviewer despite failing tests.")
             return "Reviewer"
+        if ledger.exceeded(state.get("run_id")):
+            print("WARNING: Token budget exceeded. Proceeding to Reviewer despite failing tests.")
+            return "Reviewer"
             
         return "Developer"
 
@@ -83,6 +91,9 @@ def create_qa_graph(checkpointer=None, interrupt_before=None):
         if count >= 3:
             print(f"WARNING: Max review retries ({count}) reached. Proceeding despite rejection.")
             return "TestManager"
+        if ledger.exceeded(state.get("run_id")):
+            print("WARNING: Token budget exceeded. Proceeding despite rejection.")
+            return "TestManager"
             
         return "Developer"
 
@@ -101,8 +112,16 @@ def create_qa_graph(checkpointer=None, interrupt_before=None):
     workflow.add_edge("TestLead", "AutomationQA")
     workflow.add_edge("TestLead", "ManualQA")
     
+    # The suite starts in the background when AutomationQA writes it; this node collects the result
+    workflow.add_edge("AutomationQA", "AutomationExecutor")
+    
     # End
-    workflow.add_edge("AutomationQA", END)
+    workflow.add_edge("AutomationExecutor", END)
     workflow.add_edge("ManualQA", END)
     
+    # The API server passes its checkpointer and expects a runnable graph;
+    # the CLI compiles the returned builder itself.
+    if checkpointer is not None:
+        return workflow.compile(checkpointer=checkpointer, interrupt_before=interrupt_before or None)
+    
     return workflow
@@ -0,0 +1,223 @@
+"""Multi-Agent QA System - Input-Hash Node Memoization
+
+Make-style incremental re-execution for LLM nodes. Each node's result is
+keyed by a hash of the state fields it reads, its agent config, the prompt
+templates it uses and the model. A re-run with byte-identical inputs skips
+the LLM call, copies the artifacts the earlier node wrote into the new run
+and replays its state updates. Because a recomputed node produces new
+outputs, every node downstream of the first change misses naturally.
+"""
+import functools
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+from langchain_core.runnables import RunnableConfig
+
+from .state import AgentState
+from . import nodes
+from ..core import config as cfg
+from ..core import metrics
+from ..core.artifacts import save_artifact, atomic_write_bytes
+from ..core.event_log import EVENT_LOG_FILES
+from ..core.token_ledger import LEDGER_FILE
+from ..core.events import WorkflowEventType
+from ..core.hashing import content_hash, stable_hash, tree_hash
+from ..core.patching import iter_tree_files, read_source_tree
+from ..core.prompts import load_prompt
+from ..core.run_manager import record_node_cache
+from ..core.search_index import search_index
+
+# State fields each node reads
+NODE_INPUTS = {
+    "ProductManager": ["product_idea", "requirements_reuse"],
+    "Developer": ["srs", "review", "test_results", "tests_passed", "dev_retries"],
+    "Reviewer": ["srs", "code", "review_cache", "review_count"],
+    "TestManager": ["srs"],
+    "TestLead": ["test_strategy"],
+    "AutomationQA": ["step", "test_plan"],
+    "ManualQA": ["step", "test_plan"],
+}
+
+# Prompt templates each node renders
+NODE_PROMPTS = {
+    "ProductManager": ["pm_system", "pm_user", "pm_warm_start"],
+    "Developer": ["dev_system", "dev_user", "dev_followup", "dev_patch_system", "dev_patch_user", "dev_patch_followup"],
+    "Reviewer": ["reviewer_system", "reviewer_user", "reviewer_incremental_user", "reviewer_followup"],
+    "TestManager": ["tm_system", "tm_user"],
+    "TestLead": ["tl_system", "tl_user"],
+    "AutomationQA": ["automation_qa_system", "automation_qa_user"],
+    "ManualQA": ["manual_qa_system", "manual_qa_user"],
+}
+
+# Nodes whose behaviour also depends on the generated source tree on disk
+TREE_NODES = {"Developer", "Reviewer"}
+
+NODE_AGENTS = {
+    "ProductManager": nodes.pm_agent,
+    "Developer": nodes.dev_agent,
+    "Reviewer": nodes.reviewer_agent,
+    "TestManager": nodes.tm_agent,
+    "TestLead": nodes.tl_agent,
+    "AutomationQA": nodes.automation_agent,
+    "ManualQA": nodes.manual_agent,
+}
+
+# Run bookkeeping that changes while any node runs
+_RUN_FILES = {"artifacts_manifest.json", "run_metadata.json", LEDGER_FILE, *EVENT_LOG_FILES}
+
+# Token counters must not be replayed: a hit costs nothing
+_NON_REPLAYED = {"total_tokens", "retry_tokens"}
+
+
+def _prompt_version(node: str) -> Dict[str, str]:
+    """Hash of every prompt template the node uses (missing templates hash as empty)."""
+    versions = {}
+    for name in NODE_PROMPTS.get(node, []):
+        try:
+            versions[name] = content_hash(load_prompt(name))
+        except FileNotFoundError:
+            versions[name] = ""
+    return versions
+
+
+def node_cache_key(node: str, state: AgentState) -> str:
+    """Hash of everything that determines a node's output."""
+    run_dir = cfg.ARTIFACTS_DIR / state.get("run_id", "default_run")
+    agent = NODE_AGENTS.get(node)
+    key = {
+        "node": node,
+        "inputs": {field: state.get(field) for field in NODE_INPUTS.get(node, [])},
+        "agent": cfg.AGENT_CONFIG.get(node),
+        "prompts": _prompt_version(node),
+        "personality": cfg.PERSONALITY,
+        "model": getattr(getattr(agent, "llm", None), "model", None),
+        "llm": [cfg.LLM_TEMPERATURE, cfg.LLM_NUM_CTX, cfg.LLM_STRUCTURED_OUTPUT, cfg.DEV_PATCH_MODE,
+                cfg.AGENT_SESSION_MODE],
+    }
+    if node in TREE_NODES:
+        key["tree"] = tree_hash(read_source_tree(run_dir / "src"))
+    return stable_hash(key)
+
+
+def _snapshot(run_dir: Path) -> Dict[str, tuple]:
+    """(mtime, size) of every file in a run directory, skipping venvs and caches."""
+    files = {}
+    if not run_dir.exists():
+        return files
+    for path in iter_tree_files(run_dir):
+        stat = path.stat()
+        files[path.relative_to(run_dir).as_posix()] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def _manifest(run_dir: Path) -> Dict[str, dict]:
+    """Manifest entries by relative path."""
+    manifest_file = run_dir / "artifacts_manifest.json"
+    if not manifest_file.exists():
+        return {}
+    try:
+        return {entry["path"]: entry for entry in orjson.loads(manifest_file.read_text()) if "path" in entry}
+    except Exception:
+        return {}
+
+
+def _store(key: str, node: str, run_id: str, updates: Dict[str, Any], before: Dict[str, tuple]):
+    """Record a node result and the artifacts it wrote."""
+    run_dir = cfg.ARTIFACTS_DIR / run_id
+    after = _snapshot(run_dir)
+    written = sorted(rel for rel, sig in after.items() if before.get(rel) != sig and rel not in _RUN_FILES)
+    manifest = _manifest(run_dir)
+    # Parallel nodes (AutomationQA / ManualQA) share the run directory
+    written = [rel for rel in written if rel not in manifest or manifest[rel].get("agent") == node]
+
+    entry = {
+        "node": node,
+        "run_id": run_id,
+        "created": datetime.now().isoformat(),
+        "updates": {k: v for k, v in updates.items() if k not in _NON_REPLAYED},
+        "files": [{"path": rel, "manifest": manifest.get(rel)} for rel in written],
+        "deleted": sorted(rel for rel in before if rel not in after),
+    }
+    cfg.NODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    (cfg.NODE_CACHE_DIR / f"{key}.json").write_bytes(orjson.dumps(entry, default=str))
+
+
+def _load(key: str) -> Optional[Dict[str, Any]]:
+    """Load a cached node result whose source artifacts still exist."""
+    cache_file = cfg.NODE_CACHE_DIR / f"{key}.json"
+    if not cache_file.exists():
+        return None
+    try:
+        entry = orjson.loads(cache_file.read_bytes())
+    except Exception:
+        return None
+    source_dir = cfg.ARTIFACTS_DIR / entry["run_id"]
+    if not all((source_dir / f["path"]).is_file() for f in entry["files"]):
+        return None
+    return entry
+
+
+def _restore(entry: Dict[str, Any], run_id: str, node: str, config: RunnableConfig):
+    """Bring the cached node's artifacts into the current run."""
+    source_dir = cfg.ARTIFACTS_DIR / entry["run_id"]
+    run_dir = cfg.ARTIFACTS_DIR / run_id
+    if source_dir == run_dir:
+        return
+
+    for item in entry["files"]:
+        source = source_dir / item["path"]
+        manifest_entry = item.get("manifest")
+        if manifest_entry:
+            # Goes through save_artifact so the new run's manifest stays in sync
+            save_artifact(source.read_text(encoding="utf-8"), manifest_entry["filename"],
+                          manifest_entry["type"], run_id, agent_name=manifest_entry.get("agent"))
+            filename, category = manifest_entry["filename"], manifest_entry["type"]
+        else:
+            target = run_dir / item["path"]
+            atomic_write_bytes(target, source.read_bytes())
+            filename, category = str(target.relative_to(cfg.PROJECT_ROOT)), "Cached Output"
+        nodes._emit(config, WorkflowEventType.ARTIFACT_GENERATED, {
+            "filename": filename,
+            "type": category,
+            "agent": node,
+        })
+
+    for rel in entry.get("deleted", []):
+        (run_dir / rel).unlink(missing_ok=True)
+    # Restored source files and deletions bypass save_artifact
+    search_index.index_run(run_id)
+
+
+def memoize(node: str, fn: Callable[[AgentState, RunnableConfig], Dict[str, Any]]):
+    """Wrap a node function with input-hash memoization (see NODE_CACHE_ENABLED)."""
+
+    @functools.wraps(fn)
+    def wrapper(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+        if not cfg.NODE_CACHE_ENABLED:
+            return fn(state, config)
+
+        nodes._check_stopped(state)
+        run_id = state.get("run_id", "default_run")
+        key = node_cache_key(node, state)
+        entry = _load(key)
+
+        if entry is not None:
+            nodes._emit(config, WorkflowEventType.AGENT_START, {"agent": node, "role": cfg.AGENT_CONFIG.get(node, {}).get("role", node)})
+            nodes._emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": node, "chunk": f"Inputs unchanged since run {entry['run_id']}; reusing cached output.\n"})
+            _restore(entry, run_id, node, config)
+            nodes._emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": node, "success": True, "cached": True})
+            metrics.incr("node_cache", node=node, status="hit")
+            record_node_cache(run_id, node, "hit")
+            return dict(entry["updates"])
+
+        before = _snapshot(cfg.ARTIFACTS_DIR / run_id)
+        updates = fn(state, config)
+        metrics.incr("node_cache", node=node, status="recomputed")
+        record_node_cache(run_id, node, "recomputed")
+        if not updates.get("errors"):
+            _store(key, node, run_id, updates, before)
+        return updates
+
+    return wrapper
@@ -1,24 +1,45 @@
-from typing import Dict, Any
+import functools
+from typing import Any, Callable, Dict
+import orjson
 from langchain_core.runnables import RunnableConfig
 
 from .state import AgentState
-from ..agents import ProductManagerAgent, TestManagerAgent, TestLeadAgent, AutomationQAAgent, ManualQAAgent, DeveloperAgent, ReviewerAgent
-from ..core.events import WorkflowEventType, STOPPED_RUNS
-from ..core.artifacts import save_artifact, get_artifact_info
+from ..agents.session import sessions
+from ..agents.base_agent import AgentOutput
+from ..agents import ProductManagerAgent, TestManagerAgent, TestLeadAgent, AutomationQAAgent, ManualQAAgent, DeveloperAgent, DeveloperPatchAgent, ReviewerAgent
+from ..core.events import WorkflowEventType
+from ..core.cancellation import cancellation, run_subprocess
+from ..core.artifacts import save_artifact, get_artifact_info, atomic_write_text
+from ..core.patching import PatchError, apply_patch_set, read_source_tree
+from ..core.hashing import content_hash
+from ..core.idea_index import idea_index, load_requirements
+from ..core.search_index import search_index
+from ..core.execution import (BASE_TEST_PACKAGES, UNIT_TEST_ARGS, automation_executor, failure_digest, parse_junit,
+                              prepare_venv, summarize, venv_tools)
+from ..core.execution_cache import execution_cache
+from ..core.prechecks import check_tree
+from ..core import metrics
 
 # ... (agents init remains same)
 
 def _check_stopped(state: AgentState):
     """Raise error if run was stopped."""
-    run_id = state.get("run_id")
-    if run_id in STOPPED_RUNS:
-        # Clear from registry after stopping
-        STOPPED_RUNS.discard(run_id)
-        raise InterruptedError(f"Workflow execution for {run_id} was stopped by user.")
+    cancellation.check(state.get("run_id"))
+
+def with_deadline(name: str, node: Callable) -> Callable:
+    """Stop the run (resumably) if one execution of the node exceeds its time budget."""
+    @functools.wraps(node)
+    def run(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+        from ..core.config import AGENT_TIMEOUT_SECONDS, NODE_TIMEOUT_SECONDS
+        seconds = NODE_TIMEOUT_SECONDS.get(name, AGENT_TIMEOUT_SECONDS)
+        with cancellation.deadline(state.get("run_id"), seconds, f"node_timeout:{name}"):
+            return node(state, config)
+    return run
 
 # Initialize agents
 pm_agent = ProductManagerAgent(agent_id="ProductManager")
 dev_agent = DeveloperAgent(agent_id="Developer")
+dev_patch_agent = DeveloperPatchAgent(agent_id="Developer")
 reviewer_agent = ReviewerAgent(agent_id="Reviewer")
 tm_agent = TestManagerAgent(agent_id="TestManager")
 tl_agent = TestLeadAgent(agent_id="TestLead")
@@ -34,22 +55,26 @@ def _emit(config: RunnableConfig, event_type: WorkflowEventType, data: Dict[str,
 def _get_on_token(config: RunnableConfig, agent_id: str, run_id: str):
     """Generic token streamer with interrupt check."""
     def on_token(token):
-        if run_id in STOPPED_RUNS:
-            # Clear from registry after stopping to allow future fresh runs if needed
-            # (though usually run_id is unique)
-            STOPPED_RUNS.discard(run_id)
-            raise InterruptedError(f"Workflow execution for {run_id} stopped via token stream.")
+        cancellation.check(run_id)
         _emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": agent_id, "chunk": token})
     return on_token
 
+def _loop_iteration(state: AgentState) -> int:
+    """Pass number of the Developer/Executor/Reviewer loop (0 for the first pass)."""
+    return state.get("dev_retries", 0) + state.get("review_count", 0)
+
 def _handle_agent_output(state: AgentState, config: RunnableConfig, output: Any, agent_id: str) -> Dict[str, Any]:
     """Generic agent output processor."""
     _emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": agent_id, "success": output.success})
     
+    # Repair retries are tracked separately but still count towards the run total
+    retry_tokens = output.retry_usage.get("total_tokens", 0)
+    total_tokens = output.token_usage.get("total_tokens", 0) + retry_tokens
+
     if not output.success:
-        return {"errors": output.errors, "total_tokens": output.token_usage.get("total_tokens", 0)}
+        return {"errors": output.errors, "total_tokens": total_tokens, "retry_tokens": retry_tokens}
         
-    updates = {"total_tokens": output.token_usage.get("total_tokens", 0)}
+    updates = {"total_tokens": total_tokens, "retry_tokens": retry_tokens}
     run_id = state.get("run_id")
     
     for key, content in output.artifacts.items():
@@ -92,8 +117,29 @@ def product_manager_node(state: AgentState, config: RunnableConfig) -> Dict[str,
     _emit(config, WorkflowEventType.PHASE_START, {"phase": "Requirements Creation", "agent": agent_id})
     _emit(config, WorkflowEventType.AGENT_START, {"agent": agent_id, "role": "Product Manager"})
     
-    output = pm_agent.invoke({"product_idea": state["product_idea"]}, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")))
-    return _handle_agent_output(state, config, output, agent_id)
+    run_id = state.get("run_id")
+    reuse = state.get("requirements_reuse") or {}
+    prior = load_requirements(reuse["run_id"]) if reuse.get("run_id") else None
+    score = f" (similarity {reuse['score']:.2f})" if reuse.get("score") is not None else ""
+
+    if prior and reuse.get("action") == "reuse":
+        # Near-duplicate idea: the earlier requirements are used as they are
+        _emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": agent_id, "chunk": f"Reusing the MRS/SRS of run {reuse['run_id']}{score}.\n"})
+        output = AgentOutput(success=True, artifacts={"mrs": prior["mrs"], "srs": prior["srs"]})
+        metrics.incr("requirements_reuse", action="reuse")
+        return _handle_agent_output(state, config, output, agent_id)
+
+    input_data = {"product_idea": state["product_idea"]}
+    if prior:
+        _emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": agent_id, "chunk": f"Starting from the SRS of run {reuse['run_id']}{score}.\n"})
+        input_data.update(reference_idea=prior["product_idea"], reference_srs=prior["srs"])
+        metrics.incr("requirements_reuse", action="warm_start")
+
+    output = pm_agent.invoke(input_data, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")), run_id=run_id)
+    updates = _handle_agent_output(state, config, output, agent_id)
+    if output.success and run_id:
+        idea_index.add(run_id, state["product_idea"], output.artifacts.get("mrs") or "", output.artifacts.get("srs") or "")
+    return updates
 
 def test_manager_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
     """Node for TestManager."""
@@ -102,7 +148,7 @@ def test_manager_node(state: AgentState, config: RunnableConfig) -> Dict[str, An
     _emit(config, WorkflowEventType.PHASE_START, {"phase": "Test Specification Creation", "agent": agent_id})
     _emit(config, WorkflowEventType.AGENT_START, {"agent": agent_id, "role": "Test Manager"})
     
-    output = tm_agent.invoke({"srs": state["srs"]}, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")))
+    output = tm_agent.invoke({"srs": state["srs"]}, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")), run_id=state.get("run_id"))
     return _handle_agent_output(state, config, output, agent_id)
 
 def test_lead_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
@@ -112,7 +158,7 @@ def test_lead_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
     _emit(config, WorkflowEventType.PHASE_START, {"phase": "Test Planning", "agent": agent_id})
     _emit(config, WorkflowEventType.AGENT_START, {"agent": agent_id, "role": "Test Lead"})
     
-    output = tl_agent.invoke({"test_strategy": state["test_strategy"]}, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")))
+    output = tl_agent.invoke({"test_strategy": state["test_strategy"]}, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")), run_id=state.get("run_id"))
     return _handle_agent_output(state, config, output, agent_id)
 
 def automation_qa_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
@@ -122,37 +168,73 @@ def automation_qa_node(state: AgentState, config: RunnableConfig) -> Dict[str, A
     _emit(config, WorkflowEventType.AGENT_START, {"agent": agent_id, "role": "Automation QA"})
     
     test_plan_input = state.get("step") or state.get("test_plan")
-    output = automation_agent.invoke({"test_plan": test_plan_input}, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")))
+    output = automation_agent.invoke({"test_plan": test_plan_input}, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")), run_id=state.get("run_id"))
     
     # Write test file
     if output.success and output.artifacts:
-        import os
         from ..core.config import PROJECT_ROOT, ARTIFACTS_DIR
         
-        # Use sanitized app name for directory
-        app_name = state.get("app_name", "generated_app").replace(" ", "_").lower()
-        app_dir = PROJECT_ROOT / app_name
-        app_dir.mkdir(exist_ok=True)
-        
         # Save automation_tests content
         if "automation_tests" in output.artifacts:
              test_content = output.artifacts["automation_tests"]
              # Use ARTIFACTS_DIR / run_id / testing
-             from ..core.config import ARTIFACTS_DIR
              run_id = state.get("run_id", "default_run")
              test_dir = ARTIFACTS_DIR / run_id / "testing"
              test_dir.mkdir(parents=True, exist_ok=True)
              
              file_path = test_dir / "test_app.py"
-             file_path.write_text(test_content, encoding="utf-8")
+             atomic_write_text(file_path, test_content)
              _emit(config, WorkflowEventType.ARTIFACT_GENERATED, {
                 "filename": str(file_path.relative_to(PROJECT_ROOT)), 
                 "type": "Automation Logic", 
                 "agent": agent_id
             })
 
+             # Code and test script both exist: execute while ManualQA is still working
+             src_dir = ARTIFACTS_DIR / run_id / "src"
+             if src_dir.exists():
+                 automation_executor.start(run_id, src_dir, file_path)
+
     return _handle_agent_output(state, config, output, agent_id)
 
+def automation_execution_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    """Node for executing the AutomationQA suite against the generated code."""
+    _check_stopped(state)
+    agent_id = "AutomationExecutor"
+    _emit(config, WorkflowEventType.PHASE_START, {"phase": "Automation Test Execution", "agent": agent_id})
+    _emit(config, WorkflowEventType.AGENT_START, {"agent": agent_id, "role": "Automation Test Executor"})
+
+    from ..core.config import ARTIFACTS_DIR
+    run_id = state.get("run_id", "default_run")
+    src_dir = ARTIFACTS_DIR / run_id / "src"
+    test_file = ARTIFACTS_DIR / run_id / "testing" / "test_app.py"
+
+    if not src_dir.exists() or not test_file.exists():
+        message = "Nothing to execute: source code or automation script is missing."
+        _emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": agent_id, "success": False, "message": message})
+        return {}
+
+    status = lambda chunk: _emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": agent_id, "chunk": chunk})
+    results = automation_executor.collect(run_id, src_dir, test_file, status=status)
+
+    filename, category = get_artifact_info("automation_results")
+    save_artifact(orjson.dumps(results, option=orjson.OPT_INDENT_2).decode(), filename, category, run_id, agent_name=agent_id)
+    _emit(config, WorkflowEventType.ARTIFACT_GENERATED, {"filename": filename, "type": category, "agent": agent_id})
+
+    if results["status"] == "error":
+        bugs = [f"[Automation] The automation suite could not run: {results.get('error_message', '')[:500]}"]
+        message = "Automation suite could not run."
+    else:
+        bugs = [f"[Automation] {test['id']} {test['outcome']}: {test['message'][:500]}"
+                for test in results["tests"] if test["outcome"] in ("failed", "error")]
+        message = (f"{results['passed']} passed, {results['failed']} failed, {results['error']} errors "
+                   f"in {results['shards']} process(es)")
+    metrics.observe("automation_suite_seconds", results["duration"], status=results["status"])
+    _emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": agent_id, "success": results["status"] == "passed", "message": message})
+
+    summary = {k: v for k, v in results.items() if k != "tests"}
+    return {"automation_results": summary, "bugs": bugs}
+
 def manual_qa_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
     """Node for ManualQA."""
     _check_stopped(state)
@@ -160,7 +242,7 @@ def manual_qa_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
     _emit(config, WorkflowEventType.AGENT_START, {"agent": agent_id, "role": "Manual QA"})
     
     test_plan_input = state.get("step") or state.get("test_plan")
-    output = manual_agent.invoke({"test_plan": test_plan_input}, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")))
+    output = manual_agent.invoke({"test_plan": test_plan_input}, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")), run_id=state.get("run_id"))
     return _handle_agent_output(state, config, output, agent_id)
 
 def developer_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
@@ -170,22 +252,75 @@ def developer_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
     _emit(config, WorkflowEventType.PHASE_START, {"phase": "Development", "agent": agent_id})
     _emit(config, WorkflowEventType.AGENT_START, {"agent": agent_id, "role": "Senior Developer"})
 
-    output = dev_agent.invoke({"srs": state["srs"], "review": state.get("review")}, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")))
+    from ..core.config import ARTIFACTS_DIR, PROJECT_ROOT, DEV_PATCH_MODE
+    on_token = _get_on_token(config, agent_id, state.get("run_id", "default"))
+
+    # Use ARTIFACTS_DIR / run_id / src
+    run_id = state.get("run_id", "default_run")
+    src_dir = ARTIFACTS_DIR / run_id / "src"
+
+    # Failure digest from the Executor; after passing tests only the review matters
+    test_feedback = None if state.get("tests_passed") else state.get("test_results")
+
+    # Iterations (review rejection / failing tests) only send edits against the files on disk
+    output = None
+    changes = None
+    current_files = read_source_tree(src_dir) if DEV_PATCH_MODE else {}
+    if current_files and (state.get("review") or state.get("dev_retries")):
+        session = sessions.get(run_id, "Developer:patch")
+        output = dev_patch_agent.invoke({
+            "srs": state["srs"],
+            "current_files": current_files,
+            "review": state.get("review"),
+            "test_results": test_feedback,
+        }, on_token=on_token, run_id=run_id, iteration=_loop_iteration(state), session=session)
+        if output.success:
+            try:
+                changes = apply_patch_set(
+                    src_dir,
+                    output.artifacts.get("patches") or {},
+                    output.artifacts.get("files") or {},
+                    output.artifacts.get("deleted") or [],
+                )
+            except PatchError as e:
+                print(f"Developer patch rejected, falling back to full regeneration: {e}")
+                metrics.incr("developer_patch_fallbacks", reason="apply")
+                if session is not None:
+                    session.rollback()
+            if changes is not None and session is not None:
+                # The model knows the tree it just patched; later turns only send other changes
+                session.seen_files = {f: content_hash(c) for f, c in read_source_tree(src_dir).items()}
+        else:
+            metrics.incr("developer_patch_fallbacks", reason="parse")
+
+    mode = "patch"
+    if changes is None:
+        mode = "full"
+        patch_usage = output.token_usage if output else {}
+        output = dev_agent.invoke({"srs": state["srs"], "review": state.get("review"), "test_results": test_feedback},
+                                  on_token=on_token, run_id=run_id,
+                                  iteration=_loop_iteration(state), session=sessions.get(run_id, "Developer"))
+        # The failed patch attempt still cost tokens
+        for key, value in patch_usage.items():
+            if isinstance(value, int):
+                output.token_usage[key] = output.token_usage.get(key, 0) + value
+        if output.success and isinstance(output.artifacts, dict) and "files" in output.artifacts:
+            changes = dict(output.artifacts["files"])
+
+    metrics.observe("developer_output_tokens", output.token_usage.get("output_tokens", 0), mode=mode)
     
     # Write files to disk
-    if output.success and isinstance(output.artifacts, dict) and "files" in output.artifacts:
-        from ..core.config import ARTIFACTS_DIR, PROJECT_ROOT
-        
-        # Use ARTIFACTS_DIR / run_id / src
-        run_id = state.get("run_id", "default_run")
-        src_dir = ARTIFACTS_DIR / run_id / "src"
+    if output.success and changes:
         src_dir.mkdir(parents=True, exist_ok=True)
         
-        files = output.artifacts["files"]
-        for filename, content in files.items():
+        for filename, content in changes.items():
             file_path = src_dir / filename
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            file_path.write_text(content, encoding="utf-8")
+            if content is None:
+                file_path.unlink(missing_ok=True)
+                search_index.remove(run_id, f"src/{filename}")
+                continue
+            atomic_write_text(file_path, content)
+            search_index.index(run_id, f"src/{filename}", content, agent_id)
             _emit(config, WorkflowEventType.ARTIFACT_GENERATED, {
                 "filename": str(file_path.relative_to(PROJECT_ROOT)), 
                 "type": "Source Code", 
@@ -194,6 +329,64 @@ def developer_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
 
     return _handle_agent_output(state, config, output, agent_id)
 
+def _incremental_review(state: AgentState, config: RunnableConfig, files: Dict[str, str], agent_id: str) -> Dict[str, Any]:
+    """
+    Review only files whose content hash changed since the last review.
+
+    Per-file verdicts are cached in state["review_cache"] (filename -> hash,
+    approved, findings); unchanged files are summarised from the cache.
+    """
+    cache = state.get("review_cache") or {}
+    hashes = {filename: content_hash(content) for filename, content in files.items()}
+    changed = {f: c for f, c in files.items() if cache.get(f, {}).get("hash") != hashes[f]}
+    unchanged = {f: cache[f] for f in files if f not in changed}
+
+    metrics.incr("review_files_sent", len(changed))
+    metrics.incr("review_files_cached", len(unchanged))
+
+    if not changed:
+        # Identical tree: reuse the cached verdicts without calling the LLM
+        approved = all(entry["approved"] for entry in unchanged.values())
+        _emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": agent_id, "chunk": "No files changed since the last review; reusing cached verdicts.\n"})
+        _emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": agent_id, "success": True})
+        return {"review_approved": approved}
+
+    prior_findings = "\n".join(
+        f"- {f}: {'approved' if entry['approved'] else 'changes requested'}"
+        + (f" - {entry['findings'][:300]}" if entry.get("findings") else "")
+        for f, entry in unchanged.items()
+    )
+    output = reviewer_agent.invoke({
+        "srs": state["srs"],
+        "code": state.get("code") or "",
+        "files": changed,
+        "prior_findings": prior_findings,
+    }, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")), run_id=state.get("run_id"),
+        iteration=_loop_iteration(state), session=sessions.get(state.get("run_id"), agent_id))
+
+    updates = _handle_agent_output(state, config, output, agent_id)
+    if not output.success:
+        return updates
+
+    approved = bool(output.artifacts.get("approved"))
+    verdicts = {r["filename"]: r for r in output.artifacts.get("file_reviews") or [] if isinstance(r, dict)}
+    new_cache = {}
+    for f in files:
+        if f in changed:
+            verdict = verdicts.get(f, {})
+            new_cache[f] = {
+                "hash": hashes[f],
+                "approved": verdict.get("approved", approved),
+                "findings": verdict.get("findings", ""),
+            }
+        else:
+            new_cache[f] = dict(unchanged[f])
+        # An overall approval (made with the prior findings in view) settles every file
+        if approved:
+            new_cache[f]["approved"] = True
+    updates["review_cache"] = new_cache
+    return updates
+
 def reviewer_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
     """Node for Reviewer."""
     _check_stopped(state)
@@ -201,9 +394,17 @@ def reviewer_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
     _emit(config, WorkflowEventType.PHASE_START, {"phase": "Code Review", "agent": agent_id})
     _emit(config, WorkflowEventType.AGENT_START, {"agent": agent_id, "role": "Code Reviewer"})
 
-    output = reviewer_agent.invoke({"srs": state["srs"], "code": state["code"]}, on_token=_get_on_token(config, agent_id, state.get("run_id", "default")))
-    
-    updates = _handle_agent_output(state, config, output, agent_id)
+    from ..core.config import ARTIFACTS_DIR
+    run_id = state.get("run_id", "default_run")
+    files = read_source_tree(ARTIFACTS_DIR / run_id / "src")
+
+    if not files:
+        # Nothing on disk (e.g. legacy runs): review the Developer's explanation only
+        output = reviewer_agent.invoke({"srs": state["srs"], "code": state["code"]}, on_token=_get_on_token(config, agent_id, run_id),
+                                       run_id=run_id, iteration=_loop_iteration(state))
+        updates = _handle_agent_output(state, config, output, agent_id)
+    else:
+        updates = _incremental_review(state, config, files, agent_id)
     
     # Increment review count
     current_count = state.get("review_count", 0)
@@ -214,15 +415,15 @@ def reviewer_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
 def executor_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
     """Node for executing generated code and tests."""
     import subprocess
-    import os
-    import sys
+    import tempfile
+    from pathlib import Path
     
     _check_stopped(state)
     agent_id = "Executor"
     _emit(config, WorkflowEventType.PHASE_START, {"phase": "Code Execution", "agent": agent_id})
     _emit(config, WorkflowEventType.AGENT_START, {"agent": agent_id, "role": "Test Executor"})
     
-    from ..core.config import ARTIFACTS_DIR
+    from ..core.config import ARTIFACTS_DIR, PRECHECKS_ENABLED
     run_id = state.get("run_id", "default_run")
     src_dir = ARTIFACTS_DIR / run_id / "src"
     
@@ -236,54 +437,78 @@ def executor_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
         _emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": agent_id, "success": False, "message": updates["test_results"]})
         return updates
 
-    venv_dir = src_dir / ".venv"
-    pip_cmd = str(venv_dir / "bin" / "pip")
-    pytest_cmd = str(venv_dir / "bin" / "pytest")
-    
-    # Wait for windows compatibility if needed
-    if os.name == 'nt':
-        pip_cmd = str(venv_dir / "Scripts" / "pip.exe")
-        pytest_cmd = str(venv_dir / "Scripts" / "pytest.exe")
+    files = read_source_tree(src_dir)
+    if PRECHECKS_ENABLED:
+        # Milliseconds in-process instead of venv + pip + pytest start-up for trivial failures
+        feedback, warnings = check_tree(files)
+        if warnings:
+            metrics.incr("executor_prechecks", status="warned")
+            _emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": agent_id, "chunk": warnings + "\n"})
+        if feedback:
+            metrics.incr("executor_prechecks", status="failed")
+            updates["tests_passed"] = False
+            updates["test_results"] = feedback
+            _emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": agent_id, "chunk": feedback + "\n"})
+            _emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": agent_id, "success": False, "message": "Pre-execution checks failed."})
+            return updates
+        metrics.incr("executor_prechecks", status="passed")
+
+    cache_key = execution_cache.key(files, UNIT_TEST_ARGS, BASE_TEST_PACKAGES)
+    cached = execution_cache.get(cache_key)
+    if cached is not None:
+        metrics.incr("executor_cache", status="hit")
+        updates["tests_passed"] = cached["tests_passed"]
+        updates["test_results"] = cached["test_results"]
+        _emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": agent_id, "chunk": f"Identical source tree already executed (run {cached['run_id']}); reusing its results.\n"})
+        _emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": agent_id, "success": cached["tests_passed"],
+                                                          "message": "All tests passed!" if cached["tests_passed"] else "Tests failed."})
+        return updates
+    metrics.incr("executor_cache", status="miss")
+
+    pytest_cmd = venv_tools(src_dir / ".venv")["pytest"]
+    status = lambda chunk: _emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": agent_id, "chunk": chunk})
 
     try:
-        # Create virtual environment if it doesn't exist
-        if not venv_dir.exists():
-            _emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": agent_id, "chunk": "Creating virtual environment...\n"})
-            subprocess.run([sys.executable, "-m", "venv", str(venv_dir)], cwd=src_dir, check=True, capture_output=True)
-
-        # Install dependencies
-        req_file = src_dir / "requirements.txt"
-        if req_file.exists():
-            _emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": agent_id, "chunk": "Installing dependencies...\n"})
-            # Install pytest as well just to be safe
-            subprocess.run([pip_cmd, "install", "pytest", "fastapi", "httpx"], cwd=src_dir, capture_output=True)
-            install_res = subprocess.run([pip_cmd, "install", "-r", "requirements.txt"], cwd=src_dir, capture_output=True, text=True)
-            if install_res.returncode != 0:
-                updates["tests_passed"] = False
-                updates["test_results"] = f"Dependency Installation Failed:\n{install_res.stderr}\n{install_res.stdout}"
-                _emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": agent_id, "success": False, "message": "Failed to install dependencies"})
-                return updates
-
-        # Run pytest
+        # Create the virtual environment and install dependencies (shared with the AutomationExecutor)
+        error = prepare_venv(run_id, src_dir, status)
+        if error:
+            updates["tests_passed"] = False
+            updates["test_results"] = error
+            _emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": agent_id, "success": False, "message": "Failed to install dependencies"})
+            return updates
+
+        # Run pytest; the JUnit report gives per-test results instead of scraped output
         _emit(config, WorkflowEventType.THOUGHT_CHUNK, {"agent": agent_id, "chunk": "Running pytest...\n"})
-        test_res = subprocess.run([pytest_cmd, ".", "-v"], cwd=src_dir, capture_output=True, text=True, timeout=60)
+        with tempfile.TemporaryDirectory(prefix="executor_") as tmp:
+            report = Path(tmp) / "junit.xml"
+            test_res = run_subprocess(run_id, [pytest_cmd, *UNIT_TEST_ARGS, f"--junitxml={report}"],
+                                      cwd=src_dir, text=True, timeout=60)
+            cases = parse_junit(report) if report.exists() else []
         
         if test_res.returncode == 0:
             updates["tests_passed"] = True
-            updates["test_results"] = test_res.stdout
+            counts = summarize(cases)
+            updates["test_results"] = f"All tests passed: {counts['passed']} passed, {counts['skipped']} skipped."
             _emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": agent_id, "success": True, "message": "All tests passed!"})
         else:
             updates["tests_passed"] = False
-            # Truncate to avoid massive context
-            stdout_trunc = test_res.stdout[-2000:] if len(test_res.stdout) > 2000 else test_res.stdout
-            stderr_trunc = test_res.stderr[-2000:] if len(test_res.stderr) > 2000 else test_res.stderr
-            updates["test_results"] = f"Tests Failed:\nSTDOUT:\n{stdout_trunc}\n\nSTDERR:\n{stderr_trunc}"
+            if any(case.outcome in ("failed", "error") for case in cases):
+                updates["test_results"] = failure_digest(cases, src_dir)
+            else:
+                # No per-test failures to report (no tests collected, pytest crashed): keep the output tail
+                stdout_trunc = test_res.stdout[-2000:] if len(test_res.stdout) > 2000 else test_res.stdout
+                stderr_trunc = test_res.stderr[-2000:] if len(test_res.stderr) > 2000 else test_res.stderr
+                updates["test_results"] = f"Tests Failed:\nSTDOUT:\n{stdout_trunc}\n\nSTDERR:\n{stderr_trunc}"
+            metrics.observe("executor_feedback_chars", len(updates["test_results"]))
             _emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": agent_id, "success": False, "message": "Tests failed."})
+        execution_cache.put(cache_key, run_id, updates["tests_passed"], updates["test_results"])
 
     except subprocess.TimeoutExpired as e:
         updates["tests_passed"] = False
         updates["test_results"] = f"Execution Timeout: Tests took longer than 60 seconds to run."
         _emit(config, WorkflowEventType.AGENT_COMPLETE, {"agent": agent_id, "success": False, "message": "Execution Timeout."})
+    except InterruptedError:
+        raise
     except Exception as e:
         updates["tests_passed"] = False
         updates["test_results"] = f"Execution Error: {str(e)}"
@@ -0,0 +1,219 @@
+"""Multi-Agent QA System - Run Execution
+
+Executes run/resume jobs taken from the broker. This is the part of the old
+API server that drives the LangGraph workflow; it can now run inside the API
+process (embedded workers) or in dedicated `python -m src.worker` processes.
+Events are numbered and logged here (see event_log.dispatch) and published
+through the broker for the API workers to fan out.
+"""
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from typing import Optional
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from .graph import create_qa_graph
+from .state import AgentState
+from ..agents.session import sessions
+from ..core import event_log, metrics
+from ..core.backends import backend_pool
+from ..core.broker import Broker, Job
+from ..core.cancellation import cancellation
+from ..core.config import HITL_CONFIG, RUN_DEADLINE_SECONDS
+from ..core.console_sink import server_sink
+from ..core.events import WorkflowEvent, WorkflowEventType
+from ..core.archive import unarchive_run
+from ..core.run_manager import get_run_metadata, save_run_metadata, update_run_status
+from ..core.stream_normalizer import ThoughtStreams
+from ..core.token_ledger import ledger
+
+# Database Path
+CHECKPOINT_DB_PATH = "data/checkpoints.sqlite"
+
+_checkpointer: Optional[SqliteSaver] = None
+_checkpointer_lock = threading.Lock()
+
+# Numbering and publishing happen together so seq order == stream order,
+# even with parallel nodes emitting from different threads
+_publish_lock = threading.Lock()
+
+
+def get_checkpointer() -> SqliteSaver:
+    """Process-wide SQLite checkpointer (shared by all runs and processes)."""
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                conn = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+                _checkpointer = SqliteSaver(conn)
+    return _checkpointer
+
+
+def make_emitter(run_id: str, broker: Broker):
+    """Event emitter for a run: console output plus numbered events on the broker."""
+    thoughts = ThoughtStreams()
+    sink = server_sink()
+
+    def emit(type: WorkflowEventType, data: dict):
+        # Inject run_id into event data for frontend correlation
+        data["run_id"] = run_id
+
+        # Thought Stream Unescaping (Affects both Terminal and UI)
+        if type == WorkflowEventType.THOUGHT_CHUNK:
+            data["chunk"] = thoughts.feed(data.get("agent"), data.get("chunk", ""))
+            if not data["chunk"]:
+                return  # Partial escape, wait for the next part
+        elif type == WorkflowEventType.AGENT_COMPLETE:
+            tail = thoughts.flush(data.get("agent"))
+            if tail:
+                emit(WorkflowEventType.THOUGHT_CHUNK, {"agent": data.get("agent"), "chunk": tail})
+
+        with _publish_lock:
+            broker.publish(event_log.dispatch(WorkflowEvent(type=type, data=data)))
+        sink.event(run_id, type, data)
+
+    return emit
+
+
+def _record_stopped(run_id: str, emit):
+    """Report a run that ended because of a stop request (or its "stop" token budget)."""
+    requested_at = cancellation.requested_at(run_id)
+    reason = cancellation.reason(run_id) or "user"
+    latency = round(time.time() - requested_at, 3) if requested_at else None
+    if latency is not None:
+        metrics.observe("cancel_stop_seconds", latency)
+    emit(WorkflowEventType.WORKFLOW_COMPLETE, {"status": "stopped", "reason": reason})
+    update_run_status(run_id, "stopped", stop_reason=reason, cancel_latency_seconds=latency,
+                      token_ledger=ledger.summary(run_id))
+
+
+def _finish(graph, config: dict, final_state: dict, run_id: str, emit):
+    """Report a run that paused or completed."""
+    snapshot = graph.get_state(config)
+    if snapshot.next:
+        # We are paused
+        emit(WorkflowEventType.WORKFLOW_PAUSED, {"next": snapshot.next})
+        update_run_status(run_id, "paused")
+    else:
+        status = "success" if not final_state.get("errors") else "error"
+        total_tokens = final_state.get("total_tokens", 0)
+        retry_tokens = final_state.get("retry_tokens", 0)
+
+        emit(WorkflowEventType.WORKFLOW_COMPLETE, {"status": status, "total_tokens": total_tokens})
+        update_run_status(run_id, status, total_tokens=total_tokens, retry_tokens=retry_tokens,
+                          token_ledger=ledger.summary(run_id))
+
+
+def run_orchestrator(product_idea: str, run_id: str, hitl_enabled: bool, broker: Broker,
+                     token_budget: Optional[dict] = None, requirements_reuse: Optional[dict] = None):
+    """Run LangGraph workflow in a thread."""
+
+    # Save Metadata
+    save_run_metadata(run_id, product_idea)
+    budget = ledger.configure(run_id, token_budget)
+    update_run_status(run_id, "running", token_budget=asdict(budget), requirements_reuse=requirements_reuse)
+    emit = make_emitter(run_id, broker)
+
+    cancellation.activate(run_id)
+    try:
+        emit(WorkflowEventType.WORKFLOW_START, {"product_idea": product_idea, "run_id": run_id})
+
+        # Initial State
+        initial_state: AgentState = {
+            "run_id": run_id,
+            "product_idea": product_idea,
+            "requirements_reuse": requirements_reuse,
+            "mrs": None,
+            "srs": None,
+            "test_strategy": None,
+            "step": None,
+            "test_plan": None,
+            "task_assignments": None,
+            "automation_tests": None,
+            "manual_tests": None,
+            "bugs": [],
+            "errors": [],
+            "logs": []
+        }
+
+        # Determine interrupts
+        interrupt_before = []
+        if hitl_enabled:
+            # Pause before Test Manager and Test Lead and Automation/Manual
+            # interruption happens BEFORE the node executes.
+            # We want to pause AFTER PM (before TestManager), AFTER TestManager (before TestLead)
+            interrupt_before = HITL_CONFIG["interrupt_before"]
+
+        graph = create_qa_graph(checkpointer=get_checkpointer(), interrupt_before=interrupt_before)
+
+        # Invoke with thread_id for persistence
+        config = {"configurable": {"thread_id": run_id, "emitter": emit}}
+
+        # Use invoke for synchronous execution derived from graph
+        with cancellation.deadline(run_id, RUN_DEADLINE_SECONDS, "run_deadline"):
+            final_state = graph.invoke(initial_state, config=config)
+
+        # Check if we finished or paused
+        _finish(graph, config, final_state, run_id, emit)
+
+    except InterruptedError:
+        _record_stopped(run_id, emit)
+    except Exception as e:
+        emit(WorkflowEventType.ERROR, {"message": str(e)})
+        emit(WorkflowEventType.WORKFLOW_COMPLETE, {"status": "error"})
+        update_run_status(run_id, "error")
+    finally:
+        cancellation.deactivate(run_id)
+        ledger.release(run_id)
+        sessions.release(run_id)
+        backend_pool.release(run_id)
+
+
+def resume_run(run_id: str, hitl_enabled: bool, broker: Broker):
+    """Resume a paused (or stopped/forked) run from its latest checkpoint."""
+    # Re-create graph
+    interrupt_before = HITL_CONFIG["interrupt_before"] if hitl_enabled else []
+    graph = create_qa_graph(checkpointer=get_checkpointer(), interrupt_before=interrupt_before)
+    emit = make_emitter(run_id, broker)
+    config = {"configurable": {"thread_id": run_id, "emitter": emit}}
+
+    # Resuming is an explicit request to continue a stopped run
+    unarchive_run(run_id)
+    cancellation.clear(run_id)
+    cancellation.activate(run_id)
+    ledger.configure(run_id, (get_run_metadata(run_id) or {}).get("token_budget"))
+    try:
+        # Resume by invoking with None (inputs are loaded from checkpoint)
+        emit(WorkflowEventType.PHASE_START, {"phase": "Resuming Workflow", "agent": "System"})
+
+        # Run the next step(s)
+        with cancellation.deadline(run_id, RUN_DEADLINE_SECONDS, "run_deadline"):
+            final_state = graph.invoke(None, config=config)
+
+        # Check status again
+        _finish(graph, config, final_state, run_id, emit)
+
+    except InterruptedError:
+        _record_stopped(run_id, emit)
+    except Exception as e:
+        emit(WorkflowEventType.ERROR, {"message": str(e)})
+    finally:
+        cancellation.deactivate(run_id)
+        ledger.release(run_id)
+        sessions.release(run_id)
+        backend_pool.release(run_id)
+
+
+def execute_job(job: Job, broker: Broker):
+    """Run one broker job to completion."""
+    payload = job.payload
+    if job.kind == "run":
+        run_orchestrator(payload["product_idea"], payload["run_id"], payload.get("hitl_enabled", False), broker,
+                         token_budget=payload.get("token_budget"),
+                         requirements_reuse=payload.get("requirements_reuse"))
+    elif job.kind == "resume":
+        resume_run(payload["run_id"], payload.get("hitl_enabled", True), broker)
+    else:
+        raise ValueError(f"Unknown job kind: {job.kind}")
@@ -8,6 +8,7 @@ class AgentState(TypedDict):
     run_id: str
     # Inputs
     product_idea: str
+    requirements_reuse: Optional[Dict[str, Any]]  # {action: "reuse" | "warm_start", run_id, score}
     
     # Artifacts
     mrs: Optional[str]
@@ -17,10 +18,12 @@ class AgentState(TypedDict):
     test_plan: Optional[str]
     automation_tests: Optional[str]
     manual_tests: Optional[str]
+    automation_results: Optional[Dict[str, Any]]  # Counts/status of the executed AutomationQA suite
     code: Optional[str]
     review: Optional[str]
     review_approved: Optional[bool]
     review_count: int = 0
+    review_cache: Optional[Dict[str, Dict[str, Any]]]  # filename -> {hash, approved, findings}
     test_results: Optional[str] = None
     tests_passed: Optional[bool] = None
     dev_retries: int = 0
@@ -36,3 +39,4 @@ class AgentState(TypedDict):
     # Metadata for UI
     logs: Annotated[List[str], operator.add]
     total_tokens: Annotated[int, operator.add]
+    retry_tokens: Annotated[int, operator.add]  # Subset of total_tokens spent on parse repairs
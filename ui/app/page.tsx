@@ -43,12 +43,14 @@ type WorkflowEventType =
   | "agent_complete"
   | "artifact_generated"
   | "thought_chunk"
-  | "error";
+  | "error"
+  | "replay";
 
 interface WorkflowEvent {
   type: WorkflowEventType;
   data: any;
   timestamp: string;
+  seq?: number; // Per-run sequence number, used to resume after a reconnect
   // ... other fields
 }
 
@@ -136,6 +138,8 @@ export default function Dashboard() {
   // Refs
   const logsEndRef = useRef<HTMLDivElement>(null);
   const thoughtEndRef = useRef<HTMLDivElement>(null);
+  const currentRunIdRef = useRef<string | null>(null);
+  const lastSeqRef = useRef<Record<string, number>>({});
 
   // --- Helper Functions (Hoisted) ---
 
@@ -199,7 +203,7 @@ export default function Dashboard() {
         break;
 
       case "workflow_complete":
-        setWorkflowStatus(data.status === "success" ? "complete" : "error");
+        setWorkflowStatus(data.status === "success" ? "complete" : data.status === "stopped" ? "idle" : "error");
         setActiveAgent(null);
         addLog(`✨ Workflow Complete: ${data.status} (Tokens: ${data.total_tokens || 0})`);
         fetchRuns(); // Refresh history to show tokens
@@ -246,6 +250,10 @@ export default function Dashboard() {
       case "error":
         addLog(`❌ Error: ${data.message}`);
         break;
+
+      case "replay":
+        addLog(`System: Replayed ${data.events} events for ${data.run_id}${data.gap ? " (some were lost)" : ""}`);
+        break;
     }
   };
 
@@ -368,7 +376,10 @@ export default function Dashboard() {
     let reconnectTimer: ReturnType<typeof setTimeout>;
 
     const connect = () => {
-      ws = new WebSocket("ws://localhost:8000/ws");
+      // On reconnect, replay what the current run emitted while we were away
+      const runId = currentRunIdRef.current;
+      const query = runId ? `?run_id=${encodeURIComponent(runId)}&since=${lastSeqRef.current[runId] || 0}` : "";
+      ws = new WebSocket(`ws://localhost:8000/ws${query}`);
 
       ws.onopen = () => {
         addLog("System: Connected to server");
@@ -376,6 +387,10 @@ export default function Dashboard() {
 
       ws.onmessage = (event) => {
         const msg: WorkflowEvent = JSON.parse(event.data);
+        const msgRunId = msg.data?.run_id;
+        if (msg.seq !== undefined && msgRunId) {
+          lastSeqRef.current[msgRunId] = Math.max(lastSeqRef.current[msgRunId] || 0, msg.seq);
+        }
         handleEvent(msg);
       };
 
@@ -397,6 +412,10 @@ export default function Dashboard() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  useEffect(() => {
+    currentRunIdRef.current = currentRunId;
+  }, [currentRunId]);
+
   // Scrolls
   useEffect(() => {
     logsEndRef.current?.scrollIntoView({ behavior: "smooth" });